@@ -0,0 +1,292 @@
+"""
+Approximate Nearest Neighbour Index Module
+
+Inverted-file (IVF) index over the vector database, in pure NumPy. Vectors
+are clustered with spherical k-means; a query is scored against the
+centroids and only the rows in the `nprobe` closest lists are scored
+exactly. Raising nprobe trades latency for recall.
+
+Build it offline after Stage 2:
+
+    python ann_index.py build [data/vector_db] [--nlist N]
+
+The index is saved to data/vector_db/index/ivf.npz and is ignored (search
+falls back to exact) once the vector database changes underneath it.
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from vector_store import atomic_save_npz, atomic_write_json, index_dir, load_corpus, source_versions
+
+
+IVF_NAME = "ivf"
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """Nearest centroid (by dot product) for every row, computed in chunks"""
+    assignments = np.empty(len(matrix), dtype=np.int32)
+    for start in range(0, len(matrix), chunk_size):
+        chunk = np.asarray(matrix[start:start + chunk_size], dtype=np.float32)
+        assignments[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def spherical_kmeans(
+    matrix: np.ndarray,
+    k: int,
+    iterations: int = 20,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Cluster L2-normalized rows into k unit-length centroids
+
+    Args:
+        matrix: (n, d) matrix of normalized rows
+        k: Number of clusters
+        iterations: Number of Lloyd iterations
+        seed: Random seed for initialization
+
+    Returns:
+        (k, d) float32 matrix of normalized centroids
+    """
+    rng = np.random.default_rng(seed)
+    matrix = np.asarray(matrix, dtype=np.float32)
+    centroids = matrix[rng.choice(len(matrix), size=k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _assign(matrix, centroids)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, matrix)
+        counts = np.bincount(assignments, minlength=k)
+
+        # Re-seed empty clusters with random rows
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = matrix[rng.choice(len(matrix), size=len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = sums / norms
+
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Inverted-file index: centroids plus row IDs grouped by nearest centroid"""
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, row_ids: np.ndarray, nprobe: int = 8):
+        """
+        Initialize the index
+
+        Args:
+            centroids: (nlist, d) normalized centroids
+            offsets: (nlist + 1,) start offset of each list in row_ids
+            row_ids: Row IDs of the corpus matrix, grouped by list
+            nprobe: Default number of lists to scan per query
+        """
+        self.centroids = centroids
+        self.offsets = offsets
+        self.row_ids = row_ids
+        self.nprobe = nprobe
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        nlist: Optional[int] = None,
+        iterations: int = 20,
+        max_train: int = 100000,
+        seed: int = 0
+    ) -> "IVFIndex":
+        """
+        Train centroids and assign every row to its nearest list
+
+        Args:
+            matrix: (n, d) matrix of normalized rows
+            nlist: Number of lists (default: 4 * sqrt(n))
+            iterations: k-means iterations
+            max_train: Maximum rows sampled for k-means training
+            seed: Random seed
+
+        Returns:
+            IVFIndex over the matrix
+        """
+        n = len(matrix)
+        if nlist is None:
+            nlist = int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+
+        rng = np.random.default_rng(seed)
+        if n > max_train:
+            sample = np.asarray(matrix[np.sort(rng.choice(n, size=max_train, replace=False))])
+        else:
+            sample = np.asarray(matrix)
+
+        centroids = spherical_kmeans(sample, nlist, iterations=iterations, seed=seed)
+        return cls.from_assignments(centroids, _assign(matrix, centroids))
+
+    @classmethod
+    def from_assignments(cls, centroids: np.ndarray, assignments: np.ndarray, nprobe: int = 8) -> "IVFIndex":
+        """Group row IDs into lists given each row's list"""
+        row_ids = np.argsort(assignments, kind='stable').astype(np.int32)
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assignments, minlength=len(centroids)))
+        return cls(centroids, offsets, row_ids, nprobe=nprobe)
+
+    def assignments(self) -> np.ndarray:
+        """List of every row, indexed by row ID"""
+        assignments = np.empty(len(self.row_ids), dtype=np.int32)
+        assignments[self.row_ids] = np.repeat(np.arange(self.nlist, dtype=np.int32), np.diff(self.offsets))
+        return assignments
+
+    def remapped(self, matrix: np.ndarray, previous: np.ndarray) -> "IVFIndex":
+        """
+        Index over a changed corpus, keeping the trained centroids
+
+        Rows carried over keep their list; new rows go to their nearest
+        centroid. Recall degrades slowly as the data drifts from the
+        centroids, so rebuild the index after large ingests.
+
+        Args:
+            matrix: (n, d) matrix of normalized rows of the new corpus
+            previous: (n,) row ID of each new row in this index, or -1 for new rows
+
+        Returns:
+            IVFIndex over the new corpus
+        """
+        assignments = np.empty(len(matrix), dtype=np.int32)
+        kept = previous >= 0
+        assignments[kept] = self.assignments()[previous[kept]]
+        fresh = np.flatnonzero(~kept)
+        if len(fresh):
+            assignments[fresh] = _assign(np.asarray(matrix[fresh], dtype=np.float32), self.centroids)
+        return IVFIndex.from_assignments(self.centroids, assignments, nprobe=self.nprobe)
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """
+        Row IDs in the nprobe lists closest to a normalized query
+
+        Args:
+            query: Normalized query vector
+            nprobe: Number of lists to scan (default: self.nprobe)
+
+        Returns:
+            Array of candidate row IDs
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = self.centroids @ query
+        lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        return np.concatenate([
+            self.row_ids[self.offsets[i]:self.offsets[i + 1]] for i in lists
+        ])
+
+    def save(self, db_folder: str, sources: Dict[str, int]) -> Path:
+        """
+        Persist the index next to the vector database
+
+        Args:
+            db_folder: Path to vector database folder
+            sources: source_versions() of the data the index was built from
+
+        Returns:
+            Path to the saved index
+        """
+        out_dir = index_dir(db_folder)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        path = out_dir / f"{IVF_NAME}.npz"
+        atomic_save_npz(path, {'centroids': self.centroids, 'offsets': self.offsets, 'row_ids': self.row_ids})
+
+        meta = {'nlist': self.nlist, 'nprobe': self.nprobe, 'sources': sources}
+        atomic_write_json(out_dir / f"{IVF_NAME}.json", meta)
+
+        return path
+
+    @classmethod
+    def load(cls, db_folder: str, sources: Dict[str, int], warn: bool = True) -> Optional["IVFIndex"]:
+        """
+        Load a persisted index if it was built from the current data
+
+        Args:
+            db_folder: Path to vector database folder
+            sources: source_versions() of the currently loaded data
+            warn: Print a warning when the persisted index is stale
+
+        Returns:
+            IVFIndex, or None if missing or stale
+        """
+        out_dir = index_dir(db_folder)
+        path = out_dir / f"{IVF_NAME}.npz"
+        meta_path = out_dir / f"{IVF_NAME}.json"
+        if not path.exists() or not meta_path.exists():
+            return None
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['sources'] != sources:
+            if warn:
+                print(f"Warning: {path} is out of date; rebuild with: python ann_index.py build")
+            return None
+
+        with np.load(path) as data:
+            return cls(data['centroids'], data['offsets'], data['row_ids'], nprobe=meta['nprobe'])
+
+
+def build_ivf(db_folder: str = "data/vector_db", nlist: Optional[int] = None, nprobe: int = 8) -> IVFIndex:
+    """
+    Build and persist the IVF index for a vector database folder
+
+    Args:
+        db_folder: Path to vector database folder
+        nlist: Number of lists (default: 4 * sqrt(n))
+        nprobe: Default number of lists scanned per query
+
+    Returns:
+        The built IVFIndex
+    """
+    sources = source_versions(db_folder)
+    matrix, _ = load_corpus(db_folder)
+    if len(matrix) == 0:
+        raise ValueError(f"No experiences found in {db_folder}")
+
+    ivf = IVFIndex.build(matrix, nlist=nlist)
+    ivf.nprobe = min(nprobe, ivf.nlist)
+    ivf.save(db_folder, sources)
+    return ivf
+
+
+def main():
+    """Command line entry point"""
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("Usage: python ann_index.py build [db_folder] [--nlist N] [--nprobe N]")
+        sys.exit(1)
+
+    args = sys.argv[2:]
+    options = {}
+    for flag in ("--nlist", "--nprobe"):
+        if flag in args:
+            i = args.index(flag)
+            options[flag.lstrip('-')] = int(args[i + 1])
+            del args[i:i + 2]
+    db_folder = args[0] if args else "data/vector_db"
+
+    if not Path(db_folder).exists():
+        print(f"✗ Error: Database folder '{db_folder}' not found")
+        sys.exit(1)
+
+    ivf = build_ivf(db_folder, nlist=options.get('nlist'), nprobe=options.get('nprobe', 8))
+    print(f"✓ Built IVF index: {ivf.nlist} lists over {len(ivf.row_ids)} rows (nprobe={ivf.nprobe})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,22 @@
 """
 Simple Flask API server for the Life Experience Search Engine
 Serves the frontend and provides search API endpoint
+
+Development:  python api_server.py [--debug]
+Production:   python server.py  (pre-forked workers sharing one index)
 """
 
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
+from corpus_manifest import load_manifest, rebuild_manifest
 from embedding_tool import EmbeddingTool
+from filter_index import FILTER_FIELDS, SearchFilter
+from vector_index import SEARCH_ENGINES, SEARCH_MODES, watch_index
 import os
+import sys
+
+# Largest number of queries accepted by /api/search/batch
+MAX_BATCH_QUERIES = 1000
 
 app = Flask(__name__, static_folder='frontend')
 CORS(app)
@@ -32,7 +42,18 @@ def search():
     Request body:
     {
         "query": "user's experience text",
-        "top_k": 5  (optional, default 5)
+        "top_k": 5,  (optional, default 5)
+        "mode": "vector" | "lexical" | "hybrid",  (optional, default from models.json)
+        "engine": "exact" | "ivf" | "int8" | "pca",  (optional, default from models.json)
+        "nprobe": 8,  (optional, IVF lists to scan)
+        "rescore": 200,  (optional, int8 candidates rescored at full precision)
+        "shortlist": 200,  (optional, pca candidates reranked at full width)
+        "filters": {  (optional, applied before scoring; keywords/persons match case-insensitively)
+            "include_keywords": ["business-failure"],  (rows with any of these)
+            "exclude_keywords": ["illness"],
+            "include_persons": ["Steve Jobs", "Oprah Winfrey"],  (rows of any of these)
+            "exclude_persons": []
+        }
     }
 
     Response:
@@ -50,6 +71,10 @@ def search():
         "query": "original query",
         "total_matches": 5
     }
+
+    Lexical matches (mode "lexical", or a fallback after the embedding call
+    failed or exceeded search.latency_budget) add "mode": "lexical" and the
+    raw "bm25" score; hybrid matches add "mode": "hybrid" and the "rrf" score.
     """
     try:
         data = request.get_json()
@@ -58,17 +83,17 @@ def search():
             return jsonify({'error': 'Missing query in request body'}), 400
 
         query = data['query']
-        top_k = data.get('top_k', 5)
 
         # Validate inputs
         if not isinstance(query, str) or not query.strip():
             return jsonify({'error': 'Query must be a non-empty string'}), 400
 
-        if not isinstance(top_k, int) or top_k < 1 or top_k > 50:
-            return jsonify({'error': 'top_k must be an integer between 1 and 50'}), 400
+        options, error = search_options(data)
+        if error:
+            return jsonify({'error': error}), 400
 
         # Perform search
-        matches = embedder.match_across_database(query, top_k=top_k)
+        matches = embedder.match_across_database(query, **options)
 
         return jsonify({
             'matches': matches,
@@ -81,34 +106,161 @@ def search():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/search/batch', methods=['POST'])
+def search_batch():
+    """
+    Search for matching experiences for many queries at once
+
+    All queries are embedded in as few upstream requests as possible and
+    scored against the index together.
+
+    Request body:
+    {
+        "queries": ["first experience text", "second ...", ...],  (up to 1000)
+        "top_k": 5,  (optional, per query)
+        "mode", "engine", "nprobe", "rescore", "shortlist", "filters"  (optional, as in /api/search)
+    }
+
+    Response:
+    {
+        "results": [
+            {"query": "first experience text", "matches": [...], "total_matches": 5},
+            ...
+        ],
+        "total_queries": 2
+    }
+    """
+    try:
+        data = request.get_json()
+
+        if not data or 'queries' not in data:
+            return jsonify({'error': 'Missing queries in request body'}), 400
+
+        queries = data['queries']
+
+        # Validate inputs
+        if not isinstance(queries, list) or not queries:
+            return jsonify({'error': 'queries must be a non-empty list'}), 400
+
+        if len(queries) > MAX_BATCH_QUERIES:
+            return jsonify({'error': f'At most {MAX_BATCH_QUERIES} queries per request'}), 400
+
+        if not all(isinstance(query, str) and query.strip() for query in queries):
+            return jsonify({'error': 'Every query must be a non-empty string'}), 400
+
+        options, error = search_options(data)
+        if error:
+            return jsonify({'error': error}), 400
+
+        # Perform search
+        all_matches = embedder.match_many(queries, **options)
+
+        return jsonify({
+            'results': [
+                {'query': query, 'matches': matches, 'total_matches': len(matches)}
+                for query, matches in zip(queries, all_matches)
+            ],
+            'total_queries': len(queries)
+        })
+
+    except Exception as e:
+        print(f"Error in batch search endpoint: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+def search_options(data: dict):
+    """
+    Validate the search options shared by /api/search and /api/search/batch
+
+    Returns:
+        (options dict for match_across_database / match_many, error message or None)
+    """
+    top_k = data.get('top_k', 5)
+    mode = data.get('mode')
+    engine = data.get('engine')
+
+    if not isinstance(top_k, int) or top_k < 1 or top_k > 50:
+        return None, 'top_k must be an integer between 1 and 50'
+
+    if mode is not None and mode not in SEARCH_MODES:
+        return None, f"mode must be one of: {', '.join(SEARCH_MODES)}"
+
+    if engine is not None and engine not in SEARCH_ENGINES:
+        return None, f"engine must be one of: {', '.join(SEARCH_ENGINES)}"
+
+    options = {'top_k': top_k, 'mode': mode, 'engine': engine}
+    for name in ('nprobe', 'rescore', 'shortlist'):
+        value = data.get(name)
+        if value is not None and (not isinstance(value, int) or value < 1):
+            return None, f'{name} must be a positive integer'
+        options[name] = value
+
+    filters = data.get('filters')
+    if filters is not None:
+        if not isinstance(filters, dict) or not set(filters) <= set(FILTER_FIELDS):
+            return None, f"filters must be an object with keys: {', '.join(FILTER_FIELDS)}"
+        for name, values in filters.items():
+            if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                return None, f'filters.{name} must be a list of strings'
+        options['search_filter'] = SearchFilter(**filters)
+
+    return options, None
+
+
 @app.route('/api/stats', methods=['GET'])
 def stats():
     """
     Get database statistics
 
+    Served from the corpus manifest that Stage 2 maintains, so no person
+    file is read. Add ?people=true for the per-person breakdown.
+
     Response:
     {
         "total_celebrities": 122,
         "total_experiences": 3500,
-        "database_path": "data/vector_db"
+        "total_keywords": 12000,
+        "json_bytes": 52428800,
+        "index_bytes": 21495808,
+        "models": {"openai/text-embedding-3-small/1536": 122},
+        "updated_at": "2026-01-01T00:00:00+00:00",
+        "manifest_version": 42,
+        "database_path": "data/vector_db",
+        "people": [  (only with ?people=true)
+            {"id": "steve_jobs", "person": "Steve Jobs", "experiences": 31, "keywords": 110,
+             "distinct_keywords": 64, "top_keywords": [["career-rejection", 4], ...],
+             "model": "...", "dimensions": 1536, "json_bytes": ..., "index_bytes": ...,
+             "updated_at": "..."},
+            ...
+        ]
     }
     """
     try:
-        import glob
-        db_files = glob.glob('data/vector_db/*.json')
+        manifest = load_manifest('data/vector_db')
+        if manifest is None:
+            # Database built before the manifest existed: build it once
+            print("Warning: No corpus manifest found, building it from data/vector_db")
+            manifest = rebuild_manifest('data/vector_db')
 
-        total_experiences = 0
-        for db_file in db_files:
-            import json
-            with open(db_file, 'r') as f:
-                data = json.load(f)
-                total_experiences += len(data.get('experiences', []))
-
-        return jsonify({
-            'total_celebrities': len(db_files),
-            'total_experiences': total_experiences,
+        totals = manifest['totals']
+        response = {
+            'total_celebrities': totals['people'],
+            'total_experiences': totals['experiences'],
+            'total_keywords': totals['keywords'],
+            'json_bytes': totals['json_bytes'],
+            'index_bytes': totals['index_bytes'],
+            'models': totals['models'],
+            'updated_at': manifest['updated_at'],
+            'manifest_version': manifest['version'],
             'database_path': 'data/vector_db'
-        })
+        }
+
+        if request.args.get('people', '').lower() in ('1', 'true', 'yes'):
+            response['people'] = [
+                dict(entry, id=stem) for stem, entry in sorted(manifest['people'].items())
+            ]
+
+        return jsonify(response)
 
     except Exception as e:
         print(f"Error in stats endpoint: {e}")
@@ -128,7 +280,11 @@ if __name__ == '__main__':
     print("\nStarting server...")
     print("Frontend: http://localhost:5000")
     print("API: http://localhost:5000/api/search")
-    print("\nPress Ctrl+C to stop")
+    print("\nPress Ctrl+C to stop (for production use python server.py)")
     print("="*80)
 
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Pick up persons that Stage 2 adds or updates while the server runs
+    if embedder.reload_interval:
+        watch_index('data/vector_db', embedder.reload_interval)
+
+    app.run(host='0.0.0.0', port=5000, debug='--debug' in sys.argv)
@@ -1,13 +1,33 @@
 #!/usr/bin/env python3
 """
 Batch processing script for scraping and embedding multiple celebrities.
-Runs Stage 1 (scraping) and Stage 2 (embedding) for each person in sequence.
+Runs Stage 1 (scraping) and Stage 2 (embedding) for each person, in-process
+via pipeline.run_pipeline so tool instances are shared across people.
+
+Usage:
+    python batch_process.py                  # one person at a time
+    python batch_process.py --workers 4      # four people concurrently
+    python batch_process.py --workers 6 --stage1-workers 6 --stage2-workers 2
+    python batch_process.py --only-failed    # retry only what failed last time
+    python batch_process.py --force "Bill Gates" --force "Ada Lovelace"
+    python batch_process.py --prefetch-citations 8   # fill the citation cache first
+    python batch_process.py --refresh-citations      # ignore cached citation lists
+
+Progress is recorded in data/batch_manifest.json; a rerun skips stages that
+completed, whose outputs are still present and whose inputs are unchanged.
+Outputs edited since (by hand or by dedup.py) do not trigger a re-run.
 """
 
-import subprocess
+import argparse
 import sys
 from pathlib import Path
 
+from citation_fetcher import CitationFetcher
+from pipeline import run_pipeline
+from run_manifest import RunManifest
+from vector_index import rebuild_indexes
+from vector_store import pack_corpus
+
 # List of celebrities to process (remaining 75)
 CELEBRITIES = [
     "Warren Buffett",
@@ -87,86 +107,113 @@ CELEBRITIES = [
     "Ai Weiwei",
 ]
 
-def run_command(cmd: list[str], description: str) -> bool:
-    """Run a command and return success status."""
-    print(f"\n{'='*80}")
-    print(f"{description}")
-    print(f"{'='*80}")
-
-    try:
-        result = subprocess.run(
-            cmd,
-            check=True,
-            text=True,
-            capture_output=False  # Show output in real-time
-        )
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"\n❌ ERROR: Command failed with exit code {e.returncode}")
-        return False
-    except Exception as e:
-        print(f"\n❌ ERROR: {e}")
-        return False
+def format_timings(result) -> str:
+    """Per-stage timings for the summary, e.g. 'stage1 212.4s, stage2 skipped'."""
+    parts = []
+    for stage in result.stages:
+        if stage.skipped:
+            parts.append(f"{stage.stage} skipped")
+        else:
+            status = "" if stage.success else " failed"
+            parts.append(f"{stage.stage} {stage.seconds:.1f}s{status}")
+    return ", ".join(parts)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Scrape and embed every person in CELEBRITIES.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of people processed concurrently (default: 1, sequential)")
+    parser.add_argument("--stage1-workers", type=int, default=None,
+                        help="max concurrent Stage 1 scrapes (default: --workers)")
+    parser.add_argument("--stage2-workers", type=int, default=None,
+                        help="max concurrent Stage 2 embeddings (default: --workers)")
+    parser.add_argument("--only-failed", action="store_true",
+                        help="process only people with a failed stage in the manifest")
+    parser.add_argument("--force", action="append", default=[], metavar="PERSON",
+                        help="re-run every stage for PERSON even if up to date (repeatable)")
+    parser.add_argument("--prefetch-citations", type=int, nargs="?", const=8, default=None, metavar="WORKERS",
+                        help="fetch every citation list concurrently before scraping (default: 8 workers)")
+    parser.add_argument("--refresh-citations", action="store_true",
+                        help="query Perplexity even when citations are cached")
+    parser.add_argument("--manifest", default="data/batch_manifest.json",
+                        help="run manifest path (default: data/batch_manifest.json)")
+    args = parser.parse_args()
+
+    for name in ("workers", "stage1_workers", "stage2_workers", "prefetch_citations"):
+        value = getattr(args, name)
+        if value is not None and value < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+
+    return args
 
 
 def main():
-    """Process all celebrities in sequence."""
+    """Process all celebrities, sequentially or with a worker pool."""
+    args = parse_args()
+    parallel = args.workers > 1
+    manifest = RunManifest(args.manifest)
+
+    people = CELEBRITIES
+    if args.only_failed:
+        people = [p for p in CELEBRITIES if manifest.has_failure(p) or p in args.force]
 
     print("="*80)
     print("BATCH PROCESSING: Scraping & Embedding Celebrities")
     print("="*80)
-    print(f"Total celebrities: {len(CELEBRITIES)}")
-    print(f"Celebrities: {', '.join(CELEBRITIES)}")
+    print(f"Total celebrities: {len(people)}")
+    print(f"Celebrities: {', '.join(people)}")
+    print(f"Manifest: {args.manifest}")
+    if parallel:
+        print(f"Workers: {args.workers} "
+              f"(Stage 1: {args.stage1_workers or args.workers}, Stage 2: {args.stage2_workers or args.workers})")
     print("="*80)
 
+    if args.prefetch_citations:
+        print(f"\nPrefetching citations ({args.prefetch_citations} workers)...")
+        prefetched = CitationFetcher().prefetch(
+            people, workers=args.prefetch_citations, refresh=args.refresh_citations
+        )
+        print(f"✓ Fetched: {len(prefetched['fetched'])}, already cached: {len(prefetched['cached'])}, "
+              f"failed: {len(prefetched['failed'])}")
+
+    person_results = run_pipeline(
+        people,
+        workers=args.workers,
+        stage1_workers=args.stage1_workers,
+        stage2_workers=args.stage2_workers,
+        manifest=manifest,
+        force=args.force,
+        refresh_citations=args.refresh_citations and not args.prefetch_citations
+    )
+
+    # Summary keeps the list order regardless of completion order
     results = {
-        "success": [],
-        "failed": []
+        "success": [r for r in person_results if r.success],
+        "failed": [r for r in person_results if not r.success]
     }
 
-    for i, person in enumerate(CELEBRITIES, 1):
-        print(f"\n\n{'#'*80}")
-        print(f"# [{i}/{len(CELEBRITIES)}] Processing: {person}")
-        print(f"{'#'*80}\n")
-
-        # Stage 1: Scraping
-        stage1_success = run_command(
-            ["python", "stage1_scrape.py", person],
-            f"[Stage 1] Scraping {person}"
-        )
-
-        if not stage1_success:
-            print(f"\n❌ Failed to scrape {person}. Skipping to next person.")
-            results["failed"].append(person)
-            continue
-
-        # Stage 2: Embedding
-        stage2_success = run_command(
-            ["python", "stage2_embed.py", person],
-            f"[Stage 2] Embedding {person}"
-        )
-
-        if not stage2_success:
-            print(f"\n❌ Failed to embed {person}.")
-            results["failed"].append(person)
-            continue
-
-        results["success"].append(person)
-        print(f"\n✓ Successfully processed {person}")
+    # Re-pack the binary corpus so the search path can memory-map it
+    if results["success"] and Path("data/vector_db").exists():
+        print(f"\nPacking vector database: {pack_corpus('data/vector_db')}")
+        # IVF / int8 / projection indexes built earlier, and the packed BM25 index
+        rebuilt = rebuild_indexes('data/vector_db')
+        if rebuilt:
+            print(f"Rebuilt search indexes: {', '.join(rebuilt)}")
 
     # Print summary
     print("\n\n" + "="*80)
     print("BATCH PROCESSING COMPLETE")
     print("="*80)
-    print(f"✓ Successful: {len(results['success'])}/{len(CELEBRITIES)}")
+    print(f"✓ Successful: {len(results['success'])}/{len(people)}")
     if results["success"]:
-        for person in results["success"]:
-            print(f"  - {person}")
+        for result in results["success"]:
+            print(f"  - {result.person} ({format_timings(result)})")
 
     if results["failed"]:
-        print(f"\n❌ Failed: {len(results['failed'])}/{len(CELEBRITIES)}")
-        for person in results["failed"]:
-            print(f"  - {person}")
+        print(f"\n❌ Failed: {len(results['failed'])}/{len(people)}")
+        for result in results["failed"]:
+            print(f"  - {result.person} ({format_timings(result)})")
 
     print("\n" + "="*80)
     print("Next: Query the database with Stage 3")
@@ -0,0 +1,97 @@
+"""
+Citation Cache Module
+
+On-disk cache for CitationFetcher results. Each entry is a JSON file under
+data/citation_cache/ keyed by a hash of (person name, prompt, model), so a
+changed prompt or model never serves stale citations. Entries expire after
+a TTL; re-running Stage 1 within it reuses the same URL set instead of
+paying another Sonar round-trip.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from vector_store import atomic_write_json
+
+
+class CitationCache:
+    """JSON-file cache of citation lists"""
+
+    def __init__(self, path: str = "data/citation_cache", ttl_days: Optional[float] = 30):
+        """
+        Initialize the cache
+
+        Args:
+            path: Directory holding one JSON file per entry
+            ttl_days: Age after which entries are ignored (None never expires)
+        """
+        self.path = Path(path)
+        self.ttl_seconds = None if ttl_days is None else ttl_days * 86400
+
+    @staticmethod
+    def key(person_name: str, prompt: str, model: str) -> str:
+        """Cache key for one person, prompt and model"""
+        digest = hashlib.sha256()
+        digest.update(f"{model}\0{person_name}\0".encode('utf-8'))
+        digest.update(prompt.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _file(self, person_name: str, prompt: str, model: str) -> Path:
+        safe_name = person_name.lower().replace(" ", "_").replace(".", "")
+        return self.path / f"{safe_name}-{self.key(person_name, prompt, model)[:16]}.json"
+
+    def get(self, person_name: str, prompt: str, model: str) -> Optional[Dict]:
+        """
+        Look up cached citation data
+
+        Args:
+            person_name: Person's name
+            prompt: Prompt sent to Perplexity
+            model: Perplexity model
+
+        Returns:
+            The cached fetch_citations() dictionary, or None if missing, expired
+            or unreadable
+        """
+        cache_file = self._file(person_name, prompt, model)
+        if not cache_file.exists():
+            return None
+
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            fetched_at, data = entry['fetched_at'], entry['data']
+        except (ValueError, KeyError, TypeError):
+            # Truncated or old-format entry: a miss, overwritten by the next put()
+            return None
+
+        if self.ttl_seconds is not None and time.time() - fetched_at > self.ttl_seconds:
+            return None
+        return data
+
+    def put(self, person_name: str, prompt: str, model: str, data: Dict) -> Path:
+        """
+        Store citation data
+
+        Args:
+            person_name: Person's name
+            prompt: Prompt sent to Perplexity
+            model: Perplexity model
+            data: fetch_citations() dictionary
+
+        Returns:
+            Path to the cache file
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        cache_file = self._file(person_name, prompt, model)
+        atomic_write_json(cache_file, {
+            'person': person_name,
+            'model': model,
+            'prompt': prompt,
+            'fetched_at': time.time(),
+            'data': data
+        }, indent=2, ensure_ascii=False)
+        return cache_file
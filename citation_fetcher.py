@@ -3,26 +3,52 @@ Module 1: Citation Fetcher
 
 Given a famous person's name, fetch their biography from Perplexity
 and return the citation URLs for further scraping.
+
+Results are cached on disk (see citation_cache.py) so reruns reuse the same
+citation list. Fill the cache for many people ahead of scraping with:
+
+    python citation_fetcher.py prefetch [famous_people_list.txt] [--workers 8] [--refresh]
 """
 
 from perplexity_tool import PerplexityTool, PerplexityResponse
-from typing import List, Dict
+from citation_cache import CitationCache
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterable
 import json
+import sys
 
 
 class CitationFetcher:
     """Fetches citation URLs for a given person using Perplexity API"""
 
     def __init__(self, config_path: str = "models.json"):
-        """Initialize with Perplexity tool"""
+        """Initialize with Perplexity tool and the citation cache"""
         self.perplexity = PerplexityTool(config_path)
 
-    def fetch_citations(self, person_name: str) -> Dict[str, any]:
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+
+        # Citation cache ("citations": {"cache": {...}}); on by default, null disables it
+        cache_config = config.get('citations', {}).get('cache', {})
+        self.cache = CitationCache(**cache_config) if cache_config is not None else None
+
+    @staticmethod
+    def biography_prompt(person_name: str) -> str:
+        """Prompt sent to Perplexity for a person"""
+        return (
+            f"Provide a comprehensive biography of {person_name}, "
+            f"focusing on their life experiences, challenges, struggles, "
+            f"failures, and how they overcame adversity. Include details about "
+            f"their early life, career setbacks, and turning points."
+        )
+
+    def fetch_citations(self, person_name: str, refresh: bool = False) -> Dict[str, any]:
         """
         Fetch biography and citation URLs for a person
 
         Args:
             person_name: Name of the famous person
+            refresh: Query Perplexity even if a cached result exists
 
         Returns:
             Dictionary containing:
@@ -30,15 +56,17 @@ class CitationFetcher:
                 - biography: Text biography from Perplexity
                 - citation_urls: List of source URLs
                 - citations_with_titles: List of dicts with url and title
+                - cached: Whether the result came from the citation cache
         """
-        # Query Perplexity for comprehensive biography
-        prompt = (
-            f"Provide a comprehensive biography of {person_name}, "
-            f"focusing on their life experiences, challenges, struggles, "
-            f"failures, and how they overcame adversity. Include details about "
-            f"their early life, career setbacks, and turning points."
-        )
+        prompt = self.biography_prompt(person_name)
+        model = self.perplexity.model
+
+        if self.cache is not None and not refresh:
+            cached = self.cache.get(person_name, prompt, model)
+            if cached is not None:
+                return {**cached, "cached": True}
 
+        # Query Perplexity for comprehensive biography
         response: PerplexityResponse = self.perplexity.query(prompt)
 
         # Extract citation data
@@ -50,7 +78,7 @@ class CitationFetcher:
             for citation in response.citations
         ]
 
-        return {
+        data = {
             "name": person_name,
             "biography": response.content,
             "citation_urls": response.get_citation_urls(),
@@ -58,6 +86,42 @@ class CitationFetcher:
             "total_citations": len(response.citations)
         }
 
+        if self.cache is not None:
+            self.cache.put(person_name, prompt, model, data)
+
+        return {**data, "cached": False}
+
+    def prefetch(self, people: Iterable[str], workers: int = 8, refresh: bool = False) -> Dict[str, List[str]]:
+        """
+        Fill the citation cache for many people concurrently
+
+        Args:
+            people: Names to fetch
+            workers: Number of concurrent Perplexity queries
+            refresh: Re-query people that are already cached
+
+        Returns:
+            Dict with 'fetched', 'cached' and 'failed' name lists
+        """
+        people = list(people)
+        results = {"fetched": [], "cached": [], "failed": []}
+
+        def fetch(person_name: str):
+            try:
+                data = self.fetch_citations(person_name, refresh=refresh)
+            except Exception as e:
+                print(f"✗ {person_name}: {e}")
+                return person_name, "failed"
+            status = "cached" if data["cached"] else "fetched"
+            print(f"✓ {person_name}: {data['total_citations']} citations ({status})")
+            return person_name, status
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for person_name, status in executor.map(fetch, people):
+                results[status].append(person_name)
+
+        return results
+
     def save_citations(self, person_name: str, output_file: str = None) -> Dict[str, any]:
         """
         Fetch citations and save to JSON file
@@ -85,8 +149,52 @@ class CitationFetcher:
         return data
 
 
+def read_people_list(path: str) -> List[str]:
+    """
+    Names from a people list such as famous_people_list.txt
+
+    Blank lines and '#' headings are skipped, anything after " - " on a line
+    is treated as a note, and reading stops at a '---' footer separator.
+    """
+    people = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('---'):
+                break
+            if not line or line.startswith('#'):
+                continue
+            people.append(line.split(" - ", 1)[0].strip())
+    return list(dict.fromkeys(people))
+
+
+def prefetch_command(args: List[str]):
+    """Handle: python citation_fetcher.py prefetch [people_file] [--workers N] [--refresh]"""
+    workers = 8
+    if "--workers" in args:
+        i = args.index("--workers")
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+    refresh = "--refresh" in args
+    args = [a for a in args if a != "--refresh"]
+    people_file = args[0] if args else "famous_people_list.txt"
+
+    people = read_people_list(people_file)
+    print(f"Prefetching citations for {len(people)} people ({workers} workers)...\n")
+    results = CitationFetcher().prefetch(people, workers=workers, refresh=refresh)
+
+    print(f"\n✓ Fetched: {len(results['fetched'])}, already cached: {len(results['cached'])}")
+    if results["failed"]:
+        print(f"❌ Failed: {', '.join(results['failed'])}")
+        sys.exit(1)
+
+
 def main():
     """Example usage"""
+    if len(sys.argv) > 1 and sys.argv[1] == "prefetch":
+        prefetch_command(sys.argv[2:])
+        return
+
     fetcher = CitationFetcher()
 
     # Test with a famous person
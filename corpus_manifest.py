@@ -0,0 +1,269 @@
+"""
+Corpus Manifest Module
+
+Small summary of the vector database, kept at data/vector_db/index/manifest.json
+(inside index/, so the *.json glob over person files never picks it up):
+
+    {
+      "version": 42,                      incremented on every update
+      "updated_at": "2026-01-01T00:00:00+00:00",
+      "totals": {"people": 122, "experiences": 3500, "keywords": 12000,
+                 "json_bytes": ..., "index_bytes": ..., "models": {"openai/text-embedding-3-small/1536": 122}},
+      "people": {
+        "steve_jobs": {"person": "Steve Jobs", "experiences": 31, "keywords": 110,
+                       "distinct_keywords": 64, "top_keywords": [["career-rejection", 4], ...],
+                       "model": "...", "dimensions": 1536, "json_bytes": ..., "index_bytes": ...,
+                       "updated_at": "..."}
+      }
+    }
+
+Stage 2 updates one person's entry (and the totals, incrementally) after
+writing the person; readers such as /api/stats never touch the corpus.
+The first update on a database without a manifest scans every person
+file, and each update drops persons whose file has been deleted.
+Updates are serialized across threads and, where fcntl exists, across
+processes through a lock file. Rebuild it from the person files with:
+
+    python corpus_manifest.py [data/vector_db]
+"""
+
+import json
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from vector_store import PERSONS_DIRNAME, atomic_write_json, index_dir, person_files
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates are only serialized within a process
+    fcntl = None
+
+
+MANIFEST_NAME = "manifest.json"
+
+# Keywords listed per person
+TOP_KEYWORDS = 5
+
+_update_lock = threading.Lock()
+_read_cache: Dict[str, tuple] = {}
+
+
+def manifest_path(db_folder: str = "data/vector_db") -> Path:
+    """Path of the manifest for a vector database folder"""
+    return index_dir(db_folder) / MANIFEST_NAME
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def _empty_manifest() -> Dict:
+    return {
+        'version': 0,
+        'updated_at': None,
+        'totals': {
+            'people': 0,
+            'experiences': 0,
+            'keywords': 0,
+            'json_bytes': 0,
+            'index_bytes': 0,
+            'models': {}
+        },
+        'people': {}
+    }
+
+
+def person_entry(db_folder: str, stem: str, data: Dict) -> Dict:
+    """
+    Manifest entry for one person
+
+    Args:
+        db_folder: Path to vector database folder
+        stem: The person's file stem ({stem}.json)
+        data: The person's vector database JSON (person, model, dimensions, experiences)
+
+    Returns:
+        Entry dict (see module docstring)
+    """
+    experiences = data.get('experiences', [])
+    keywords = Counter(keyword for exp in experiences for keyword in exp.get('keywords', []))
+
+    dimensions = data.get('dimensions')
+    if dimensions is None and experiences and 'embedding' in experiences[0]:
+        dimensions = len(experiences[0]['embedding'])
+
+    persons_dir = index_dir(db_folder) / PERSONS_DIRNAME
+    index_files = [persons_dir / f"{stem}.npy", persons_dir / f"{stem}.json", persons_dir / f"{stem}.terms.npz"]
+    json_file = Path(db_folder) / f"{stem}.json"
+
+    return {
+        'person': data.get('person', stem),
+        'experiences': len(experiences),
+        'keywords': sum(keywords.values()),
+        'distinct_keywords': len(keywords),
+        'top_keywords': [[keyword, count] for keyword, count in keywords.most_common(TOP_KEYWORDS)],
+        'model': data.get('model'),
+        'dimensions': dimensions,
+        'json_bytes': json_file.stat().st_size if json_file.exists() else 0,
+        'index_bytes': sum(path.stat().st_size for path in index_files if path.exists()),
+        'updated_at': _now()
+    }
+
+
+def _model_key(entry: Dict) -> str:
+    return f"{entry.get('model') or 'unknown'}/{entry.get('dimensions') or 0}"
+
+
+def _apply(totals: Dict, entry: Dict, sign: int):
+    """Add (sign=1) or subtract (sign=-1) one person's entry from the totals"""
+    totals['people'] += sign
+    for field in ('experiences', 'keywords', 'json_bytes', 'index_bytes'):
+        totals[field] += sign * entry[field]
+
+    models = totals['models']
+    key = _model_key(entry)
+    models[key] = models.get(key, 0) + sign
+    if models[key] <= 0:
+        del models[key]
+
+
+@contextmanager
+def _locked_manifest(db_folder: str):
+    """Yield the manifest for modification and save it, under thread and file locks"""
+    path = manifest_path(db_folder)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with _update_lock:
+        lock = open(path.with_name(path.name + ".lock"), 'a') if fcntl is not None else None
+        try:
+            if lock is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            # A database that predates the manifest is scanned once, so its
+            # first update does not start the totals from zero
+            manifest = _read_manifest(path) if path.exists() else _scan_manifest(db_folder)
+
+            yield manifest
+
+            manifest['version'] += 1
+            manifest['updated_at'] = _now()
+            atomic_write_json(path, manifest, ensure_ascii=False)
+        finally:
+            if lock is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                lock.close()
+
+
+def update_person(db_folder: str, stem: str, data: Optional[Dict]):
+    """
+    Record one person's current state in the manifest
+
+    Call after the person's JSON and binary files have been written.
+
+    Args:
+        db_folder: Path to vector database folder
+        stem: The person's file stem
+        data: The person's vector database JSON, or None if the person was removed
+    """
+    entry = person_entry(db_folder, stem, data) if data is not None else None
+
+    with _locked_manifest(db_folder) as manifest:
+        old = manifest['people'].pop(stem, None)
+        if old is not None:
+            _apply(manifest['totals'], old, -1)
+
+        # Persons whose files were deleted by hand
+        for gone in [other for other in manifest['people'] if not (Path(db_folder) / f"{other}.json").exists()]:
+            _apply(manifest['totals'], manifest['people'].pop(gone), -1)
+
+        if entry is not None:
+            manifest['people'][stem] = entry
+            _apply(manifest['totals'], entry, 1)
+
+
+def _scan_manifest(db_folder: str) -> Dict:
+    """Manifest (version 0) built from every person file (reads the whole corpus)"""
+    manifest = _empty_manifest()
+    for json_file in person_files(db_folder):
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        entry = person_entry(db_folder, json_file.stem, data)
+        manifest['people'][json_file.stem] = entry
+        _apply(manifest['totals'], entry, 1)
+    return manifest
+
+
+def rebuild_manifest(db_folder: str = "data/vector_db") -> Dict:
+    """
+    Rebuild the manifest from every person file (reads the whole corpus)
+
+    Args:
+        db_folder: Path to vector database folder
+
+    Returns:
+        The new manifest
+    """
+    existed = manifest_path(db_folder).exists()
+
+    with _locked_manifest(db_folder) as manifest:
+        # A missing manifest was just scanned by _locked_manifest itself
+        if existed:
+            scanned = _scan_manifest(db_folder)
+            manifest['people'] = scanned['people']
+            manifest['totals'] = scanned['totals']
+    return load_manifest(db_folder)
+
+
+def _read_manifest(path: Path) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_manifest(db_folder: str = "data/vector_db") -> Optional[Dict]:
+    """
+    Read the manifest, reusing the parsed copy while the file is unchanged
+
+    The returned dict is shared between callers and must not be modified.
+
+    Args:
+        db_folder: Path to vector database folder
+
+    Returns:
+        The manifest dict, or None if none has been written yet
+    """
+    path = manifest_path(db_folder)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+
+    key = str(path.resolve())
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _read_cache.get(key)
+    if cached is None or cached[0] != version:
+        cached = (version, _read_manifest(path))
+        _read_cache[key] = cached
+    return cached[1]
+
+
+def main():
+    """Command line entry point"""
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    db_folder = args[0] if args else "data/vector_db"
+
+    if not Path(db_folder).exists():
+        print(f"✗ Error: Database folder '{db_folder}' not found")
+        sys.exit(1)
+
+    manifest = rebuild_manifest(db_folder)
+    totals = manifest['totals']
+    print(f"✓ Manifest: {totals['people']} people, {totals['experiences']} experiences")
+    print(f"✓ Written to {manifest_path(db_folder)}")
+
+
+if __name__ == "__main__":
+    main()
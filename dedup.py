@@ -0,0 +1,344 @@
+"""
+Near-Duplicate Detection Module
+
+The scraping agent often extracts the same event from several sources, so
+experiences.txt holds near-identical blocks. This module collapses them
+into one experience whose keywords and source URLs are merged:
+
+    - MinHash signatures over word shingles with LSH banding find blocks
+      whose estimated Jaccard similarity reaches a threshold, before
+      anything is embedded (no API cost for duplicates)
+    - an optional cosine threshold on the embeddings catches paraphrases
+
+Duplicates are only merged within one person. Stage 2 runs the MinHash pass
+while streaming (see stage2_embed.py); the whole vector database can be
+deduplicated in place with:
+
+    python dedup.py [data/vector_db] [--threshold 0.8] [--cosine 0.95] [--dry-run]
+"""
+
+import json
+import re
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from corpus_manifest import update_person
+from lexical_index import write_person_terms
+from vector_store import (
+    atomic_write_json, index_dir, normalize_rows, pack_corpus, person_files, write_person
+)
+
+
+def shingles(text: str, size: int = 5) -> np.ndarray:
+    """
+    Hashed word shingles of a text
+
+    Case, punctuation and whitespace are ignored. Texts shorter than the
+    shingle size yield a single shingle of all their words.
+
+    Args:
+        text: Experience text
+        size: Words per shingle
+
+    Returns:
+        Array of distinct 32-bit shingle hashes (as uint64)
+    """
+    words = re.findall(r"\w+", text.casefold())
+    if len(words) <= size:
+        grams = {" ".join(words)}
+    else:
+        grams = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint64, count=len(grams))
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Band count and rows per band whose S-curve midpoint sits just below threshold
+
+    Args:
+        num_perm: Signature length
+        threshold: Target Jaccard similarity
+
+    Returns:
+        (bands, rows) with bands * rows == num_perm
+    """
+    target = threshold * 0.9
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    return min(options, key=lambda option: abs((1.0 / option[0]) ** (1.0 / option[1]) - target))
+
+
+class NearDuplicateIndex:
+    """Incremental MinHash LSH index mapping each text to its cluster representative"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5, seed: int = 0):
+        """
+        Initialize the index
+
+        Args:
+            threshold: Estimated Jaccard similarity at which texts are duplicates
+            num_perm: MinHash signature length
+            shingle_size: Words per shingle
+            seed: Seed for the hash family (fixed so runs are reproducible)
+        """
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+
+        # Multiply-shift hash family: (a * h + b) mod 2**64, top 32 bits (a odd)
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self._signatures: List[np.ndarray] = []
+        self._representatives: List[int] = []
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """
+        MinHash signatures of several texts in one vectorized pass
+
+        Args:
+            texts: Texts to sign
+
+        Returns:
+            (len(texts), num_perm) uint64 array
+        """
+        if not texts:
+            return np.empty((0, len(self._a)), dtype=np.uint64)
+        parts = [shingles(text, self.shingle_size) for text in texts]
+        offsets = np.cumsum([0] + [len(part) for part in parts[:-1]])
+        hashes = np.concatenate(parts)
+        with np.errstate(over='ignore'):
+            values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return np.minimum.reduceat(values, offsets, axis=1).T.copy()
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of a text"""
+        return self.signatures([text])[0]
+
+    def add(self, text: str, signature: Optional[np.ndarray] = None) -> int:
+        """
+        Add a text and return the position of its cluster representative
+
+        The representative is the earliest added text it is a near duplicate
+        of (directly or through another duplicate), or the text itself.
+
+        Args:
+            text: Text to add
+            signature: Precomputed signature from signatures(), if available
+
+        Returns:
+            Insertion position of the representative (== this text's position if new)
+        """
+        position = len(self._signatures)
+        if signature is None:
+            signature = self.signature(text)
+
+        candidates = set()
+        keys = []
+        for band in range(self.bands):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            keys.append(key)
+            candidates.update(self._buckets[band].get(key, ()))
+
+        representative = position
+        best = 0.0
+        for candidate in sorted(candidates):
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= self.threshold and similarity > best:
+                best = similarity
+                representative = self._representatives[candidate]
+
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(position)
+        self._signatures.append(signature)
+        self._representatives.append(representative)
+        return representative
+
+
+def merge_experience(target: Dict, duplicate: Dict):
+    """
+    Fold a duplicate's keywords and source URL into the kept experience
+
+    Args:
+        target: Experience that is kept (modified in place)
+        duplicate: Experience being collapsed into it
+    """
+    target['keywords'] = list(dict.fromkeys(target.get('keywords', []) + duplicate.get('keywords', [])))
+
+    sources = target.get('source_urls') or ([target['source_url']] if target.get('source_url') else [])
+    for source in duplicate.get('source_urls') or [duplicate.get('source_url', '')]:
+        if source and source not in sources:
+            sources.append(source)
+    if len(sources) > 1:
+        target['source_urls'] = sources
+
+
+def cosine_representatives(matrix: np.ndarray, threshold: float) -> List[int]:
+    """
+    Cluster rows whose cosine similarity reaches a threshold
+
+    Args:
+        matrix: (n, d) embeddings (normalized here)
+        threshold: Cosine similarity at which rows are duplicates
+
+    Returns:
+        For every row, the index of the earliest row in its cluster
+    """
+    n = len(matrix)
+    parent = list(range(n))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    if n > 1:
+        normalized = normalize_rows(np.asarray(matrix, dtype=np.float32))
+        similarities = normalized @ normalized.T
+        rows, cols = np.nonzero(np.triu(similarities >= threshold, k=1))
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+
+    return [find(i) for i in range(n)]
+
+
+def dedupe_experiences(
+    experiences: List[Dict],
+    threshold: float = 0.8,
+    shingle_size: int = 5,
+    cosine_threshold: Optional[float] = None
+) -> List[Dict]:
+    """
+    Collapse near-duplicate experiences of one person
+
+    Args:
+        experiences: Experiences in file order ('embedding' needed for the cosine pass)
+        threshold: MinHash Jaccard threshold (None skips the MinHash pass)
+        shingle_size: Words per shingle
+        cosine_threshold: Optional embedding cosine threshold
+
+    Returns:
+        Kept experiences, in order, with merged keywords and source_urls
+    """
+    kept = experiences
+    if threshold is not None:
+        index = NearDuplicateIndex(threshold=threshold, shingle_size=shingle_size)
+        signatures = index.signatures([exp['text'] for exp in experiences])
+        kept = []
+        by_position = {}
+        for position, exp in enumerate(experiences):
+            representative = index.add(exp['text'], signatures[position])
+            if representative == position:
+                by_position[position] = exp
+                kept.append(exp)
+            else:
+                merge_experience(by_position[representative], exp)
+
+    if cosine_threshold is not None and kept and all('embedding' in exp for exp in kept):
+        representatives = cosine_representatives(np.array([exp['embedding'] for exp in kept]), cosine_threshold)
+        result = []
+        for i, exp in enumerate(kept):
+            if representatives[i] == i:
+                result.append(exp)
+            else:
+                merge_experience(kept[representatives[i]], exp)
+        kept = result
+
+    return kept
+
+
+def dedupe_folder(
+    db_folder: str = "data/vector_db",
+    threshold: float = 0.8,
+    cosine_threshold: Optional[float] = None,
+    shingle_size: int = 5,
+    dry_run: bool = False
+) -> Dict[str, int]:
+    """
+    Deduplicate every person in a vector database folder in place
+
+    Rewrites each changed person's JSON and binary matrix, then re-packs
+    the corpus if it was packed before.
+
+    Args:
+        db_folder: Path to vector database folder
+        threshold: MinHash Jaccard threshold
+        cosine_threshold: Optional embedding cosine threshold
+        shingle_size: Words per shingle
+        dry_run: Only count duplicates, write nothing
+
+    Returns:
+        Dict with 'people', 'experiences' and 'removed' counts
+    """
+    stats = {'people': 0, 'experiences': 0, 'removed': 0}
+
+    for json_file in person_files(db_folder):
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        experiences = data['experiences']
+        kept = dedupe_experiences(experiences, threshold, shingle_size, cosine_threshold)
+        removed = len(experiences) - len(kept)
+
+        stats['people'] += 1
+        stats['experiences'] += len(experiences)
+        stats['removed'] += removed
+
+        if removed:
+            print(f"  {data['person']}: {len(experiences)} -> {len(kept)} experiences")
+            if not dry_run:
+                data['experiences'] = kept
+                atomic_write_json(json_file, data, indent=2)
+                write_person(db_folder, json_file.stem, data['person'], kept)
+                write_person_terms(db_folder, json_file.stem, kept)
+                update_person(db_folder, json_file.stem, data)
+
+    if stats['removed'] and not dry_run and (index_dir(db_folder) / "corpus.npy").exists():
+        pack_corpus(db_folder)
+
+    return stats
+
+
+def main():
+    """Command line entry point"""
+    args = sys.argv[1:]
+    options = {}
+    for flag in ("--threshold", "--cosine", "--shingle-size"):
+        if flag in args:
+            i = args.index(flag)
+            options[flag.lstrip('-')] = float(args[i + 1])
+            del args[i:i + 2]
+    dry_run = "--dry-run" in args
+    args = [a for a in args if a != "--dry-run"]
+    db_folder = args[0] if args else "data/vector_db"
+
+    if not Path(db_folder).exists():
+        print(f"✗ Error: Database folder '{db_folder}' not found")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    stats = dedupe_folder(
+        db_folder,
+        threshold=options.get('threshold', 0.8),
+        cosine_threshold=options.get('cosine'),
+        shingle_size=int(options.get('shingle-size', 5)),
+        dry_run=dry_run
+    )
+    elapsed = time.perf_counter() - start
+
+    action = "Would remove" if dry_run else "Removed"
+    print(f"✓ {action} {stats['removed']} of {stats['experiences']} experiences "
+          f"across {stats['people']} people in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,21 +3,182 @@ Module 2: Deep Scraper
 
 Uses Claude Code via PolyAgent to intelligently scrape biographical content
 from URLs and extract life experience narratives.
+
+Before the agent starts, every URL is fetched concurrently through the
+shared page cache and reduced to clean text in sources/source_N.txt (see
+page_prefetch.py), so the agent only reads local files and extracts.
+
+In sharded mode ("scraper": {"shards": N} or shards=N) the URLs are split
+across N agents running concurrently, each in its own scratch directory
+under shards/. Their experiences.txt fragments are merged deterministically
+(in citation order, exact duplicates dropped) and scraping_summary.txt is
+written from the per-shard results.
 """
 
 import os
-import polycli
-from typing import List, Dict
+import contextvars
+import json
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
+from http_session import get_client
+from page_cache import PageCache, canonical_url
+from page_prefetch import PagePrefetcher, SourceFile
+
+try:
+    import polycli
+except ImportError:  # the fragment merge helpers work without the agent runtime
+    polycli = None
+
+
+@dataclass
+class ShardResult:
+    """Outcome of one scraping agent in sharded mode"""
+    shard: int
+    url_numbers: List[int]
+    shard_dir: Path
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def read_experience_blocks(path: Path) -> List[str]:
+    """
+    Raw experience blocks of an experiences.txt file
+
+    Blocks are separated by lines containing only '---'; empty blocks are
+    skipped and line endings normalized.
+    """
+    if not path.exists():
+        return []
+
+    blocks = []
+    current = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if line.strip() == '---':
+                if '\n'.join(current).strip():
+                    blocks.append('\n'.join(current).strip())
+                current = []
+            else:
+                current.append(line)
+    if '\n'.join(current).strip():
+        blocks.append('\n'.join(current).strip())
+    return blocks
+
+
+def block_source(block: str) -> str:
+    """The [SOURCE: url] of an experience block, or ''"""
+    for line in block.splitlines():
+        if line.startswith('[SOURCE:'):
+            return line[len('[SOURCE:'):].rstrip().rstrip(']').strip()
+    return ""
+
+
+def merge_experience_fragments(urls: List[str], fragments: List[Path]) -> Tuple[List[Tuple[Optional[int], str]], int]:
+    """
+    Merge per-shard experiences.txt fragments in a deterministic order
+
+    Blocks are ordered by the citation number of their source URL, then by
+    shard and position; blocks whose source is not one of the URLs go last.
+    Exact duplicates (ignoring whitespace) are dropped.
+
+    Args:
+        urls: Citation URLs, in order
+        fragments: experiences.txt path of each shard, in shard order
+
+    Returns:
+        (list of (citation number or None, block), number of duplicates dropped)
+    """
+    numbers = {canonical_url(url): i for i, url in enumerate(urls, 1)}
+
+    entries = []
+    for shard, fragment in enumerate(fragments):
+        for position, block in enumerate(read_experience_blocks(fragment)):
+            source = block_source(block)
+            number = numbers.get(canonical_url(source)) if source else None
+            order = number if number is not None else len(urls) + 1
+            entries.append((order, shard, position, number, block))
+    entries.sort(key=lambda entry: entry[:3])
+
+    merged = []
+    seen = set()
+    for _, _, _, number, block in entries:
+        key = ' '.join(block.split()).casefold()
+        if key in seen:
+            continue
+        seen.add(key)
+        merged.append((number, block))
+
+    return merged, len(entries) - len(merged)
+
 
 class DeepScraper:
     """Scrapes URLs using Claude Code to extract biographical life experiences"""
 
-    def __init__(self):
-        """Initialize the scraper with PolyAgent"""
+    def __init__(self, config_path: str = "models.json"):
+        """
+        Initialize the scraper with PolyAgent and the page cache
+
+        Args:
+            config_path: Optional JSON config file; its "pages" section configures
+                the page cache ("cache"), the fetching HTTP client ("http") and
+                prefetch concurrency ("prefetch")
+        """
+        if polycli is None:
+            raise ImportError("DeepScraper needs polycli (pip install polyagent)")
+
         self.agent = polycli.PolyAgent(id="biography_scraper")
 
+        config = {}
+        if os.path.exists(config_path):
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+
+        pages_config = config.get('pages', {})
+        self.page_cache = PageCache(
+            **pages_config.get('cache', {}),
+            http=get_client(pages_config.get('http'))
+        )
+        self.prefetcher = PagePrefetcher(self.page_cache, **pages_config.get('prefetch', {}))
+
+        # Number of concurrent scraping agents per person ("scraper": {"shards": N})
+        self.shards = config.get('scraper', {}).get('shards', 1)
+
+    def fetch_pages(self, urls: List[str], output_dir: str) -> List[SourceFile]:
+        """
+        Fetch and extract every URL into local files under output_dir
+
+        Args:
+            urls: URLs to fetch
+            output_dir: Absolute output directory (the agent's working directory)
+
+        Returns:
+            SourceFile per URL; path is relative to output_dir, None where fetching failed
+        """
+        sources = self.prefetcher.prefetch(urls, output_dir)
+
+        fetched = sum(1 for source in sources if source.ok)
+        cached = sum(1 for source in sources if source.ok and source.from_cache)
+        print(f"Prefetched {fetched}/{len(urls)} sources ({cached} from the page cache)")
+        return sources
+
+    @staticmethod
+    def _sources_list(sources: List[SourceFile]) -> str:
+        """Numbered URL list for the prompt, with the local file of each page"""
+        lines = []
+        for source in sources:
+            if source.path is None:
+                lines.append(f"{source.index}. {source.url}\n   (not downloaded - fetch it yourself)")
+            else:
+                lines.append(f"{source.index}. {source.url}\n   local file: {source.path}")
+        return "\n".join(lines)
+
     def scrape_multiple_urls(
         self,
         urls: List[str],
@@ -50,19 +211,22 @@ class DeepScraper:
         print(f"Output directory: {abs_output_dir}")
         print(f"{'=' * 80}\n")
 
+        # Download pages through the shared cache
+        sources = self.fetch_pages(urls, abs_output_dir)
+
         # Build comprehensive prompt for Claude Code
-        urls_list = "\n".join([f"{i+1}. {url}" for i, url in enumerate(urls)])
+        urls_list = self._sources_list(sources)
 
         prompt = f"""You are tasked with scraping biographical information about {person_name} from multiple URLs.
 
 **Person**: {person_name}
 
-**URLs to scrape**:
+**URLs to scrape** (each page's text is already extracted to the local file listed under it):
 {urls_list}
 
 **Your task**:
 For each URL:
-1. Fetch the webpage content (use web requests, handle any errors gracefully)
+1. Read the source from its local file (only fetch URLs marked as not downloaded; handle any errors gracefully)
 2. Extract biographical life experiences focusing on:
    - Early life and background
    - Challenges, struggles, and adversity they faced
@@ -114,52 +278,34 @@ Work autonomously and handle all file I/O yourself."""
                 "error": str(e)
             }
 
-    def scrape_with_structured_format(
-        self,
-        urls: List[str],
-        person_name: str,
-        output_dir: str = None
-    ) -> Dict[str, any]:
+    @staticmethod
+    def _structured_prompt(person_name: str, urls_list: str, write_summary: bool = True) -> str:
         """
-        Scrape URLs and extract experiences in structured key-value format
+        Prompt asking the agent for experiences.txt in the structured format
 
         Args:
-            urls: List of URLs to scrape
             person_name: Name of the person
-            output_dir: Directory to save results
-
-        Returns:
-            Summary dictionary with all results
+            urls_list: Output of _sources_list()
+            write_summary: Also ask the agent for scraping_summary.txt
         """
-        if output_dir is None:
-            safe_name = person_name.lower().replace(" ", "_").replace(".", "")
-            output_dir = f"data/celebrities/{safe_name}"
-
-        # Get absolute path for output directory
-        abs_output_dir = os.path.abspath(output_dir)
-
-        # Create output directory
-        Path(abs_output_dir).mkdir(parents=True, exist_ok=True)
-
-        print(f"\n{'=' * 80}")
-        print(f"Scraping {len(urls)} URLs for {person_name}")
-        print(f"Output: Structured key-value format")
-        print(f"Output directory: {abs_output_dir}")
-        print(f"{'=' * 80}\n")
+        summary_step = """4. **Also create a summary file: `scraping_summary.txt`** with:
+   - Total URLs attempted
+   - Successfully scraped count
+   - Total experiences extracted
+   - Any errors encountered
 
-        # Build comprehensive prompt for Claude Code
-        urls_list = "\n".join([f"{i+1}. {url}" for i, url in enumerate(urls)])
+""" if write_summary else ""
 
-        prompt = f"""You are tasked with scraping biographical information about {person_name} from multiple URLs and extracting individual life experiences in a structured format.
+        return f"""You are tasked with scraping biographical information about {person_name} from multiple URLs and extracting individual life experiences in a structured format.
 
 **Person**: {person_name}
 
-**URLs to scrape**:
+**URLs to scrape** (each page's text is already extracted to the local file listed under it):
 {urls_list}
 
 **Your task**:
 
-1. **Scrape all URLs** - Fetch content from each URL, handle errors gracefully
+1. **Read all sources** - Read each source from its local file instead of fetching the URL. Only fetch URLs marked as not downloaded, and handle errors gracefully
 
 2. **Extract individual experiences** - From ALL scraped content, identify distinct life experiences. Each URL may contain MULTIPLE experiences. Look for:
    - Early life events
@@ -197,20 +343,61 @@ Work autonomously and handle all file I/O yourself."""
    - education-turning-point, mentor-influence
    - resilience, comeback, breakthrough
 
-4. **Also create a summary file: `scraping_summary.txt`** with:
-   - Total URLs attempted
-   - Successfully scraped count
-   - Total experiences extracted
-   - Any errors encountered
-
-**Important**:
+{summary_step}**Important**:
 - Each experience should be standalone and self-contained
 - Keywords should help categorize the type of experience
 - Multiple experiences can come from a single URL
 - Save files to the current working directory
 - Be comprehensive - extract ALL relevant experiences
 
-Work autonomously and handle all web requests and file I/O yourself."""
+Work autonomously and handle any remaining web requests and all file I/O yourself."""
+
+    def scrape_with_structured_format(
+        self,
+        urls: List[str],
+        person_name: str,
+        output_dir: str = None,
+        shards: Optional[int] = None
+    ) -> Dict[str, any]:
+        """
+        Scrape URLs and extract experiences in structured key-value format
+
+        Args:
+            urls: List of URLs to scrape
+            person_name: Name of the person
+            output_dir: Directory to save results
+            shards: Number of concurrent agents (default: the "scraper" config, 1)
+
+        Returns:
+            Summary dictionary with all results
+        """
+        if output_dir is None:
+            safe_name = person_name.lower().replace(" ", "_").replace(".", "")
+            output_dir = f"data/celebrities/{safe_name}"
+
+        # Get absolute path for output directory
+        abs_output_dir = os.path.abspath(output_dir)
+
+        # Create output directory
+        Path(abs_output_dir).mkdir(parents=True, exist_ok=True)
+
+        print(f"\n{'=' * 80}")
+        print(f"Scraping {len(urls)} URLs for {person_name}")
+        print(f"Output: Structured key-value format")
+        print(f"Output directory: {abs_output_dir}")
+        print(f"{'=' * 80}\n")
+
+        # Download pages through the shared cache
+        sources = self.fetch_pages(urls, abs_output_dir)
+
+        shards = self.shards if shards is None else shards
+        if shards > 1 and len(urls) > 1:
+            return self._scrape_sharded(urls, sources, person_name, abs_output_dir, min(shards, len(urls)))
+
+        # Build comprehensive prompt for Claude Code
+        urls_list = self._sources_list(sources)
+
+        prompt = self._structured_prompt(person_name, urls_list)
 
         try:
             # Create a new agent with the output directory as working directory
@@ -242,6 +429,157 @@ Work autonomously and handle all web requests and file I/O yourself."""
                 "error": str(e)
             }
 
+    def _scrape_sharded(
+        self,
+        urls: List[str],
+        sources: List[SourceFile],
+        person_name: str,
+        output_dir: str,
+        shards: int
+    ) -> Dict[str, any]:
+        """
+        Run one agent per shard of URLs concurrently, then merge their output
+
+        URLs are dealt round-robin so slow hosts, which tend to cluster in
+        citation lists, spread across shards. Each agent works in
+        shards/shard_K/ with copies of its own source files only.
+
+        Args:
+            urls: List of URLs to scrape
+            sources: Prefetched SourceFile per URL
+            person_name: Name of the person
+            output_dir: Absolute output directory
+            shards: Number of agents
+
+        Returns:
+            Summary dictionary with all results
+        """
+        shards_dir = Path(output_dir) / "shards"
+        shutil.rmtree(shards_dir, ignore_errors=True)
+
+        groups = [sources[k::shards] for k in range(shards)]
+
+        def run_shard(shard: int, group: List[SourceFile]) -> ShardResult:
+            shard_dir = shards_dir / f"shard_{shard}"
+            shard_dir.mkdir(parents=True, exist_ok=True)
+            for source in group:
+                if source.path is not None:
+                    dest = shard_dir / source.path
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(Path(output_dir) / source.path, dest)
+
+            prompt = self._structured_prompt(person_name, self._sources_list(group), write_summary=False)
+            result = ShardResult(shard, [source.index for source in group], shard_dir)
+            start = time.perf_counter()
+            try:
+                agent = polycli.PolyAgent(id=f"biography_scraper_shard_{shard}", cwd=str(shard_dir))
+                agent.run(prompt)
+            except Exception as e:
+                print(f"Error running Claude Code on shard {shard}: {e}")
+                result.error = str(e)
+            result.seconds = time.perf_counter() - start
+            return result
+
+        print(f"Launching {shards} Claude Code agents on {len(urls)} URLs...")
+        # Each agent runs in a copy of the caller's context (keeps its output label)
+        with ThreadPoolExecutor(max_workers=shards) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, run_shard, k, group)
+                for k, group in enumerate(groups, 1)
+            ]
+            shard_results = [future.result() for future in futures]
+
+        # Deterministic merge into the canonical experiences.txt
+        merged, duplicates = merge_experience_fragments(
+            urls, [result.shard_dir / "experiences.txt" for result in shard_results]
+        )
+        failed = [result for result in shard_results if result.error is not None]
+        # Any failed shard would drop its URLs' experiences, so only a
+        # complete run replaces the canonical file
+        success = bool(merged) and not failed
+
+        # A failed rerun keeps the previous experiences.txt (the shard
+        # fragments stay in shards/); a successful one replaces it via temp
+        # file and rename, so it is never half-written
+        if success:
+            experiences_path = Path(output_dir) / "experiences.txt"
+            tmp_path = experiences_path.with_name(f".experiences.txt.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for _, block in merged:
+                    f.write(block + "\n\n---\n\n")
+            os.replace(tmp_path, experiences_path)
+        elif failed:
+            print(f"Warning: {len(failed)} of {len(shard_results)} shards failed; keeping the existing experiences.txt")
+        else:
+            print("Warning: No shard produced experiences; keeping the existing experiences.txt")
+
+        self._write_sharded_summary(person_name, output_dir, sources, shard_results, merged, duplicates)
+
+        print(f"\n{'=' * 80}")
+        print(f"Sharded scraping complete: {len(merged)} experiences from {shards} agents "
+              f"({duplicates} duplicates dropped, {len(failed)} agents failed)")
+        print(f"Check output directory: {output_dir}")
+        print(f"Files: experiences.txt, scraping_summary.txt")
+        print(f"{'=' * 80}\n")
+
+        result = {
+            "person_name": person_name,
+            "total_urls": len(urls),
+            "output_dir": output_dir,
+            "success": success,
+            "shards": len(shard_results),
+            "experiences": len(merged)
+        }
+        if not success:
+            errors = "; ".join(f"shard {r.shard}: {r.error}" for r in failed)
+            result["error"] = errors or "no experiences extracted"
+        return result
+
+    @staticmethod
+    def _write_sharded_summary(
+        person_name: str,
+        output_dir: str,
+        sources: List[SourceFile],
+        shard_results: List[ShardResult],
+        merged: List[Tuple[Optional[int], str]],
+        duplicates: int
+    ):
+        """Write scraping_summary.txt from prefetch and per-shard results"""
+        per_url = {}
+        for number, _ in merged:
+            per_url[number] = per_url.get(number, 0) + 1
+
+        lines = [
+            f"Scraping summary: {person_name}",
+            f"Generated: {datetime.now().isoformat(timespec='seconds')}",
+            f"Mode: sharded ({len(shard_results)} agents)",
+            "",
+            f"Total URLs attempted: {len(sources)}",
+            f"Successfully prefetched: {sum(1 for source in sources if source.ok)}",
+            f"Total experiences extracted: {len(merged)} ({duplicates} duplicates dropped)",
+            f"Experiences without a recognized source: {per_url.get(None, 0)}",
+            "",
+            "Per URL:"
+        ]
+        for source in sources:
+            status = f"ok, {source.chars} chars" if source.chars else ("ok" if source.ok else "not downloaded")
+            lines.append(f"  {source.index}. [{status}] {source.url} - {per_url.get(source.index, 0)} experiences")
+
+        lines += ["", "Per shard:"]
+        for result in shard_results:
+            fragment = len(read_experience_blocks(result.shard_dir / "experiences.txt"))
+            status = f"error: {result.error}" if result.error else "ok"
+            numbers = ", ".join(str(n) for n in result.url_numbers)
+            lines.append(f"  shard_{result.shard}: URLs {numbers} - {status} - "
+                         f"{fragment} experiences - {result.seconds:.1f}s")
+
+        errors = [f"shard_{r.shard}: {r.error}" for r in shard_results if r.error]
+        errors += [f"URL {s.index} not downloaded: {s.url}" for s in sources if not s.ok]
+        lines += ["", "Errors:"] + ([f"  - {error}" for error in errors] or ["  none"])
+
+        with open(Path(output_dir) / "scraping_summary.txt", 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
 
 def main():
     """Example usage"""
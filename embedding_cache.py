@@ -0,0 +1,182 @@
+"""
+Embedding Cache Module
+
+Persistent content-addressed cache for EmbeddingTool. Entries are keyed by
+a hash of (model, dimensions, exact text) and stored as float32 blobs in a
+SQLite database, with least-recently-used eviction once the cache grows
+past its size limit.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Dict
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """SQLite-backed cache of text embeddings"""
+
+    def __init__(self, path: str = "data/embedding_cache.sqlite", max_mb: float = 512):
+        """
+        Open (or create) the cache database
+
+        Args:
+            path: Path to the SQLite file
+            max_mb: Size limit for stored vectors; least recently used
+                    entries are evicted once it is exceeded
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._connect()
+
+    def _connect(self):
+        """Open the connection and create the schema if needed"""
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+
+    def reopen(self):
+        """
+        Replace the connection with a new one
+
+        Call in a forked worker process: an SQLite connection must not be used
+        on both sides of a fork.
+        """
+        self._lock = threading.Lock()
+        self._connect()
+
+    @staticmethod
+    def key(model: str, dimensions: int, text: str) -> str:
+        """Content address for one text under a given model"""
+        digest = hashlib.sha256()
+        digest.update(f"{model}\0{dimensions}\0".encode('utf-8'))
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get_many(self, model: str, dimensions: int, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up embeddings for several texts in one query
+
+        Args:
+            model: Embedding model name
+            dimensions: Embedding dimensions
+            texts: Texts to look up
+
+        Returns:
+            List aligned with texts; None where the text is not cached
+        """
+        keys = [self.key(model, dimensions, text) for text in texts]
+        found: Dict[str, bytes] = {}
+
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall())
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+            results = []
+            for key in keys:
+                if key in found:
+                    self.hits += 1
+                    results.append(np.frombuffer(found[key], dtype=np.float32).tolist())
+                else:
+                    self.misses += 1
+                    results.append(None)
+
+        return results
+
+    def put_many(self, model: str, dimensions: int, texts: List[str], embeddings: List[List[float]]):
+        """
+        Store embeddings for several texts, then evict if over the size limit
+
+        Args:
+            model: Embedding model name
+            dimensions: Embedding dimensions
+            texts: Texts that were embedded
+            embeddings: Embedding vectors aligned with texts
+        """
+        now = time.time()
+        entries = []
+        for text, embedding in zip(texts, embeddings):
+            blob = np.asarray(embedding, dtype=np.float32).tobytes()
+            entries.append((self.key(model, dimensions, text), blob, len(blob), now))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, last_access) VALUES (?, ?, ?, ?)",
+                entries
+            )
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is under its limit"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% of the limit so we don't evict on every insert
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM embeddings ORDER BY last_access ASC"
+        ):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Cache counters and size
+
+        Returns:
+            Dict with 'hits', 'misses', 'entries' and 'size_bytes'
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings"
+            ).fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': entries,
+            'size_bytes': size
+        }
@@ -5,11 +5,127 @@ Provides text embedding functionality using OpenAI's text-embedding-3-small
 via OpenRouter API for creating vector representations of biographical experiences.
 """
 
+import contextvars
+import hashlib
 import json
+import threading
 import requests
-from typing import List, Dict, Union
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Iterator, List, Dict, Optional, Union
 import numpy as np
 
+from embedding_cache import EmbeddingCache
+from http_session import get_client
+from filter_index import SearchFilter
+from vector_index import load_index
+
+
+def experience_id(text: str, source_url: str = "") -> str:
+    """
+    Stable ID for an experience, derived from its normalized text and source
+
+    Whitespace and case differences do not change the ID, so re-running
+    Stage 1 with cosmetic edits keeps existing embeddings reusable.
+
+    Args:
+        text: Experience text
+        source_url: Source URL (may be empty)
+
+    Returns:
+        16-character hex ID
+    """
+    normalized = " ".join(text.split()).casefold()
+    digest = hashlib.sha1(f"{source_url.strip()}\n{normalized}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _warn_malformed(file_path: str, line_number: int, message: str):
+    print(f"Warning: {file_path}:{line_number}: {message}")
+
+
+def _tag_value(line: str, tag: str) -> str:
+    """Value of a '[TAG: value]' line"""
+    value = line[len(tag):].strip()
+    return value[:-1].strip() if value.endswith(']') else value
+
+
+def iter_experiences(
+    file_path: str,
+    on_malformed: Optional[Callable[[str, int, str], None]] = _warn_malformed
+) -> Iterator[Dict]:
+    """
+    Stream experiences from an experiences.txt file in a single pass
+
+    Blocks are separated by lines containing only '---' and hold optional
+    [KEYWORDS: ...] and [SOURCE: ...] lines plus the experience text. Only
+    those two tags are metadata; any other line, even one starting with '[',
+    is text. Handles \\r\\n line endings and leading, trailing or repeated
+    separators. Memory use is bounded by the largest block.
+
+    Args:
+        file_path: Path to experiences.txt file
+        on_malformed: Called as (file_path, line_number, message) for blocks
+            that are skipped or suspicious; None to ignore them
+
+    Yields:
+        Dicts with 'id', 'keywords', 'text', and optionally 'source_url'
+    """
+    start_line = None
+    keywords = None
+    source_url = ""
+    text_lines = []
+
+    def report(line_number: int, message: str):
+        if on_malformed is not None:
+            on_malformed(file_path, line_number, message)
+
+    def finish_block() -> Optional[Dict]:
+        text = '\n'.join(text_lines).strip()
+        if not text:
+            if keywords is not None or source_url:
+                report(start_line, "block has tags but no text; skipped")
+            return None
+
+        exp = {
+            'id': experience_id(text, source_url),
+            'keywords': keywords or [],
+            'text': text
+        }
+        if source_url:
+            exp['source_url'] = source_url
+        return exp
+
+    with open(file_path, 'r', encoding='utf-8', newline=None) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+
+            if line.strip() == '---':
+                exp = finish_block()
+                if exp is not None:
+                    yield exp
+                start_line, keywords, source_url, text_lines = None, None, "", []
+                continue
+
+            if start_line is None:
+                if not line.strip():
+                    continue
+                start_line = line_number
+
+            if line.startswith('[KEYWORDS:'):
+                if keywords is not None:
+                    report(line_number, "second [KEYWORDS:] line in block; replacing the first")
+                keywords = [k.strip() for k in _tag_value(line, '[KEYWORDS:').split(',') if k.strip()]
+            elif line.startswith('[SOURCE:'):
+                if source_url:
+                    report(line_number, "second [SOURCE:] line in block; replacing the first")
+                source_url = _tag_value(line, '[SOURCE:')
+            else:
+                text_lines.append(line)
+
+    exp = finish_block()
+    if exp is not None:
+        yield exp
+
 
 class EmbeddingTool:
     """Tool for creating text embeddings using OpenRouter API"""
@@ -30,10 +146,44 @@ class EmbeddingTool:
         self.model = "openai/text-embedding-3-small"
         self.dimensions = 1536
 
+        # Pooled keep-alive session with timeouts ("http": {...})
+        self.http = get_client(config.get('http'))
+
+        # Optional on-disk embedding cache ("embedding": {"cache": {...}})
+        self.embedding_config = config.get('embedding', {})
+        cache_config = self.embedding_config.get('cache')
+        self.cache = EmbeddingCache(**cache_config) if cache_config else None
+
+        # Request batching and concurrency
+        self.batch_size = self.embedding_config.get('batch_size', 128)
+        self.max_batch_tokens = self.embedding_config.get('max_batch_tokens', 100000)
+        self.max_workers = self.embedding_config.get('max_workers', 4)
+
+        # Near-duplicate collapsing in Stage 2 ("dedup": {...}, see dedup.py)
+        self.dedup_config = config.get('dedup', {})
+
+        # Search engine behind match_across_database ("search": {...})
+        self.search_config = config.get('search', {})
+        self.search_engine = self.search_config.get('engine', 'exact')
+        self.nprobe = self.search_config.get('nprobe')
+        self.rescore = self.search_config.get('rescore')
+        self.shortlist = self.search_config.get('shortlist')
+        # Seconds between checks for changed persons in long-running servers (None disables)
+        self.reload_interval = self.search_config.get('reload_interval', 5)
+        # "vector", "lexical" (BM25, no embedding call) or "hybrid" (rank fusion of both)
+        self.search_mode = self.search_config.get('mode', 'vector')
+        # Seconds a query embedding may take before search falls back to lexical (None waits)
+        self.latency_budget = self.search_config.get('latency_budget')
+        self._query_executor = None
+        self._query_executor_lock = threading.Lock()
+
     def embed(self, texts: Union[str, List[str]]) -> Union[List[float], List[List[float]]]:
         """
         Generate embeddings for text(s)
 
+        When an embedding cache is configured, cached texts are served from
+        disk and only the misses are sent to the API.
+
         Args:
             texts: Single text string or list of text strings
 
@@ -44,6 +194,94 @@ class EmbeddingTool:
         single_input = isinstance(texts, str)
         text_list = [texts] if single_input else texts
 
+        if self.cache is None:
+            embeddings = self._request_embeddings(text_list)
+        else:
+            embeddings = self.cache.get_many(self.model, self.dimensions, text_list)
+
+            # Send only the misses upstream, each distinct text once
+            missing = [i for i, emb in enumerate(embeddings) if emb is None]
+            if missing:
+                missing_texts = list(dict.fromkeys(text_list[i] for i in missing))
+                fresh = self._request_embeddings(missing_texts)
+                self.cache.put_many(self.model, self.dimensions, missing_texts, fresh)
+
+                fresh_by_text = dict(zip(missing_texts, fresh))
+                for i in missing:
+                    embeddings[i] = fresh_by_text[text_list[i]]
+
+        # Return single embedding if single input
+        return embeddings[0] if single_input else embeddings
+
+    def _request_embeddings(self, text_list: List[str]) -> List[List[float]]:
+        """
+        Call the embeddings API for a list of texts
+
+        The texts are split into batches capped by item count and estimated
+        tokens, and the batches are sent concurrently on a bounded pool.
+
+        Args:
+            text_list: Texts to embed
+
+        Returns:
+            List of embedding vectors in input order
+        """
+        batches = self._make_batches(text_list)
+        if not batches:
+            return []
+        if len(batches) == 1:
+            return self._post_embeddings(batches[0])
+
+        # Each batch runs in a copy of the caller's context (keeps its output label)
+        workers = min(self.max_workers, len(batches))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._post_embeddings, batch)
+                for batch in batches
+            ]
+            results = [future.result() for future in futures]
+
+        return [emb for batch_result in results for emb in batch_result]
+
+    def _make_batches(self, text_list: List[str]) -> List[List[str]]:
+        """
+        Split texts into consecutive batches within the item and token limits
+
+        Tokens are estimated at ~4 characters each; a single text over the
+        token budget is sent in a batch of its own.
+        """
+        batches = []
+        current = []
+        current_tokens = 0
+
+        for text in text_list:
+            tokens = max(1, len(text) // 4)
+            if current and (len(current) >= self.batch_size
+                            or current_tokens + tokens > self.max_batch_tokens):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(text)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+
+        return batches
+
+    def _post_embeddings(self, batch: List[str]) -> List[List[float]]:
+        """
+        Send a single embeddings request
+
+        Retries happen in the shared HTTP client only (transport retries or
+        the rate limiter), so a failing batch never multiplies them.
+
+        Args:
+            batch: Texts to embed in one request
+
+        Returns:
+            List of embedding vectors in input order
+        """
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -51,19 +289,18 @@ class EmbeddingTool:
 
         payload = {
             "model": self.model,
-            "input": text_list
+            "input": batch
         }
 
-        response = requests.post(self.endpoint, headers=headers, json=payload)
+        tokens = sum(max(1, len(text) // 4) for text in batch)
+        response = self.http.post(self.endpoint, tokens=tokens, headers=headers, json=payload)
         response.raise_for_status()
 
         result = response.json()
 
-        # Extract embeddings
-        embeddings = [item['embedding'] for item in result['data']]
-
-        # Return single embedding if single input
-        return embeddings[0] if single_input else embeddings
+        # Extract embeddings (sorted by index in case the API reorders them)
+        data = sorted(result['data'], key=lambda item: item.get('index', 0))
+        return [item['embedding'] for item in data]
 
     def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """
@@ -133,101 +370,155 @@ class EmbeddingTool:
             file_path: Path to experiences.txt file
 
         Returns:
-            List of dicts with 'keywords', 'text', and optionally 'source_url'
+            List of dicts with 'id', 'keywords', 'text', and optionally 'source_url'
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        return list(iter_experiences(file_path))
 
-        experiences = []
-        blocks = content.split('\n---\n')
+    def embed_queries(self, queries: List[str]) -> Optional[List[List[float]]]:
+        """
+        Embed search queries within the latency budget
 
-        for block in blocks:
-            if not block.strip():
-                continue
+        The embedding runs on a background thread; if it has not finished
+        within latency_budget seconds the caller stops waiting (the request
+        keeps running and fills the embedding cache for the next query).
 
-            lines = block.strip().split('\n')
-
-            # Extract keywords
-            keywords_line = [l for l in lines if l.startswith('[KEYWORDS:')]
-            keywords = []
-            if keywords_line:
-                kw_text = keywords_line[0].replace('[KEYWORDS:', '').replace(']', '')
-                keywords = [k.strip() for k in kw_text.split(',')]
-
-            # Extract source URL (optional)
-            source_line = [l for l in lines if l.startswith('[SOURCE:')]
-            source_url = ""
-            if source_line:
-                source_url = source_line[0].replace('[SOURCE:', '').replace(']', '').strip()
-
-            # Extract text (everything else)
-            text_lines = [l for l in lines if not l.startswith('[')]
-            text = '\n'.join(text_lines).strip()
-
-            if text:  # Only add if there's actual text
-                exp = {
-                    'keywords': keywords,
-                    'text': text
-                }
-                if source_url:
-                    exp['source_url'] = source_url
-                experiences.append(exp)
+        Args:
+            queries: Query texts
 
-        return experiences
+        Returns:
+            Embeddings in input order, or None if the embedding API failed or
+            exceeded the budget
+        """
+        try:
+            if self.latency_budget is None:
+                return self.embed(queries)
+
+            with self._query_executor_lock:
+                if self._query_executor is None:
+                    self._query_executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="query-embed"
+                    )
+            future = self._query_executor.submit(self.embed, queries)
+            return future.result(timeout=self.latency_budget)
+        except FutureTimeoutError:
+            print(f"Warning: Query embedding exceeded {self.latency_budget}s, falling back to lexical search")
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+            print(f"Warning: Query embedding failed ({e}), falling back to lexical search")
+        return None
 
     def match_across_database(
         self,
         query: str,
         db_folder: str = "data/vector_db",
-        top_k: int = 5
+        top_k: int = 5,
+        engine: Optional[str] = None,
+        nprobe: Optional[int] = None,
+        rescore: Optional[int] = None,
+        shortlist: Optional[int] = None,
+        search_filter: Optional[SearchFilter] = None,
+        mode: Optional[str] = None
     ) -> List[Dict]:
         """
         Find matching experiences across all celebrities
 
+        The database folder is loaded into a resident VectorIndex on first
+        use and reused by every later call in the same process. If the query
+        embedding fails or exceeds the latency budget, the search falls back
+        to lexical (BM25) mode; such matches are tagged "mode": "lexical".
+
         Args:
             query: User's experience text
             db_folder: Path to vector database folder
             top_k: Number of top results to return
+            engine: "exact", "ivf", "int8" or "pca" (default: "search.engine" from config)
+            nprobe: IVF lists to scan (default: "search.nprobe" from config)
+            rescore: int8 candidates rescored (default: "search.rescore" from config)
+            shortlist: pca candidates reranked (default: "search.shortlist" from config)
+            search_filter: Only score rows with these keywords / persons (see filter_index.py)
+            mode: "vector", "lexical" or "hybrid" (default: "search.mode" from config)
 
         Returns:
             List of matches with person, keywords, text, similarity
         """
-        import json
-        from pathlib import Path
-
-        # Get query embedding
-        query_emb = self.embed(query)
-
-        # Load all celebrities and their experiences
-        all_matches = []
-
-        db_path = Path(db_folder)
-        if not db_path.exists():
+        index = load_index(db_folder)
+        if index is None:
             print(f"Warning: Database folder '{db_folder}' not found")
             return []
 
-        for json_file in db_path.glob("*.json"):
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+        mode = mode or self.search_mode
+        if mode == "lexical":
+            return index.lexical_search(query, top_k=top_k, search_filter=search_filter)
+
+        # Get query embedding
+        embeddings = self.embed_queries([query])
+        if embeddings is None:
+            return index.lexical_search(query, top_k=top_k, search_filter=search_filter)
+
+        options = {
+            'top_k': top_k,
+            'engine': engine or self.search_engine,
+            'nprobe': nprobe or self.nprobe,
+            'rescore': rescore or self.rescore,
+            'shortlist': shortlist or self.shortlist,
+            'search_filter': search_filter
+        }
+        if mode == "hybrid":
+            return index.hybrid_search(query, embeddings[0], **options)
+        return index.search(embeddings[0], **options)
+
+    def match_many(
+        self,
+        queries: List[str],
+        db_folder: str = "data/vector_db",
+        top_k: int = 5,
+        engine: Optional[str] = None,
+        nprobe: Optional[int] = None,
+        rescore: Optional[int] = None,
+        shortlist: Optional[int] = None,
+        search_filter: Optional[SearchFilter] = None,
+        mode: Optional[str] = None
+    ) -> List[List[Dict]]:
+        """
+        Find matching experiences for several queries at once
 
-            person = data['person']
+        All distinct queries are embedded through one embed() call (batched
+        upstream requests) and scored together against the resident index.
+        Falls back to lexical mode like match_across_database().
 
-            for exp in data['experiences']:
-                similarity = self.cosine_similarity(query_emb, exp['embedding'])
-                match = {
-                    'person': person,
-                    'keywords': exp['keywords'],
-                    'text': exp['text'],
-                    'similarity': similarity
-                }
-                if 'source_url' in exp:
-                    match['source_url'] = exp['source_url']
-                all_matches.append(match)
+        Args:
+            queries: User experience texts
+            db_folder: Path to vector database folder
+            top_k: Number of top results per query
+            engine, nprobe, rescore, shortlist, search_filter, mode: As in match_across_database()
 
-        # Sort by similarity descending
-        all_matches.sort(key=lambda x: x['similarity'], reverse=True)
+        Returns:
+            One list of matches per query, in input order
+        """
+        index = load_index(db_folder)
+        if index is None:
+            print(f"Warning: Database folder '{db_folder}' not found")
+            return [[] for _ in queries]
+        if not queries:
+            return []
 
-        return all_matches[:top_k]
+        mode = mode or self.search_mode
+        unique = list(dict.fromkeys(queries))
+        unique_embeddings = self.embed_queries(unique) if mode != "lexical" else None
+        if unique_embeddings is None:
+            return [index.lexical_search(query, top_k=top_k, search_filter=search_filter) for query in queries]
+        embeddings = dict(zip(unique, unique_embeddings))
+
+        options = {
+            'top_k': top_k,
+            'engine': engine or self.search_engine,
+            'nprobe': nprobe or self.nprobe,
+            'rescore': rescore or self.rescore,
+            'shortlist': shortlist or self.shortlist,
+            'search_filter': search_filter
+        }
+        if mode == "hybrid":
+            return [index.hybrid_search(query, embeddings[query], **options) for query in queries]
+        return index.search_many([embeddings[query] for query in queries], **options)
 
 
 def main():
@@ -0,0 +1,117 @@
+"""
+Filter Index Module
+
+Inverted index from keyword and from person to the row IDs of a VectorIndex,
+so a search can be restricted to matching rows before anything is scored:
+
+    keyword -> sorted int32 array of row IDs
+    person  -> sorted int32 array of row IDs
+
+A SearchFilter keeps rows that have any of the include keywords AND belong
+to any of the include persons (an empty include list matches every row),
+minus rows with any exclude keyword or belonging to any exclude person.
+Keywords and person names are matched case-insensitively. Posting lists
+are combined in a boolean row bitmap, and the selected rows come back
+sorted, so reads from a memory-mapped matrix stay sequential.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+FILTER_FIELDS = ("include_keywords", "exclude_keywords", "include_persons", "exclude_persons")
+
+
+def normalize_term(term: str) -> str:
+    """Lookup form of a keyword or person name"""
+    return " ".join(term.split()).casefold()
+
+
+@dataclass
+class SearchFilter:
+    """Include/exclude restrictions on the rows a search may return"""
+    include_keywords: List[str] = field(default_factory=list)
+    exclude_keywords: List[str] = field(default_factory=list)
+    include_persons: List[str] = field(default_factory=list)
+    exclude_persons: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return any(getattr(self, name) for name in FILTER_FIELDS)
+
+
+class FilterIndex:
+    """Keyword and person posting lists over the rows of a VectorIndex"""
+
+    def __init__(self, keywords: Dict[str, np.ndarray], persons: Dict[str, np.ndarray], size: int):
+        """
+        Initialize the index
+
+        Args:
+            keywords: Normalized keyword -> sorted row IDs
+            persons: Normalized person name -> sorted row IDs
+            size: Total number of rows
+        """
+        self.keywords = keywords
+        self.persons = persons
+        self.size = size
+
+    @classmethod
+    def build(cls, rows: List[Dict]) -> "FilterIndex":
+        """
+        Build posting lists from row metadata
+
+        Args:
+            rows: Row metadata dicts with 'person' and 'keywords', in row order
+
+        Returns:
+            FilterIndex over the rows
+        """
+        keywords: Dict[str, List[int]] = {}
+        persons: Dict[str, List[int]] = {}
+        for row_id, row in enumerate(rows):
+            persons.setdefault(normalize_term(row['person']), []).append(row_id)
+            for keyword in {normalize_term(keyword) for keyword in row.get('keywords', [])}:
+                keywords.setdefault(keyword, []).append(row_id)
+
+        # Row IDs were appended in increasing order, so every list is already sorted
+        return cls(
+            {keyword: np.array(ids, dtype=np.int32) for keyword, ids in keywords.items()},
+            {person: np.array(ids, dtype=np.int32) for person, ids in persons.items()},
+            len(rows)
+        )
+
+    def _bitmap(self, postings: Dict[str, np.ndarray], terms: List[str]) -> np.ndarray:
+        """Row bitmap of every row in any of the terms' posting lists"""
+        bitmap = np.zeros(self.size, dtype=bool)
+        for term in terms:
+            ids = postings.get(normalize_term(term))
+            if ids is not None:
+                bitmap[ids] = True
+        return bitmap
+
+    def select(self, search_filter: Optional[SearchFilter]) -> Optional[np.ndarray]:
+        """
+        Rows allowed by a filter
+
+        Args:
+            search_filter: Filter to apply (None or an empty filter allows every row)
+
+        Returns:
+            Sorted array of allowed row IDs, or None if every row is allowed
+        """
+        if not search_filter:
+            return None
+
+        allowed = np.ones(self.size, dtype=bool)
+        if search_filter.include_keywords:
+            allowed &= self._bitmap(self.keywords, search_filter.include_keywords)
+        if search_filter.include_persons:
+            allowed &= self._bitmap(self.persons, search_filter.include_persons)
+        if search_filter.exclude_keywords:
+            allowed &= ~self._bitmap(self.keywords, search_filter.exclude_keywords)
+        if search_filter.exclude_persons:
+            allowed &= ~self._bitmap(self.persons, search_filter.exclude_persons)
+
+        return np.flatnonzero(allowed)
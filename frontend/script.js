@@ -70,7 +70,7 @@ function displayResults(matches) {
         <div class="result-card">
             <div class="result-header">
                 <div class="result-person">${index + 1}. ${match.person}</div>
-                <div class="result-similarity">${(match.similarity * 100).toFixed(1)}% match</div>
+                <div class="result-similarity">${match.mode === 'lexical' ? `BM25 ${match.bm25.toFixed(2)}` : `${(match.similarity * 100).toFixed(1)}% match`}</div>
             </div>
 
             ${match.keywords && match.keywords.length > 0 ? `
@@ -0,0 +1,151 @@
+"""
+HTTP Session Module
+
+Pooled keep-alive HTTP client shared by PerplexityTool and EmbeddingTool.
+Connections to openrouter.ai are reused across calls and threads, and every
+request carries connect/read timeouts so a hung upstream cannot block a
+caller forever.
+
+Configured by the optional "http" section of models.json:
+
+    "http": {
+      "pool_size": 16,
+      "connect_timeout": 10,
+      "read_timeout": 120,
+      "retries": 2,
+      "backoff_factor": 0.5,
+      "retry_statuses": [429, 502, 503, 504],
+      "rate_limit": {"requests_per_second": 5, "tokens_per_minute": 1000000}
+    }
+
+Transport retries cover failed connections and the listed statuses (429
+and gateway errors by default, honouring Retry-After). With "rate_limit"
+set, every request also passes through a shared RateLimiter (see
+rate_limiter.py), and 429/5xx answers are retried once the limiter allows.
+This is the only retry layer: callers see the final response and do not
+retry on their own.
+"""
+
+import json
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from rate_limiter import RateLimiter
+
+
+class HTTPClient:
+    """requests.Session with a sized connection pool, retries and default timeouts"""
+
+    def __init__(
+        self,
+        pool_size: int = 16,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 120.0,
+        retries: int = 2,
+        backoff_factor: float = 0.5,
+        retry_statuses: Iterable[int] = (429, 502, 503, 504),
+        rate_limit: Optional[Dict] = None
+    ):
+        """
+        Initialize the client
+
+        Args:
+            pool_size: Keep-alive connections kept per host (match the number of
+                threads issuing requests concurrently)
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait between bytes of the response
+            retries: Transport-level retries for failed connections and retry_statuses
+            backoff_factor: Exponential backoff factor between transport retries
+            retry_statuses: HTTP statuses retried by the transport (without a rate limiter)
+            rate_limit: RateLimiter keyword arguments (None disables rate limiting)
+        """
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+
+        # With a rate limiter, 429/5xx retries go through the limiter instead
+        limited = bool(rate_limit)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=False,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=() if limited else tuple(retry_statuses),
+            allowed_methods=None,
+            respect_retry_after_header=not limited,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.limiter = RateLimiter(**rate_limit) if limited else None
+
+    def request(self, method: str, url: str, tokens: int = 1, **kwargs) -> requests.Response:
+        """
+        Send a request through the pooled session (and the rate limiter, if configured)
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            tokens: Estimated tokens the request consumes, for the tokens/min limit
+            **kwargs: Passed to requests; timeout defaults to the client's timeouts
+
+        Returns:
+            The response
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        if self.limiter is None:
+            return self.session.request(method, url, **kwargs)
+
+        for attempt in range(self.limiter.max_retries + 1):
+            self.limiter.acquire(tokens)
+            response = self.session.request(method, url, **kwargs)
+            throttled = self.limiter.on_response(response.status_code, response.headers.get('Retry-After'))
+            if not throttled or attempt == self.limiter.max_retries:
+                return response
+            print(f"HTTP {response.status_code} from {url}, retrying when the rate limiter allows...")
+        return response
+
+    def post(self, url: str, tokens: int = 1, **kwargs) -> requests.Response:
+        """POST through the pooled session; see request()"""
+        return self.request("POST", url, tokens=tokens, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET through the pooled session; see request()"""
+        return self.request("GET", url, **kwargs)
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+_clients: Dict[str, HTTPClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(http_config: Optional[Dict] = None) -> HTTPClient:
+    """
+    Shared client for a given "http" config, created on first use
+
+    Tools built from the same settings reuse one connection pool, so the
+    Perplexity and embedding calls of a process share keep-alive connections.
+
+    Args:
+        http_config: The "http" section of models.json (defaults if omitted)
+
+    Returns:
+        HTTPClient shared by every caller with the same settings
+    """
+    http_config = http_config or {}
+    key = json.dumps(http_config, sort_keys=True)
+
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = HTTPClient(**http_config)
+        return _clients[key]
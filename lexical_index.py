@@ -0,0 +1,435 @@
+"""
+Lexical Index Module
+
+BM25 inverted index over experience text and keywords, so search can run
+without a query embedding (no network round trip) or fuse lexical and
+vector rankings.
+
+Stage 2 writes each person's term postings next to their binary matrix:
+
+    data/vector_db/index/persons/{person}.terms.npz
+
+and the search path merges them into one index over the corpus rows
+(persons without an up-to-date postings file are tokenized on the fly).
+A packed copy of the merged index loads without any merging:
+
+    data/vector_db/index/bm25.npz (+ bm25.json)
+
+    python lexical_index.py build [data/vector_db]
+
+It is ignored once the vector database changes underneath it, like the
+IVF index. Postings are CSR-style arrays: the rows containing term t are
+row_ids[offsets[t]:offsets[t + 1]], with term frequencies in tfs.
+"""
+
+import json
+import re
+import sys
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vector_store import (
+    PERSONS_DIRNAME, atomic_save_npz, atomic_write_json, index_dir, load_corpus_parts, source_versions
+)
+
+
+BM25_NAME = "bm25"
+TERMS_SUFFIX = ".terms.npz"
+
+# BM25 term-frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+# Reciprocal rank fusion constant: a result at rank r contributes 1 / (RRF_K + r)
+RRF_K = 60
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+STOPWORDS = frozenset("""
+    a about after again all also an and any are as at be because been before being but by
+    can could did do does doing down during each for from further had has have having he her
+    here hers him his how i if in into is it its just me more most my no nor not of off on
+    once only or other our out over own same she should so some such than that the their
+    them then there these they this those through to too under until up very was we were
+    what when where which while who whom why will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens of a text, without stopwords and single characters"""
+    return [
+        token for token in TOKEN_PATTERN.findall(text.casefold())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def document_tokens(row: Dict) -> List[str]:
+    """Tokens indexed for one experience: its text plus its keywords"""
+    return tokenize(row['text']) + tokenize(" ".join(row.get('keywords', [])))
+
+
+def term_postings(rows: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Term frequencies of a list of experiences
+
+    Args:
+        rows: Experiences or row metadata with 'text' and 'keywords'
+
+    Returns:
+        Dict of arrays: 'terms' (sorted vocabulary), 'term_ids', 'row_ids'
+        and 'tfs' (one entry per distinct term of each row, sorted by term
+        then row) and 'lengths' (tokens per row)
+    """
+    tokens = [document_tokens(row) for row in rows]
+    lengths = np.array([len(row_tokens) for row_tokens in tokens], dtype=np.int32)
+
+    terms, inverse = np.unique(np.array(list(chain.from_iterable(tokens)), dtype=str), return_inverse=True)
+    row_of_token = np.repeat(np.arange(len(rows), dtype=np.int64), lengths)
+    keys, tfs = np.unique(inverse.astype(np.int64) * max(len(rows), 1) + row_of_token, return_counts=True)
+
+    return {
+        'terms': terms,
+        'term_ids': (keys // max(len(rows), 1)).astype(np.int32),
+        'row_ids': (keys % max(len(rows), 1)).astype(np.int32),
+        'tfs': tfs.astype(np.int32),
+        'lengths': lengths
+    }
+
+
+def merge_postings(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """
+    Concatenate per-person postings into postings over all their rows
+
+    Args:
+        parts: term_postings() outputs, in row order
+
+    Returns:
+        Postings dict like term_postings(), with row IDs offset by the rows
+        of the preceding parts
+    """
+    if not parts:
+        return term_postings([])
+
+    terms, inverse = np.unique(np.concatenate([part['terms'] for part in parts]), return_inverse=True)
+
+    term_ids = []
+    row_ids = []
+    term_offset = 0
+    row_offset = 0
+    for part in parts:
+        term_ids.append(inverse[term_offset + part['term_ids']])
+        row_ids.append(part['row_ids'] + row_offset)
+        term_offset += len(part['terms'])
+        row_offset += len(part['lengths'])
+
+    term_ids = np.concatenate(term_ids).astype(np.int32)
+    row_ids = np.concatenate(row_ids).astype(np.int32)
+    # Rows already increase across and within parts, so a stable sort by term keeps them sorted
+    order = np.argsort(term_ids, kind='stable')
+
+    return {
+        'terms': terms,
+        'term_ids': term_ids[order],
+        'row_ids': row_ids[order],
+        'tfs': np.concatenate([part['tfs'] for part in parts])[order],
+        'lengths': np.concatenate([part['lengths'] for part in parts])
+    }
+
+
+def terms_path(db_folder: str, stem: str) -> Path:
+    """Path of one person's term postings file"""
+    return index_dir(db_folder) / PERSONS_DIRNAME / f"{stem}{TERMS_SUFFIX}"
+
+
+def write_person_terms(db_folder: str, safe_name: str, experiences: List[Dict]) -> Path:
+    """
+    Write the term postings for one person (Stage 2)
+
+    Args:
+        db_folder: Path to vector database folder
+        safe_name: File stem used for the person (matches {safe_name}.json)
+        experiences: Experiences with 'text' and 'keywords', in row order
+
+    Returns:
+        Path to the written postings file
+    """
+    path = terms_path(db_folder, safe_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_save_npz(path, term_postings(experiences))
+    return path
+
+
+def load_person_terms(db_folder: str, stem: str, rows: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Term postings for one person's rows
+
+    Uses the Stage 2 postings file when it is at least as new as the
+    person's JSON file and covers the same rows, otherwise tokenizes the rows.
+
+    Args:
+        db_folder: Path to vector database folder
+        stem: The person's file stem
+        rows: The person's row metadata, in row order
+
+    Returns:
+        Postings dict (see term_postings)
+    """
+    path = terms_path(db_folder, stem)
+    json_file = Path(db_folder) / f"{stem}.json"
+    try:
+        if path.stat().st_mtime_ns >= json_file.stat().st_mtime_ns:
+            with np.load(path) as data:
+                postings = {name: data[name] for name in data.files}
+            if len(postings['lengths']) == len(rows):
+                return postings
+    except (OSError, KeyError, ValueError):
+        pass
+    return term_postings(rows)
+
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int = RRF_K) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fuse several rankings of row IDs by reciprocal rank
+
+    Args:
+        rankings: Row ID arrays, each best first
+        k: Fusion constant (larger values flatten the rank weights)
+
+    Returns:
+        (row IDs, fused scores), best first
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row_id in enumerate(ranking.tolist(), 1):
+            fused[row_id] = fused.get(row_id, 0.0) + 1.0 / (k + rank)
+
+    ids = np.array(list(fused), dtype=np.int64)
+    scores = np.array(list(fused.values()), dtype=np.float64)
+    order = np.argsort(-scores, kind='stable')
+    return ids[order], scores[order]
+
+
+class BM25Index:
+    """Okapi BM25 inverted index over the rows of a VectorIndex"""
+
+    def __init__(
+        self,
+        terms: np.ndarray,
+        offsets: np.ndarray,
+        row_ids: np.ndarray,
+        tfs: np.ndarray,
+        lengths: np.ndarray,
+        k1: float = K1,
+        b: float = B
+    ):
+        """
+        Initialize the index
+
+        Args:
+            terms: Sorted vocabulary
+            offsets: (len(terms) + 1,) start of each term's postings
+            row_ids: Row IDs of every posting, sorted within each term
+            tfs: Term frequency of every posting
+            lengths: Tokens per row
+            k1: Term-frequency saturation
+            b: Document length normalization
+        """
+        self.terms = terms
+        self.offsets = offsets
+        self.row_ids = row_ids
+        self.tfs = tfs
+        self.lengths = lengths
+        self.k1 = k1
+        self.b = b
+
+        size = len(lengths)
+        df = np.diff(offsets)
+        self.idf = np.log1p((size - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        # The per-posting BM25 term weight is query-independent, so a query
+        # only adds up idf * weight over its terms' postings
+        avgdl = float(lengths.mean()) if size and lengths.sum() else 1.0
+        norm = k1 * (1 - b + b * lengths / avgdl)
+        self.weights = (tfs * (k1 + 1) / (tfs + norm[row_ids])).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    @classmethod
+    def from_postings(cls, postings: Dict[str, np.ndarray]) -> "BM25Index":
+        """Index over postings sorted by term then row (see term_postings)"""
+        offsets = np.searchsorted(postings['term_ids'], np.arange(len(postings['terms']) + 1))
+        return cls(postings['terms'], offsets, postings['row_ids'], postings['tfs'], postings['lengths'])
+
+    @classmethod
+    def build(cls, rows: List[Dict]) -> "BM25Index":
+        """
+        Build the index by tokenizing row metadata
+
+        Args:
+            rows: Row metadata dicts with 'text' and 'keywords', in row order
+
+        Returns:
+            BM25Index over the rows
+        """
+        return cls.from_postings(term_postings(rows))
+
+    @classmethod
+    def assemble(cls, db_folder: str, rows: List[Dict], counts: Optional[Dict[str, int]]) -> "BM25Index":
+        """
+        Merge the per-person postings files of a vector database
+
+        Args:
+            db_folder: Path to vector database folder
+            rows: Row metadata of the loaded corpus
+            counts: Rows per person file stem, in row order (None tokenizes every row)
+
+        Returns:
+            BM25Index over the rows
+        """
+        if counts is None:
+            return cls.build(rows)
+
+        parts = []
+        start = 0
+        for stem, count in counts.items():
+            parts.append(load_person_terms(db_folder, stem, rows[start:start + count]))
+            start += count
+        return cls.from_postings(merge_postings(parts))
+
+    def _query_terms(self, query: str) -> np.ndarray:
+        """Vocabulary IDs of the distinct query tokens present in the index"""
+        tokens = np.array(sorted(set(tokenize(query))), dtype=str)
+        if len(tokens) == 0 or len(self.terms) == 0:
+            return np.empty(0, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.terms, tokens), len(self.terms) - 1)
+        return positions[self.terms[positions] == tokens]
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every row for a query (0 for rows sharing no term)"""
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term_id in self._query_terms(query):
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # Row IDs are unique within a posting list, so fancy-index += is safe
+            scores[self.row_ids[start:end]] += self.idf[term_id] * self.weights[start:end]
+        return scores
+
+    def search(self, query: str, top_k: int = 5, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows with the highest BM25 scores for a query
+
+        Args:
+            query: Query text
+            top_k: Number of rows to return
+            rows: Optional sorted row IDs to restrict the search to
+
+        Returns:
+            (row IDs, scores), best first; rows sharing no term with the
+            query are never returned
+        """
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores) if rows is None else rows[scores[rows] > 0]
+
+        top_k = min(top_k, len(candidates))
+        if top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if top_k < len(candidates):
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return candidates, scores[candidates]
+
+    def save(self, db_folder: str, sources: Dict[str, int]) -> Path:
+        """
+        Persist the index next to the vector database
+
+        Args:
+            db_folder: Path to vector database folder
+            sources: source_versions() of the data the index was built from
+
+        Returns:
+            Path to the saved index
+        """
+        out_dir = index_dir(db_folder)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        path = out_dir / f"{BM25_NAME}.npz"
+        atomic_save_npz(path, {
+            'terms': self.terms,
+            'offsets': self.offsets,
+            'row_ids': self.row_ids,
+            'tfs': self.tfs,
+            'lengths': self.lengths
+        })
+
+        meta = {'k1': self.k1, 'b': self.b, 'sources': sources}
+        atomic_write_json(out_dir / f"{BM25_NAME}.json", meta)
+
+        return path
+
+    @classmethod
+    def load(cls, db_folder: str, sources: Dict[str, int]) -> Optional["BM25Index"]:
+        """
+        Load a persisted index if it was built from the current data
+
+        Args:
+            db_folder: Path to vector database folder
+            sources: source_versions() of the currently loaded data
+
+        Returns:
+            BM25Index, or None if missing or stale
+        """
+        out_dir = index_dir(db_folder)
+        path = out_dir / f"{BM25_NAME}.npz"
+        meta_path = out_dir / f"{BM25_NAME}.json"
+        if not path.exists() or not meta_path.exists():
+            return None
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['sources'] != sources:
+            return None
+
+        with np.load(path) as data:
+            return cls(
+                data['terms'], data['offsets'], data['row_ids'], data['tfs'], data['lengths'],
+                k1=meta['k1'], b=meta['b']
+            )
+
+
+def build_bm25(db_folder: str = "data/vector_db") -> BM25Index:
+    """
+    Build and persist the packed BM25 index for a vector database folder
+
+    Args:
+        db_folder: Path to vector database folder
+
+    Returns:
+        The built BM25Index
+    """
+    sources = source_versions(db_folder)
+    _, rows, counts = load_corpus_parts(db_folder)
+    index = BM25Index.assemble(db_folder, rows, counts)
+    index.save(db_folder, sources)
+    return index
+
+
+def main():
+    """Command line entry point"""
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("Usage: python lexical_index.py build [db_folder]")
+        sys.exit(1)
+
+    db_folder = sys.argv[2] if len(sys.argv) > 2 else "data/vector_db"
+    if not Path(db_folder).exists():
+        print(f"✗ Error: Database folder '{db_folder}' not found")
+        sys.exit(1)
+
+    index = build_bm25(db_folder)
+    print(f"✓ Built BM25 index: {len(index.terms)} terms over {len(index)} rows")
+
+
+if __name__ == "__main__":
+    main()
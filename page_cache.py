@@ -0,0 +1,231 @@
+"""
+Page Cache Module
+
+Global cache of fetched web pages, shared by every person and every run.
+Many people share citation pages (list articles, Wikipedia categories), so
+each page is fetched once and handed to the scraping agent as a local file.
+
+Layout under data/page_cache/:
+
+    urls/{sha256(canonical url)}.json     url, ETag, Last-Modified, content hash, ...
+    blobs/{hash[:2]}/{hash}.gz            gzip-compressed body, addressed by content
+
+Bodies are content-addressed, so identical pages behind different URLs are
+stored once. An entry older than max_age_hours is revalidated with a
+conditional request (If-None-Match / If-Modified-Since); a 304 answer keeps
+the stored body.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from http_session import HTTPClient, get_client
+
+
+USER_AGENT = "Mozilla/5.0 (compatible; biographyScraping/0.1; +https://github.com/shuxueshuxue/biographyScraping)"
+
+# Query parameters that never change page content
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+EXTENSIONS = {
+    "text/html": ".html",
+    "application/xhtml+xml": ".html",
+    "text/plain": ".txt",
+    "application/pdf": ".pdf",
+    "application/json": ".json"
+}
+
+
+def canonical_url(url: str) -> str:
+    """
+    Canonical form of a URL used as its cache key
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters, and sorts the remaining query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not (scheme, parts.port) in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ]
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(sorted(query)), ""))
+
+
+def _atomic_write_bytes(path: Path, data: bytes):
+    """Write via a uniquely named temp file and rename (safe across threads and processes)"""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class CachedPage:
+    """A page held in the cache"""
+    url: str
+    content_hash: str
+    content_type: str
+    fetched_at: float
+    from_cache: bool = False
+
+    @property
+    def extension(self) -> str:
+        """File extension matching the content type"""
+        return EXTENSIONS.get(self.content_type, ".bin")
+
+
+class PageCache:
+    """Content-addressed, compressed cache of fetched pages"""
+
+    def __init__(
+        self,
+        path: str = "data/page_cache",
+        max_age_hours: Optional[float] = 168,
+        http: Optional[HTTPClient] = None
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            path: Cache directory
+            max_age_hours: Age after which entries are revalidated (None never revalidates)
+            http: HTTP client used for fetching (a default pooled client if omitted)
+        """
+        self.path = Path(path)
+        self.max_age_seconds = None if max_age_hours is None else max_age_hours * 3600
+        self.http = http or get_client()
+
+    def _meta_path(self, url: str) -> Path:
+        digest = hashlib.sha256(canonical_url(url).encode('utf-8')).hexdigest()
+        return self.path / "urls" / f"{digest}.json"
+
+    def _blob_path(self, content_hash: str) -> Path:
+        return self.path / "blobs" / content_hash[:2] / f"{content_hash}.gz"
+
+    def _load_meta(self, url: str) -> Optional[Dict]:
+        meta_path = self._meta_path(url)
+        if not meta_path.exists():
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except json.JSONDecodeError:
+            return None
+        if not self._blob_path(meta['content_hash']).exists():
+            return None
+        return meta
+
+    def _save_meta(self, url: str, meta: Dict):
+        meta_path = self._meta_path(url)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write_bytes(meta_path, json.dumps(meta, indent=2).encode('utf-8'))
+
+    def _store(self, url: str, response: requests.Response) -> Dict:
+        """Store a 200 response body and its validators"""
+        body = response.content
+        content_hash = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(content_hash)
+        if not blob_path.exists():
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            _atomic_write_bytes(blob_path, gzip.compress(body))
+
+        meta = {
+            'url': url,
+            'canonical_url': canonical_url(url),
+            'final_url': response.url,
+            'content_hash': content_hash,
+            'content_type': response.headers.get('Content-Type', '').split(';')[0].strip().lower(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'size': len(body),
+            'fetched_at': time.time()
+        }
+        self._save_meta(url, meta)
+        return meta
+
+    def fetch(self, url: str, refresh: bool = False) -> Optional[CachedPage]:
+        """
+        Get a page, from the cache when possible
+
+        Args:
+            url: Page URL
+            refresh: Revalidate even if the entry is younger than max_age_hours
+
+        Returns:
+            CachedPage, or None if the page could not be fetched
+        """
+        meta = self._load_meta(url)
+        if meta is not None and not refresh and (
+            self.max_age_seconds is None or time.time() - meta['fetched_at'] <= self.max_age_seconds
+        ):
+            return self._page(meta, from_cache=True)
+
+        headers = {"User-Agent": USER_AGENT}
+        if meta is not None:
+            if meta.get('etag'):
+                headers["If-None-Match"] = meta['etag']
+            if meta.get('last_modified'):
+                headers["If-Modified-Since"] = meta['last_modified']
+
+        try:
+            response = self.http.get(url, headers=headers)
+        except requests.exceptions.RequestException as e:
+            print(f"      ✗ {url}: {e}")
+            # A stale copy beats no copy
+            return self._page(meta, from_cache=True) if meta is not None else None
+
+        if response.status_code == 304 and meta is not None:
+            meta['fetched_at'] = time.time()
+            self._save_meta(url, meta)
+            return self._page(meta, from_cache=True)
+
+        if response.status_code != 200:
+            print(f"      ✗ {url}: HTTP {response.status_code}")
+            return self._page(meta, from_cache=True) if meta is not None else None
+
+        return self._page(self._store(url, response), from_cache=False)
+
+    @staticmethod
+    def _page(meta: Dict, from_cache: bool) -> CachedPage:
+        return CachedPage(
+            url=meta['url'],
+            content_hash=meta['content_hash'],
+            content_type=meta['content_type'],
+            fetched_at=meta['fetched_at'],
+            from_cache=from_cache
+        )
+
+    def read(self, page: CachedPage) -> bytes:
+        """Decompressed body of a cached page"""
+        with gzip.open(self._blob_path(page.content_hash), 'rb') as f:
+            return f.read()
+
+    def materialize(self, page: CachedPage, dest: Path) -> Path:
+        """
+        Write a cached page's body to a local file
+
+        Args:
+            page: Page returned by fetch()
+            dest: Destination path
+
+        Returns:
+            The destination path
+        """
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write_bytes(dest, self.read(page))
+        return dest
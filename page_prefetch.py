@@ -0,0 +1,191 @@
+"""
+Page Prefetch Module
+
+Deterministic, non-LLM step between CitationFetcher and DeepScraper: fetch
+every citation URL concurrently through the page cache (bounded per host),
+strip boilerplate with BeautifulSoup and write the clean text to
+sources/source_N.txt in the person's directory. The scraping agent then
+only reads local text files and extracts experiences.
+
+Pages that cannot be turned into text here (e.g. PDFs) are written as raw
+files to pages/page_N.<ext> for the agent to read.
+"""
+
+import contextvars
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup
+
+from page_cache import PageCache
+
+
+# Elements that hold navigation, scripts and other non-content text
+BOILERPLATE_TAGS = (
+    "script", "style", "noscript", "template", "iframe", "svg", "canvas",
+    "nav", "header", "footer", "aside", "form", "button", "select"
+)
+
+# Elements that end a line of text
+BLOCK_TAGS = (
+    "p", "div", "section", "article", "li", "dd", "dt", "tr", "td", "th",
+    "blockquote", "pre", "table", "ul", "ol", "br", "h1", "h2", "h3", "h4", "h5", "h6"
+)
+
+HEADING_TAGS = ("h1", "h2", "h3", "h4")
+
+# Lines shorter than this that look like menu entries are dropped
+MIN_LINE_CHARS = 25
+
+TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain", "")
+
+
+@dataclass
+class SourceFile:
+    """Local copy of one citation URL"""
+    index: int
+    url: str
+    path: Optional[str] = None
+    title: str = ""
+    chars: int = 0
+    from_cache: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.path is not None
+
+
+def extract_text(html: bytes) -> Tuple[str, str]:
+    """
+    Title and main text of an HTML page with boilerplate removed
+
+    Scripts, navigation, headers, footers and forms are dropped; when the page
+    has an <article> or <main> element only that part is kept. Headings are
+    kept as "# " lines; other short lines without sentence punctuation (menu
+    entries, buttons) are skipped.
+
+    Args:
+        html: Raw page body
+
+    Returns:
+        (title, text)
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.title.get_text(" ", strip=True) if soup.title else ""
+
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+
+    root = soup.find("article") or soup.find("main") or soup.body or soup
+
+    # Source line breaks are layout only; lines end at block elements
+    for string in root.find_all(string=True):
+        string.replace_with(re.sub(r"\s+", " ", string))
+    for tag in root.find_all(HEADING_TAGS):
+        tag.insert(0, "# ")
+    for tag in root.find_all(BLOCK_TAGS):
+        tag.append("\n")
+
+    lines = []
+    for line in root.get_text().splitlines():
+        line = re.sub(r"\s+", " ", line).strip()
+        if not line or line == "#":
+            continue
+        if len(line) < MIN_LINE_CHARS and not line.startswith("# ") and not re.search(r"[.!?:]$", line):
+            continue
+        lines.append(line)
+
+    return title, "\n".join(lines)
+
+
+class PagePrefetcher:
+    """Fetches citation URLs concurrently and writes clean text files"""
+
+    def __init__(self, page_cache: PageCache, max_workers: int = 8, per_host: int = 2):
+        """
+        Initialize the prefetcher
+
+        Args:
+            page_cache: Cache every page is fetched through
+            max_workers: Pages fetched concurrently
+            per_host: Max concurrent fetches to one host
+        """
+        self.page_cache = page_cache
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+
+    def _slot(self, url: str) -> threading.Semaphore:
+        host = (urlsplit(url).hostname or "").lower()
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.Semaphore(self.per_host)
+            return self._host_slots[host]
+
+    def _fetch_one(self, index: int, url: str, output_dir: Path) -> SourceFile:
+        source = SourceFile(index, url)
+        with self._slot(url):
+            page = self.page_cache.fetch(url)
+        if page is None:
+            return source
+        source.from_cache = page.from_cache
+
+        if page.content_type not in TEXT_TYPES:
+            dest = self.page_cache.materialize(page, output_dir / "pages" / f"page_{index}{page.extension}")
+            source.path = str(dest.relative_to(output_dir))
+            return source
+
+        body = self.page_cache.read(page)
+        if page.content_type == "text/plain":
+            title, text = "", body.decode("utf-8", errors="replace").strip()
+        else:
+            title, text = extract_text(body)
+        if not text:
+            return source
+
+        dest = output_dir / "sources" / f"source_{index}.txt"
+        with open(dest, 'w', encoding='utf-8') as f:
+            f.write(f"URL: {url}\n")
+            if title:
+                f.write(f"Title: {title}\n")
+            f.write("=" * 80 + "\n\n")
+            f.write(text + "\n")
+
+        source.path = str(dest.relative_to(output_dir))
+        source.title = title
+        source.chars = len(text)
+        return source
+
+    def prefetch(self, urls: List[str], output_dir: str) -> List[SourceFile]:
+        """
+        Fetch and extract every URL into output_dir
+
+        Previous sources/ and pages/ directories are replaced, so file numbers
+        always match positions in urls.
+
+        Args:
+            urls: Citation URLs, in order
+            output_dir: Absolute output directory (the agent's working directory)
+
+        Returns:
+            SourceFile per URL, in input order
+        """
+        output_dir = Path(output_dir)
+        for name in ("sources", "pages"):
+            shutil.rmtree(output_dir / name, ignore_errors=True)
+        (output_dir / "sources").mkdir(parents=True, exist_ok=True)
+
+        # Each fetch runs in a copy of the caller's context (keeps its output label)
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._fetch_one, i, url, output_dir)
+                for i, url in enumerate(urls, 1)
+            ]
+            return [future.result() for future in futures]
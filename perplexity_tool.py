@@ -5,11 +5,12 @@ This module provides a wrapper for the Perplexity Sonar API through OpenRouter,
 specifically designed to extract both content and citation links from responses.
 """
 
-import requests
 import json
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from http_session import get_client
+
 
 @dataclass
 class Citation:
@@ -60,6 +61,9 @@ class PerplexityTool:
         self.api_key = self.sonar_config['api_key']
         self.model = self.sonar_config['model']
 
+        # Pooled keep-alive session with timeouts ("http": {...})
+        self.http = get_client(config.get('http'))
+
     def query(self,
               prompt: str,
               system_prompt: Optional[str] = None,
@@ -94,7 +98,9 @@ class PerplexityTool:
             "temperature": temperature
         }
 
-        response = requests.post(self.endpoint, headers=headers, json=payload)
+        # Prompt tokens estimated at ~4 characters each, for the rate limiter
+        tokens = max(1, sum(len(message["content"]) for message in messages) // 4)
+        response = self.http.post(self.endpoint, tokens=tokens, headers=headers, json=payload)
         response.raise_for_status()
 
         return self._parse_response(response.json())
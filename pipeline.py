@@ -0,0 +1,263 @@
+"""
+Pipeline Module
+
+In-process runner for Stage 1 (scraping) and Stage 2 (embedding). One set
+of tool instances (CitationFetcher, DeepScraper, EmbeddingTool) and their
+HTTP sessions is shared across every person, instead of starting a fresh
+interpreter per person and stage.
+
+Usage:
+    from pipeline import run_pipeline
+
+    results = run_pipeline(["Steve Jobs", "Oprah Winfrey"], workers=2)
+    for result in results:
+        print(result.person, result.success, result.timings)
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from run_manifest import RunManifest
+
+
+STAGES = ("stage1", "stage2")
+
+# Person label of the current context, read by LabeledOutput
+_output_label: ContextVar[Optional[str]] = ContextVar("output_label", default=None)
+
+
+@dataclass
+class StageResult:
+    """Outcome of one stage for one person"""
+    stage: str
+    success: bool
+    seconds: float = 0.0
+    skipped: bool = False
+    error: Optional[str] = None
+
+
+@dataclass
+class PersonResult:
+    """Outcome of every requested stage for one person"""
+    person: str
+    stages: List[StageResult] = field(default_factory=list)
+
+    @property
+    def success(self) -> bool:
+        return all(stage.success for stage in self.stages)
+
+    @property
+    def timings(self) -> Dict[str, float]:
+        """Seconds spent per stage (0 for skipped stages)"""
+        return {stage.stage: stage.seconds for stage in self.stages}
+
+
+class LabeledOutput:
+    """
+    stdout proxy that prefixes each line with the current label
+
+    Used in parallel mode so output from concurrent people stays readable.
+    The label lives in a context variable, so pool tasks submitted through
+    contextvars.copy_context().run inherit their person's label. Output is
+    buffered per thread and written one whole line at a time, so lines from
+    different threads never mix.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def set_label(self, label: Optional[str]):
+        """Set the label for the calling context (None to stop labeling)"""
+        self.flush()
+        _output_label.set(label)
+
+    def _format(self, line: str) -> str:
+        label = _output_label.get()
+        return f"{line}\n" if label is None else f"[{label}] {line}\n"
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, 'buffer', "") + text
+        *lines, self._local.buffer = buffer.split("\n")
+        if lines:
+            with self._lock:
+                self.stream.write("".join(self._format(line) for line in lines))
+        return len(text)
+
+    def flush(self):
+        buffer = getattr(self._local, 'buffer', "")
+        if buffer:
+            self._local.buffer = ""
+            with self._lock:
+                self.stream.write(self._format(buffer))
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class Pipeline:
+    """Shared tool instances plus per-stage runners"""
+
+    def __init__(
+        self,
+        config_path: str = "models.json",
+        manifest: Optional[RunManifest] = None,
+        refresh_citations: bool = False
+    ):
+        """
+        Initialize the pipeline (tools are created lazily on first use)
+
+        Args:
+            config_path: Path to the JSON config file containing API credentials
+            manifest: Optional run manifest used to skip up-to-date stages
+            refresh_citations: Bypass the citation cache in Stage 1
+        """
+        self.config_path = config_path
+        self.manifest = manifest
+        self.refresh_citations = refresh_citations
+        self._tools = {}
+        self._tools_lock = threading.Lock()
+
+    def _tool(self, name: str):
+        """Create a tool once and reuse it for every person"""
+        with self._tools_lock:
+            if name not in self._tools:
+                if name == "fetcher":
+                    from citation_fetcher import CitationFetcher
+                    self._tools[name] = CitationFetcher(self.config_path)
+                elif name == "scraper":
+                    from deep_scraper import DeepScraper
+                    self._tools[name] = DeepScraper(self.config_path)
+                else:
+                    from embedding_tool import EmbeddingTool
+                    self._tools[name] = EmbeddingTool(self.config_path)
+            return self._tools[name]
+
+    def _execute(self, person: str, stage: str):
+        """Run a single stage's library function"""
+        if stage == "stage1":
+            from stage1_scrape import scrape_person
+            scrape_person(
+                person,
+                fetcher=self._tool("fetcher"),
+                scraper=self._tool("scraper"),
+                refresh_citations=self.refresh_citations
+            )
+        else:
+            from stage2_embed import embed_person
+            embed_person(person, embedder=self._tool("embedder"))
+
+    def run_stage(self, person: str, stage: str, force: bool = False) -> StageResult:
+        """
+        Run one stage for one person, unless the manifest shows it is up to date
+
+        Args:
+            person: Person's name
+            stage: "stage1" or "stage2"
+            force: Ignore the manifest and always run
+
+        Returns:
+            StageResult with timing and error (if any)
+        """
+        if self.manifest is not None and not force and self.manifest.is_up_to_date(person, stage):
+            print(f"\n✓ [{stage}] {person}: up to date, skipping")
+            return StageResult(stage, True, skipped=True)
+
+        started_at = RunManifest.start()
+        start = time.perf_counter()
+        error = None
+        try:
+            self._execute(person, stage)
+            success = True
+        except Exception as e:
+            print(f"\n❌ ERROR: {e}")
+            error = str(e)
+            success = False
+        seconds = time.perf_counter() - start
+
+        if self.manifest is not None:
+            recorded = self.manifest.record(person, stage, success, started_at)
+            if success and not recorded:
+                error = "stage finished without producing its output files"
+                success = False
+
+        return StageResult(stage, success, seconds=seconds, error=error)
+
+
+def run_pipeline(
+    people: Iterable[str],
+    stages: Iterable[str] = STAGES,
+    workers: int = 1,
+    stage1_workers: Optional[int] = None,
+    stage2_workers: Optional[int] = None,
+    manifest: Optional[RunManifest] = None,
+    force: Iterable[str] = (),
+    config_path: str = "models.json",
+    refresh_citations: bool = False
+) -> List[PersonResult]:
+    """
+    Run the requested stages for every person, reusing one set of tools
+
+    Args:
+        people: Names to process
+        stages: Stages to run, in order ("stage1", "stage2")
+        workers: Number of people processed concurrently
+        stage1_workers: Max concurrent Stage 1 runs (default: workers)
+        stage2_workers: Max concurrent Stage 2 runs (default: workers)
+        manifest: Optional run manifest for skipping and recording stages
+        force: People whose stages always run, ignoring the manifest
+        config_path: Path to the JSON config file
+        refresh_citations: Bypass the citation cache in Stage 1
+
+    Returns:
+        List of PersonResult in the same order as people
+    """
+    people = list(people)
+    stages = [stage for stage in STAGES if stage in set(stages)]
+    force = set(force)
+    parallel = workers > 1
+
+    pipeline = Pipeline(config_path, manifest=manifest, refresh_citations=refresh_citations)
+    slots = {
+        "stage1": threading.Semaphore(stage1_workers or workers),
+        "stage2": threading.Semaphore(stage2_workers or workers)
+    }
+
+    output = LabeledOutput(sys.stdout) if parallel else None
+
+    def process(i: int, person: str) -> PersonResult:
+        if output is not None:
+            output.set_label(person)
+
+        print(f"\n\n{'#'*80}\n# [{i}/{len(people)}] Processing: {person}\n{'#'*80}\n")
+        result = PersonResult(person)
+        for stage in stages:
+            with slots[stage]:
+                stage_result = pipeline.run_stage(person, stage, force=person in force)
+            result.stages.append(stage_result)
+            if not stage_result.success:
+                print(f"\n❌ {stage} failed for {person}. Skipping remaining stages.")
+                break
+        else:
+            print(f"\n✓ Successfully processed {person}")
+
+        if output is not None:
+            output.set_label(None)
+        return result
+
+    original_stdout = sys.stdout
+    if output is not None:
+        sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process, i, person) for i, person in enumerate(people, 1)]
+            return [future.result() for future in futures]
+    finally:
+        sys.stdout = original_stdout
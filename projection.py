@@ -0,0 +1,233 @@
+"""
+Projection Module
+
+Low-dimensional copy of the vector database for a two-stage search. The
+first pass scores the whole corpus in k dimensions to shortlist candidates;
+the second pass reranks the shortlist with full-width cosine similarity.
+
+Two projections are supported:
+    pca     top-k principal directions of the (uncentered) corpus, so dot
+            products in the projected space approximate full dot products
+    prefix  the first k coordinates, for Matryoshka-trained embeddings such
+            as text-embedding-3-small
+
+Build it from Stage 2 after embedding:
+
+    python stage2_embed.py --build-projection [--dims 128] [--method pca|prefix]
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from vector_store import atomic_save_npy, atomic_write_json, index_dir, load_corpus, source_versions
+
+
+PROJECTION_NAME = "projection"
+PROJECTION_METHODS = ("pca", "prefix")
+
+
+class ProjectionIndex:
+    """Projection basis plus the projected corpus matrix"""
+
+    def __init__(self, basis: np.ndarray, projected: np.ndarray, method: str = "pca", shortlist: int = 200):
+        """
+        Initialize the index
+
+        Args:
+            basis: (d, k) projection basis
+            projected: (n, k) projected corpus rows
+            method: "pca" or "prefix"
+            shortlist: Default number of candidates reranked at full width
+        """
+        self.basis = basis
+        self.projected = projected
+        self.method = method
+        self.shortlist = shortlist
+
+    @property
+    def dims(self) -> int:
+        return self.basis.shape[1]
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        dims: int = 128,
+        method: str = "pca",
+        max_train: int = 50000,
+        seed: int = 0,
+        chunk_size: int = 65536
+    ) -> "ProjectionIndex":
+        """
+        Fit a projection and project every row
+
+        Args:
+            matrix: (n, d) matrix of normalized rows
+            dims: Projection width k
+            method: "pca" or "prefix"
+            max_train: Maximum rows sampled to fit the PCA basis
+            seed: Random seed for sampling
+            chunk_size: Rows projected at a time
+
+        Returns:
+            ProjectionIndex over the matrix
+        """
+        if method not in PROJECTION_METHODS:
+            raise ValueError(f"method must be one of: {', '.join(PROJECTION_METHODS)}")
+
+        n, d = matrix.shape
+        dims = min(dims, d)
+
+        if method == "prefix":
+            basis = np.eye(d, dims, dtype=np.float32)
+        else:
+            rng = np.random.default_rng(seed)
+            if n > max_train:
+                sample = np.asarray(matrix[np.sort(rng.choice(n, size=max_train, replace=False))], dtype=np.float32)
+            else:
+                sample = np.asarray(matrix, dtype=np.float32)
+            # Eigenvectors of the second-moment matrix, largest first
+            eigenvalues, eigenvectors = np.linalg.eigh(sample.T @ sample)
+            basis = eigenvectors[:, np.argsort(eigenvalues)[::-1][:dims]].astype(np.float32)
+
+        projected = np.empty((n, dims), dtype=np.float32)
+        for start in range(0, n, chunk_size):
+            projected[start:start + chunk_size] = np.asarray(matrix[start:start + chunk_size]) @ basis
+
+        return cls(np.ascontiguousarray(basis), projected, method=method)
+
+    def remapped(self, matrix: np.ndarray, previous: np.ndarray) -> "ProjectionIndex":
+        """
+        Projection of a changed corpus, keeping the fitted basis
+
+        Args:
+            matrix: (n, d) matrix of normalized rows of the new corpus
+            previous: (n,) row ID of each new row in this index, or -1 for new rows
+
+        Returns:
+            ProjectionIndex over the new corpus
+        """
+        projected = np.empty((len(matrix), self.dims), dtype=np.float32)
+        kept = previous >= 0
+        projected[kept] = self.projected[previous[kept]]
+        fresh = np.flatnonzero(~kept)
+        if len(fresh):
+            projected[fresh] = np.asarray(matrix[fresh], dtype=np.float32) @ self.basis
+        return ProjectionIndex(self.basis, projected, method=self.method, shortlist=self.shortlist)
+
+    def candidates(
+        self,
+        query: np.ndarray,
+        shortlist: Optional[int] = None,
+        rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Row IDs of the best first-pass matches in the projected space
+
+        Args:
+            query: Normalized full-width query vector
+            shortlist: Number of candidates (default: self.shortlist)
+            rows: Sorted row IDs to choose from instead of every row
+
+        Returns:
+            Array of candidate row IDs
+        """
+        projected = self.projected if rows is None else self.projected[rows]
+        scores = np.asarray(projected @ (query @ self.basis))
+        count = min(shortlist or self.shortlist, len(scores))
+        if count < len(scores):
+            best = np.argpartition(-scores, count - 1)[:count]
+        else:
+            best = np.arange(len(scores))
+        return best if rows is None else rows[best]
+
+    def save(self, db_folder: str, sources: Dict[str, int]) -> Path:
+        """
+        Persist the basis and projected matrix next to the vector database
+
+        Args:
+            db_folder: Path to vector database folder
+            sources: source_versions() of the data the index was built from
+
+        Returns:
+            Path to the saved projected matrix
+        """
+        out_dir = index_dir(db_folder)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        projected_path = out_dir / f"{PROJECTION_NAME}_matrix.npy"
+        atomic_save_npy(projected_path, self.projected)
+        atomic_save_npy(out_dir / f"{PROJECTION_NAME}_basis.npy", self.basis)
+        atomic_write_json(out_dir / f"{PROJECTION_NAME}.json", {
+            'method': self.method,
+            'dims': self.dims,
+            'shortlist': self.shortlist,
+            'sources': sources
+        })
+
+        return projected_path
+
+    @classmethod
+    def load(cls, db_folder: str, sources: Dict[str, int], warn: bool = True) -> Optional["ProjectionIndex"]:
+        """
+        Memory-map a persisted projection if it was built from the current data
+
+        Args:
+            db_folder: Path to vector database folder
+            sources: source_versions() of the currently loaded data
+            warn: Print a warning when the persisted index is stale
+
+        Returns:
+            ProjectionIndex, or None if missing or stale
+        """
+        out_dir = index_dir(db_folder)
+        projected_path = out_dir / f"{PROJECTION_NAME}_matrix.npy"
+        meta_path = out_dir / f"{PROJECTION_NAME}.json"
+        if not projected_path.exists() or not meta_path.exists():
+            return None
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['sources'] != sources:
+            if warn:
+                print(f"Warning: {projected_path} is out of date; rebuild with: python stage2_embed.py --build-projection")
+            return None
+
+        return cls(
+            np.load(out_dir / f"{PROJECTION_NAME}_basis.npy"),
+            np.load(projected_path, mmap_mode='r'),
+            method=meta['method'],
+            shortlist=meta['shortlist']
+        )
+
+
+def build_projection(
+    db_folder: str = "data/vector_db",
+    dims: int = 128,
+    method: str = "pca",
+    shortlist: int = 200
+) -> ProjectionIndex:
+    """
+    Build and persist the projection index for a vector database folder
+
+    Args:
+        db_folder: Path to vector database folder
+        dims: Projection width
+        method: "pca" or "prefix"
+        shortlist: Default number of candidates reranked per query
+
+    Returns:
+        The built ProjectionIndex
+    """
+    sources = source_versions(db_folder)
+    matrix, _ = load_corpus(db_folder)
+    if len(matrix) == 0:
+        raise ValueError(f"No experiences found in {db_folder}")
+
+    index = ProjectionIndex.build(matrix, dims=dims, method=method)
+    index.shortlist = shortlist
+    index.save(db_folder, sources)
+    return index
@@ -0,0 +1,319 @@
+"""
+Scalar Quantization Module
+
+Int8 copy of the vector database for memory-light search. Each dimension
+is scaled by its largest absolute value across the corpus and rounded to
+int8, so a 1536-dim experience takes ~1.5 KB instead of 6 KB (float32).
+
+Search scores every row by the dot product of its int8 codes with an int8
+quantized query, then rescores the best few hundred candidates against the
+full-precision vectors in the packed corpus matrix, which is memory-mapped
+and only paged in for those rows.
+
+    python quantization.py build [data/vector_db]
+    python quantization.py eval [data/vector_db] [--queries N] [--top N]
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from vector_store import (
+    atomic_save_npy, atomic_write_json, index_dir, load_corpus, pack_corpus, source_versions
+)
+
+
+INT8_NAME = "int8"
+
+
+def _encode(rows: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """int8 codes of normalized rows for per-dimension scales"""
+    return np.clip(np.rint(np.asarray(rows, dtype=np.float32) / scales), -127, 127).astype(np.int8)
+
+
+class ScalarQuantizedIndex:
+    """Per-dimension scaled int8 codes for every corpus row"""
+
+    def __init__(self, codes: np.ndarray, scales: np.ndarray, rescore: int = 200):
+        """
+        Initialize the index
+
+        Args:
+            codes: (n, d) int8 codes
+            scales: (d,) float32 per-dimension scale (value = code * scale)
+            rescore: Default number of candidates rescored at full precision
+        """
+        self.codes = codes
+        self.scales = scales
+        self.rescore = rescore
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, chunk_size: int = 65536) -> "ScalarQuantizedIndex":
+        """
+        Quantize a matrix of normalized rows
+
+        Args:
+            matrix: (n, d) float matrix
+            chunk_size: Rows converted at a time
+
+        Returns:
+            ScalarQuantizedIndex over the matrix
+        """
+        max_abs = np.zeros(matrix.shape[1], dtype=np.float32)
+        for start in range(0, len(matrix), chunk_size):
+            chunk = np.abs(np.asarray(matrix[start:start + chunk_size], dtype=np.float32))
+            max_abs = np.maximum(max_abs, chunk.max(axis=0))
+
+        scales = max_abs / 127.0
+        scales[scales == 0] = 1.0
+
+        codes = np.empty(matrix.shape, dtype=np.int8)
+        for start in range(0, len(matrix), chunk_size):
+            codes[start:start + chunk_size] = _encode(matrix[start:start + chunk_size], scales)
+
+        return cls(codes, scales.astype(np.float32))
+
+    def remapped(self, matrix: np.ndarray, previous: np.ndarray) -> "ScalarQuantizedIndex":
+        """
+        Codes for a changed corpus, keeping the existing scales
+
+        Rows carried over keep their codes; new rows are encoded with the
+        current scales (values beyond them are clipped until a rebuild).
+
+        Args:
+            matrix: (n, d) matrix of normalized rows of the new corpus
+            previous: (n,) row ID of each new row in this index, or -1 for new rows
+
+        Returns:
+            ScalarQuantizedIndex over the new corpus
+        """
+        codes = np.empty(matrix.shape, dtype=np.int8)
+        kept = previous >= 0
+        codes[kept] = self.codes[previous[kept]]
+        fresh = np.flatnonzero(~kept)
+        if len(fresh):
+            codes[fresh] = _encode(matrix[fresh], self.scales)
+        return ScalarQuantizedIndex(codes, self.scales, rescore=self.rescore)
+
+    def quantize_query(self, query: np.ndarray) -> np.ndarray:
+        """
+        Fold the per-dimension scales into the query and round it to int8
+
+        The integer dot product with the codes is then proportional to the
+        approximate cosine similarity.
+        """
+        weighted = query * self.scales
+        max_abs = np.abs(weighted).max()
+        if max_abs == 0:
+            return np.zeros_like(weighted, dtype=np.int8)
+        return np.rint(weighted * (127.0 / max_abs)).astype(np.int8)
+
+    def scores(
+        self,
+        query: np.ndarray,
+        chunk_size: int = 16384,
+        rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Approximate scores for every row from int8 code dot products
+
+        Codes are widened to float32 one chunk at a time so the product runs
+        on BLAS; every term is a small integer, so only the final sums of
+        very long vectors can round.
+
+        Args:
+            query: Normalized query vector
+            chunk_size: Rows widened at a time
+            rows: Sorted row IDs to score instead of every row
+
+        Returns:
+            (n,) or (len(rows),) float32 array of scores (only their order is meaningful)
+        """
+        qcode = self.quantize_query(query).astype(np.float32)
+        total = len(self.codes) if rows is None else len(rows)
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, chunk_size):
+            if rows is None:
+                chunk = self.codes[start:start + chunk_size]
+            else:
+                chunk = self.codes[rows[start:start + chunk_size]]
+            scores[start:start + chunk_size] = chunk.astype(np.float32) @ qcode
+        return scores
+
+    def candidates(
+        self,
+        query: np.ndarray,
+        rescore: Optional[int] = None,
+        rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Row IDs of the best approximate matches to rescore at full precision
+
+        Args:
+            query: Normalized query vector
+            rescore: Number of candidates (default: self.rescore)
+            rows: Sorted row IDs to choose from instead of every row
+
+        Returns:
+            Array of candidate row IDs
+        """
+        scores = self.scores(query, rows=rows)
+        count = min(rescore or self.rescore, len(scores))
+        if count < len(scores):
+            best = np.argpartition(-scores, count - 1)[:count]
+        else:
+            best = np.arange(len(scores))
+        return best if rows is None else rows[best]
+
+    def save(self, db_folder: str, sources: Dict[str, int]) -> Path:
+        """
+        Persist codes and scales next to the vector database
+
+        Args:
+            db_folder: Path to vector database folder
+            sources: source_versions() of the data the index was built from
+
+        Returns:
+            Path to the saved codes
+        """
+        out_dir = index_dir(db_folder)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        codes_path = out_dir / f"{INT8_NAME}_codes.npy"
+        atomic_save_npy(codes_path, self.codes)
+        atomic_save_npy(out_dir / f"{INT8_NAME}_scales.npy", self.scales)
+        atomic_write_json(out_dir / f"{INT8_NAME}.json", {'rescore': self.rescore, 'sources': sources})
+
+        return codes_path
+
+    @classmethod
+    def load(cls, db_folder: str, sources: Dict[str, int], warn: bool = True) -> Optional["ScalarQuantizedIndex"]:
+        """
+        Memory-map a persisted index if it was built from the current data
+
+        Args:
+            db_folder: Path to vector database folder
+            sources: source_versions() of the currently loaded data
+            warn: Print a warning when the persisted index is stale
+
+        Returns:
+            ScalarQuantizedIndex, or None if missing or stale
+        """
+        out_dir = index_dir(db_folder)
+        codes_path = out_dir / f"{INT8_NAME}_codes.npy"
+        meta_path = out_dir / f"{INT8_NAME}.json"
+        if not codes_path.exists() or not meta_path.exists():
+            return None
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['sources'] != sources:
+            if warn:
+                print(f"Warning: {codes_path} is out of date; rebuild with: python quantization.py build")
+            return None
+
+        codes = np.load(codes_path, mmap_mode='r')
+        scales = np.load(out_dir / f"{INT8_NAME}_scales.npy")
+        return cls(codes, scales, rescore=meta['rescore'])
+
+
+def build_int8(db_folder: str = "data/vector_db", rescore: int = 200) -> ScalarQuantizedIndex:
+    """
+    Build and persist the int8 index for a vector database folder
+
+    The corpus is packed first so rescoring reads full-precision rows from
+    the memory-mapped corpus file instead of holding them in RAM.
+
+    Args:
+        db_folder: Path to vector database folder
+        rescore: Default number of candidates rescored per query
+
+    Returns:
+        The built ScalarQuantizedIndex
+    """
+    pack_corpus(db_folder)
+    sources = source_versions(db_folder)
+    matrix, _ = load_corpus(db_folder)
+    if len(matrix) == 0:
+        raise ValueError(f"No experiences found in {db_folder}")
+
+    index = ScalarQuantizedIndex.build(matrix)
+    index.rescore = rescore
+    index.save(db_folder, sources)
+    return index
+
+
+def evaluate(db_folder: str = "data/vector_db", queries: int = 100, top_k: int = 10) -> Dict[str, float]:
+    """
+    Compare int8 search with exact search, using corpus rows as queries
+
+    Args:
+        db_folder: Path to vector database folder
+        queries: Number of sampled query rows
+        top_k: Result list length compared
+
+    Returns:
+        Dict with mean 'recall' of the exact top-k and 'max_similarity_error'
+        between the k-th exact and k-th int8 similarity
+    """
+    from vector_index import VectorIndex
+
+    index = VectorIndex.from_folder(db_folder)
+    if index.quantized is None:
+        raise ValueError("No up-to-date int8 index; run: python quantization.py build")
+
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(index), size=min(queries, len(index)), replace=False)
+
+    recalls = []
+    max_error = 0.0
+    for row_id in sample:
+        # Perturb the row so the query is not an exact corpus member
+        query = np.asarray(index.matrix[row_id]) + rng.normal(scale=0.02, size=index.matrix.shape[1])
+        exact = index.search(query, top_k=top_k, engine="exact")
+        approx = index.search(query, top_k=top_k, engine="int8")
+
+        exact_texts = {(m['person'], m['text']) for m in exact}
+        approx_texts = {(m['person'], m['text']) for m in approx}
+        recalls.append(len(exact_texts & approx_texts) / len(exact))
+        max_error = max(max_error, abs(exact[-1]['similarity'] - approx[-1]['similarity']))
+
+    return {'recall': float(np.mean(recalls)), 'max_similarity_error': max_error}
+
+
+def main():
+    """Command line entry point"""
+    if len(sys.argv) < 2 or sys.argv[1] not in ("build", "eval"):
+        print("Usage: python quantization.py build [db_folder] [--rescore N]")
+        print("       python quantization.py eval [db_folder] [--queries N] [--top N]")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    args = sys.argv[2:]
+    options = {}
+    for flag in ("--rescore", "--queries", "--top"):
+        if flag in args:
+            i = args.index(flag)
+            options[flag.lstrip('-')] = int(args[i + 1])
+            del args[i:i + 2]
+    db_folder = args[0] if args else "data/vector_db"
+
+    if not Path(db_folder).exists():
+        print(f"✗ Error: Database folder '{db_folder}' not found")
+        sys.exit(1)
+
+    if command == "build":
+        index = build_int8(db_folder, rescore=options.get('rescore', 200))
+        size_mb = index.codes.nbytes / (1024 * 1024)
+        print(f"✓ Built int8 index: {index.codes.shape[0]} rows, {size_mb:.1f} MB (rescore={index.rescore})")
+    else:
+        result = evaluate(db_folder, queries=options.get('queries', 100), top_k=options.get('top', 10))
+        print(f"✓ Recall@{options.get('top', 10)} vs exact: {result['recall']:.4f}")
+        print(f"✓ Max k-th similarity error: {result['max_similarity_error']:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Rate Limiter Module
+
+Token-bucket limiter for OpenRouter calls, with two buckets: requests per
+second and (estimated) tokens per minute. Throttled or failing responses
+(429/5xx) halve the allowed rate and successes raise it again in small steps
+(AIMD); a Retry-After header pauses every caller until it expires.
+
+State can live in a small JSON file guarded by an flock'ed lock file, so
+every thread and every process on the machine (parallel ingests, API
+server workers) draws from the same buckets. Without a state file the
+limiter is shared by the threads of one process only.
+
+Configured by "http": {"rate_limit": {...}} in models.json:
+
+    "rate_limit": {
+      "requests_per_second": 5,
+      "tokens_per_minute": 1000000,
+      "state_file": "data/openrouter_rate_limit.json",
+      "max_retries": 4
+    }
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to per-process state
+    fcntl = None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP date)
+
+    Args:
+        value: Header value, or None
+
+    Returns:
+        Non-negative seconds, or None if absent or unparseable
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Requests/sec and tokens/min buckets with AIMD backoff"""
+
+    def __init__(
+        self,
+        requests_per_second: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        state_file: Optional[str] = None,
+        max_retries: int = 4,
+        min_fraction: float = 0.05,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        backoff: float = 1.0
+    ):
+        """
+        Initialize the limiter
+
+        Args:
+            requests_per_second: Request rate limit (None for unlimited)
+            tokens_per_minute: Estimated token rate limit (None for unlimited)
+            state_file: JSON file shared by every process using the limiter
+                (None keeps state in this process only)
+            max_retries: Retries of a request answered with 429/5xx
+            min_fraction: Lowest fraction of the configured rates AIMD may reach
+            increase: Fraction of the configured rates restored per success
+            decrease: Factor the rates are multiplied by on 429/5xx
+            backoff: Pause in seconds after a 429/5xx without Retry-After
+        """
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self.state_file = Path(state_file) if state_file else None
+        self.max_retries = max_retries
+        self.min_fraction = min_fraction
+        self.increase = increase
+        self.decrease = decrease
+        self.backoff = backoff
+
+        self._lock = threading.Lock()
+        self._state = self._initial_state()
+
+    def _initial_state(self) -> Dict:
+        return {
+            'requests': self.requests_per_second or 0.0,
+            'tokens': self.tokens_per_minute or 0.0,
+            'fraction': 1.0,
+            'blocked_until': 0.0,
+            'updated': time.time()
+        }
+
+    @contextmanager
+    def _locked_state(self):
+        """Yield the shared state dict under the thread and (if configured) file lock"""
+        with self._lock:
+            if self.state_file is None or fcntl is None:
+                yield self._state
+                return
+
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            lock_path = self.state_file.with_name(self.state_file.name + ".lock")
+            with open(lock_path, 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    try:
+                        with open(self.state_file, 'r', encoding='utf-8') as f:
+                            state = json.load(f)
+                    except (FileNotFoundError, json.JSONDecodeError):
+                        state = self._initial_state()
+
+                    yield state
+
+                    with open(self.state_file, 'w', encoding='utf-8') as f:
+                        json.dump(state, f)
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _refill(self, state: Dict, now: float):
+        """Top up both buckets for the time elapsed since the last update"""
+        elapsed = max(0.0, now - state['updated'])
+        fraction = state['fraction']
+        if self.requests_per_second:
+            capacity = max(1.0, self.requests_per_second)
+            state['requests'] = min(capacity, state['requests'] + elapsed * self.requests_per_second * fraction)
+        if self.tokens_per_minute:
+            state['tokens'] = min(self.tokens_per_minute,
+                                  state['tokens'] + elapsed * self.tokens_per_minute * fraction / 60.0)
+        state['updated'] = now
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Take one request and `tokens` tokens if available; else return the wait in seconds"""
+        with self._locked_state() as state:
+            now = time.time()
+            self._refill(state, now)
+
+            if state['blocked_until'] > now:
+                return state['blocked_until'] - now
+
+            fraction = state['fraction']
+            wait = 0.0
+            if self.requests_per_second and state['requests'] < 1.0:
+                wait = max(wait, (1.0 - state['requests']) / (self.requests_per_second * fraction))
+            if self.tokens_per_minute:
+                # A request larger than the whole bucket waits for a full bucket
+                needed = min(tokens, self.tokens_per_minute)
+                if state['tokens'] < needed:
+                    wait = max(wait, (needed - state['tokens']) * 60.0 / (self.tokens_per_minute * fraction))
+            if wait > 0:
+                return wait
+
+            if self.requests_per_second:
+                state['requests'] -= 1.0
+            if self.tokens_per_minute:
+                state['tokens'] -= min(tokens, self.tokens_per_minute)
+            return 0.0
+
+    def acquire(self, tokens: int = 1):
+        """
+        Block until one request with an estimated `tokens` tokens may be sent
+
+        Args:
+            tokens: Estimated tokens the request will consume
+        """
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def on_response(self, status: int, retry_after: Optional[str] = None) -> bool:
+        """
+        Feed a response status back into the limiter
+
+        Args:
+            status: HTTP status code
+            retry_after: Retry-After header value, if any
+
+        Returns:
+            True if the status is a throttle/server error worth retrying
+        """
+        throttled = status == 429 or status >= 500
+        with self._locked_state() as state:
+            now = time.time()
+            self._refill(state, now)
+            if throttled:
+                state['fraction'] = max(self.min_fraction, state['fraction'] * self.decrease)
+                pause = parse_retry_after(retry_after)
+                pause = self.backoff if pause is None else pause
+                state['blocked_until'] = max(state['blocked_until'], now + pause)
+            else:
+                state['fraction'] = min(1.0, state['fraction'] + self.increase)
+        return throttled
+
+    def stats(self) -> Dict[str, float]:
+        """Current bucket levels and rate fraction"""
+        with self._locked_state() as state:
+            self._refill(state, time.time())
+            return dict(state)
@@ -0,0 +1,149 @@
+"""
+Run Manifest Module
+
+Persistent per-person, per-stage ledger for batch runs, stored as JSON at
+data/batch_manifest.json:
+
+    {
+      "people": {
+        "Steve Jobs": {
+          "stage1": {"status": "completed", "started_at": "...", "finished_at": "...",
+                     "inputs": {}, "outputs": {"data/celebrities/steve_jobs/experiences.txt": "<sha256>"}},
+          "stage2": {"status": "failed", ...}
+        }
+      }
+    }
+
+A stage is up to date when it completed, its outputs still exist, and the
+inputs it read are unchanged (so a re-scraped experiences.txt makes Stage 2
+stale, while hand edits to an output never trigger a re-scrape). Output
+hashes are recorded for reference only and are not compared.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from vector_store import atomic_write_json
+
+
+def safe_name(person_name: str) -> str:
+    """File-system name used for a person by the stage scripts"""
+    return person_name.lower().replace(" ", "_").replace(".", "")
+
+
+def stage_inputs(person_name: str, stage: str) -> List[str]:
+    """Files a stage reads"""
+    if stage == "stage2":
+        return [f"data/celebrities/{safe_name(person_name)}/experiences.txt"]
+    return []
+
+
+def stage_outputs(person_name: str, stage: str) -> List[str]:
+    """Files a stage is expected to produce"""
+    if stage == "stage1":
+        return [f"data/celebrities/{safe_name(person_name)}/experiences.txt"]
+    return [f"data/vector_db/{safe_name(person_name)}.json"]
+
+
+def file_hash(path: str) -> Optional[str]:
+    """SHA-256 of a file, or None if it does not exist"""
+    if not Path(path).exists():
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class RunManifest:
+    """Thread-safe JSON ledger of batch stage results"""
+
+    def __init__(self, path: str = "data/batch_manifest.json"):
+        """
+        Load the manifest (an empty one if the file does not exist)
+
+        Args:
+            path: Path to the manifest JSON file
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        else:
+            self.data = {"people": {}}
+
+    def entry(self, person_name: str, stage: str) -> Optional[Dict]:
+        """Recorded result of a stage for a person, if any"""
+        return self.data["people"].get(person_name, {}).get(stage)
+
+    def is_up_to_date(self, person_name: str, stage: str) -> bool:
+        """
+        Whether a stage completed, its outputs exist and its inputs are unchanged
+
+        Args:
+            person_name: Person's name
+            stage: "stage1" or "stage2"
+
+        Returns:
+            True if the stage can be skipped
+        """
+        entry = self.entry(person_name, stage)
+        if not entry or entry.get("status") != "completed":
+            return False
+
+        if not all(Path(path).exists() for path in entry.get("outputs", {})):
+            return False
+        return all(file_hash(path) == digest for path, digest in entry.get("inputs", {}).items())
+
+    def has_failure(self, person_name: str) -> bool:
+        """Whether any stage for the person last ended in failure"""
+        stages = self.data["people"].get(person_name, {})
+        return any(entry.get("status") == "failed" for entry in stages.values())
+
+    def record(self, person_name: str, stage: str, success: bool, started_at: str) -> bool:
+        """
+        Record the result of a stage and save the manifest
+
+        Args:
+            person_name: Person's name
+            stage: "stage1" or "stage2"
+            success: Whether the stage command succeeded
+            started_at: ISO timestamp from start()
+
+        Returns:
+            Whether the stage was recorded as completed
+        """
+        outputs = {path: file_hash(path) for path in stage_outputs(person_name, stage)}
+        # A stage that exits cleanly without producing its outputs still failed
+        success = success and all(outputs.values())
+
+        entry = {
+            "status": "completed" if success else "failed",
+            "started_at": started_at,
+            "finished_at": _now(),
+            "inputs": {path: file_hash(path) for path in stage_inputs(person_name, stage)},
+            "outputs": outputs
+        }
+
+        with self._lock:
+            self.data["people"].setdefault(person_name, {})[stage] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(self.path, self.data, indent=2, ensure_ascii=False)
+
+        return success
+
+    @staticmethod
+    def start() -> str:
+        """Timestamp to pass to record() when a stage finishes"""
+        return _now()
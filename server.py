@@ -0,0 +1,300 @@
+"""
+Production Server for the Life Experience Search Engine
+
+Pre-fork entry point for api_server's Flask app (Unix only). The parent
+process loads the vector index once, opens the listening socket and forks
+the workers, which accept connections on the shared socket. The index
+matrix is memory-mapped from the binary store (shared through the page
+cache); persons only available as JSON are inherited copy-on-write, so
+memory does not grow with the number of workers.
+
+Usage:
+    python server.py
+    python server.py --workers 8 --bind 0.0.0.0:8000
+    python server.py --shutdown-timeout 60
+
+Defaults come from the "server" section of models.json:
+
+    "server": {"workers": 4, "bind": "0.0.0.0:5000", "shutdown_timeout": 30}
+
+Signals (sent to the parent):
+    SIGTERM / SIGINT  graceful shutdown: workers stop accepting, finish
+                      in-flight requests and exit; stragglers are killed
+                      after shutdown_timeout seconds
+    SIGHUP            rolling restart of all workers
+
+The parent also keeps the index up to date: every search.reload_interval
+seconds it patches in changed persons (see vector_index.refresh_index) and
+then replaces the workers with fresh forks that share the new index. The
+parent runs no background threads, so forking it is safe.
+"""
+
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+DB_FOLDER = "data/vector_db"
+
+
+def load_server_config(config_path: str = "models.json") -> Dict:
+    """The "server" section of the config file (empty if absent)"""
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    return config.get('server', {})
+
+
+def parse_bind(bind: str) -> Tuple[str, int]:
+    """Split "host:port" (or ":port", or "[::1]:port") into (host, port)"""
+    host, _, port = bind.rpartition(':')
+    return host.strip('[]') or '0.0.0.0', int(port)
+
+
+def listen(host: str, port: int) -> socket.socket:
+    """
+    Open the listening socket shared by all workers
+
+    The socket is non-blocking, so a worker woken for a connection that
+    another worker already accepted goes back to waiting instead of
+    blocking in accept().
+    """
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.create_server((host, port), family=family, backlog=128)
+    sock.setblocking(False)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, host: str, port: int):
+    """
+    Serve requests in a forked worker until SIGTERM, then exit the process
+
+    Args:
+        sock: Listening socket inherited from the parent
+        host: Bind host (used to pick the address family)
+        port: Bind port
+    """
+    # The parent handles Ctrl+C for the whole process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    from werkzeug.serving import make_server
+    import api_server
+
+    if api_server.embedder.cache is not None:
+        api_server.embedder.cache.reopen()
+
+    server = make_server(host, port, api_server.app, threaded=True, fd=sock.fileno())
+    # Non-daemon request threads are joined on close, so in-flight requests finish
+    server.daemon_threads = False
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        server.serve_forever()
+    finally:
+        os._exit(0)
+
+
+class Arbiter:
+    """Parent process: forks, supervises and stops the workers"""
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        host: str,
+        port: int,
+        workers: int,
+        shutdown_timeout: float,
+        reload_interval: Optional[float] = None
+    ):
+        """
+        Initialize the arbiter
+
+        Args:
+            sock: Listening socket shared with the workers
+            host: Bind host
+            port: Bind port
+            workers: Number of worker processes
+            shutdown_timeout: Seconds workers get to finish in-flight requests
+            reload_interval: Seconds between checks for changed persons (None disables)
+        """
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.shutdown_timeout = shutdown_timeout
+        self.reload_interval = reload_interval
+        self.pids: List[int] = []
+        self.stopping = False
+        self.restart_requested = False
+
+    def spawn(self) -> int:
+        """Fork one worker"""
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(self.sock, self.host, self.port)
+            finally:
+                os._exit(1)
+        self.pids.append(pid)
+        return pid
+
+    def reap(self) -> List[int]:
+        """Collect exited workers without blocking"""
+        exited = []
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if pid in self.pids:
+                self.pids.remove(pid)
+            exited.append(pid)
+        return exited
+
+    def stop_workers(self, pids: List[int]):
+        """SIGTERM the given workers, wait for them, SIGKILL stragglers"""
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            self.reap()
+            remaining &= set(self.pids)
+            time.sleep(0.1)
+
+        for pid in remaining:
+            print(f"Warning: Worker {pid} did not exit within {self.shutdown_timeout}s, killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        while remaining:
+            self.reap()
+            remaining &= set(self.pids)
+            time.sleep(0.05)
+
+    def restart_workers(self):
+        """Replace every worker with a fresh fork of the current parent state"""
+        old = list(self.pids)
+        gc.freeze()
+        for _ in range(self.workers):
+            self.spawn()
+        self.stop_workers(old)
+
+    def run(self):
+        """Start the workers and supervise them until shutdown"""
+        from vector_index import load_index, refresh_index
+
+        def request_stop(signum, frame):
+            self.stopping = True
+
+        def request_restart(signum, frame):
+            self.restart_requested = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGHUP, request_restart)
+
+        # Objects allocated so far are never collected, so the collector does
+        # not write to (and un-share) pages the workers inherited
+        gc.freeze()
+        for _ in range(self.workers):
+            self.spawn()
+        print(f"✓ {self.workers} workers listening on http://{self.host}:{self.port} (parent {os.getpid()})")
+
+        last_check = time.monotonic()
+        last_mtime = Path(DB_FOLDER).stat().st_mtime_ns
+        while not self.stopping:
+            time.sleep(0.5)
+
+            for pid in self.reap():
+                print(f"Warning: Worker {pid} exited unexpectedly")
+            while len(self.pids) < self.workers and not self.stopping:
+                self.spawn()
+
+            if self.reload_interval and time.monotonic() - last_check >= self.reload_interval:
+                last_check = time.monotonic()
+                try:
+                    # The folder mtime changes whenever a person file is written or removed
+                    mtime = Path(DB_FOLDER).stat().st_mtime_ns
+                    if mtime != last_mtime:
+                        if refresh_index(DB_FOLDER):
+                            print(f"✓ Index changed ({len(load_index(DB_FOLDER))} experiences), restarting workers")
+                            self.restart_requested = True
+                        last_mtime = mtime
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Warning: Vector index reload failed, retrying: {e}")
+
+            if self.restart_requested and not self.stopping:
+                self.restart_requested = False
+                self.restart_workers()
+
+        print(f"Shutting down {len(self.pids)} workers...")
+        self.stop_workers(list(self.pids))
+        self.sock.close()
+        print("✓ Server stopped")
+
+
+def main():
+    if not hasattr(os, 'fork'):
+        print("✗ Error: server.py needs os.fork (Unix); use python api_server.py instead")
+        sys.exit(1)
+
+    if not Path(DB_FOLDER).exists():
+        print(f"ERROR: Vector database not found at {DB_FOLDER}/")
+        print("Please run Stage 1 and Stage 2 to build the database first.")
+        sys.exit(1)
+
+    config = load_server_config()
+    args = sys.argv[1:]
+    options = {}
+    for flag in ("--workers", "--bind", "--shutdown-timeout"):
+        if flag in args:
+            i = args.index(flag)
+            options[flag.lstrip('-')] = args[i + 1]
+            del args[i:i + 2]
+
+    workers = int(options.get('workers', config.get('workers', min(4, os.cpu_count() or 1))))
+    host, port = parse_bind(options.get('bind', config.get('bind', '0.0.0.0:5000')))
+    shutdown_timeout = float(options.get('shutdown-timeout', config.get('shutdown_timeout', 30)))
+
+    print("=" * 80)
+    print("Life Experience Search Engine - Production Server")
+    print("=" * 80)
+
+    # Importing the app builds the embedding tool (workers inherit it)
+    import api_server
+    from vector_index import load_index
+
+    start = time.perf_counter()
+    index = load_index(DB_FOLDER)
+    shared = "memory-mapped" if index.matrix.memory_mapped else "copy-on-write"
+    print(f"✓ Loaded {len(index)} experiences in {time.perf_counter() - start:.2f}s ({shared} matrix)")
+
+    sock = listen(host, port)
+    Arbiter(
+        sock, host, port, workers, shutdown_timeout,
+        reload_interval=api_server.embedder.reload_interval
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
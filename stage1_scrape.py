@@ -3,6 +3,12 @@ Stage 1: Scrape biographical experiences from URLs
 
 Usage:
     python stage1_scrape.py "Person Name"
+    python stage1_scrape.py "Person Name" --refresh-citations
+    python stage1_scrape.py "Person Name" --shards 4
+
+Citation lists are reused from the citation cache unless --refresh-citations
+is given. --shards runs that many scraping agents concurrently on subsets of
+the URLs and merges their output.
 
 Output:
     data/celebrities/{person}/experiences.txt
@@ -10,18 +16,34 @@ Output:
 """
 
 import sys
+from typing import Dict, Optional
 from citation_fetcher import CitationFetcher
 from deep_scraper import DeepScraper
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python stage1_scrape.py \"Person Name\"")
-        print("\nExample: python stage1_scrape.py \"Steve Jobs\"")
-        sys.exit(1)
+def scrape_person(
+    person_name: str,
+    fetcher: Optional[CitationFetcher] = None,
+    scraper: Optional[DeepScraper] = None,
+    refresh_citations: bool = False,
+    shards: Optional[int] = None
+) -> Dict:
+    """
+    Run Stage 1 for one person
 
-    person_name = sys.argv[1]
+    Args:
+        person_name: Name of the person
+        fetcher: CitationFetcher to reuse (a new one is created if omitted)
+        scraper: DeepScraper to reuse (a new one is created if omitted)
+        refresh_citations: Query Perplexity even if citations are cached
+        shards: Concurrent scraping agents (default: the "scraper" config)
 
+    Returns:
+        The DeepScraper result dictionary
+
+    Raises:
+        RuntimeError: If the scraping agent fails
+    """
     print(f"\n{'='*80}")
     print(f"[STAGE 1] Scraping biographical experiences")
     print(f"Person: {person_name}")
@@ -29,20 +51,25 @@ def main():
 
     # Step 1: Get citations from Perplexity
     print("[1/2] Fetching citations from Perplexity...")
-    fetcher = CitationFetcher()
-    citations = fetcher.fetch_citations(person_name)
-    print(f"      ✓ Found {citations['total_citations']} citation URLs\n")
+    fetcher = fetcher or CitationFetcher()
+    citations = fetcher.fetch_citations(person_name, refresh=refresh_citations)
+    source = " (from cache)" if citations['cached'] else ""
+    print(f"      ✓ Found {citations['total_citations']} citation URLs{source}\n")
 
     # Step 2: Scrape and extract experiences
     print(f"[2/2] Scraping {citations['total_citations']} URLs with Claude Code...")
     print("      (This may take several minutes...)\n")
 
-    scraper = DeepScraper()
+    scraper = scraper or DeepScraper()
     result = scraper.scrape_with_structured_format(
         urls=citations['citation_urls'],
-        person_name=person_name
+        person_name=person_name,
+        shards=shards
     )
 
+    if not result['success']:
+        raise RuntimeError(f"Scraping failed for {person_name}: {result.get('error')}")
+
     # Summary
     print(f"\n{'='*80}")
     print("[STAGE 1 COMPLETE]")
@@ -56,6 +83,28 @@ def main():
     print(f"      python stage2_embed.py \"{person_name}\"")
     print(f"{'='*80}\n")
 
+    return result
+
+
+def main():
+    args = sys.argv[1:]
+    shards = None
+    if '--shards' in args:
+        i = args.index('--shards')
+        shards = int(args[i + 1])
+        del args[i:i + 2]
+    args = [a for a in args if not a.startswith('--')]
+    if not args:
+        print("Usage: python stage1_scrape.py \"Person Name\" [--refresh-citations] [--shards N]")
+        print("\nExample: python stage1_scrape.py \"Steve Jobs\"")
+        sys.exit(1)
+
+    try:
+        scrape_person(args[0], refresh_citations='--refresh-citations' in sys.argv, shards=shards)
+    except RuntimeError as e:
+        print(f"✗ Error: {e}")
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -3,27 +3,115 @@ Stage 2: Parse experiences and generate embeddings
 
 Usage:
     python stage2_embed.py "Person Name"
+    python stage2_embed.py "Person Name" --full
+
+By default only experiences that are new or changed since the last run are
+embedded (matched by stable experience ID); --full re-embeds everything.
+Near-duplicate experiences are collapsed before embedding (see dedup.py).
+
+Build the reduced-dimension projection used by the "pca" search engine:
+    python stage2_embed.py --build-projection [--dims 128] [--method pca|prefix] [--shortlist 200]
 
 Input:
     data/celebrities/{person}/experiences.txt
 
 Output:
     data/vector_db/{person}.json
+    data/vector_db/index/persons/{person}.npy (+ .json metadata sidecar)
+    data/vector_db/index/persons/{person}.terms.npz (BM25 term postings)
 """
 
 import sys
 import json
 from pathlib import Path
-from embedding_tool import EmbeddingTool
+from typing import Dict, List, Optional
+from corpus_manifest import update_person
+from dedup import NearDuplicateIndex, dedupe_experiences, merge_experience
+from embedding_tool import EmbeddingTool, experience_id, iter_experiences
+from lexical_index import write_person_terms
+from projection import PROJECTION_METHODS, build_projection
+from vector_store import atomic_write_json, write_person
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python stage2_embed.py \"Person Name\"")
-        print("\nExample: python stage2_embed.py \"Steve Jobs\"")
+def load_existing_embeddings(db_file: Path, model: str) -> Dict[str, List[float]]:
+    """
+    Load embeddings from a previous run, keyed by experience ID
+
+    Args:
+        db_file: The person's existing vector database file
+        model: Embedding model in use; files from another model are ignored
+
+    Returns:
+        Dict mapping experience ID to embedding (empty if nothing reusable)
+    """
+    if not db_file.exists():
+        return {}
+
+    with open(db_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if data.get('model', model) != model:
+        return {}
+
+    existing = {}
+    for exp in data.get('experiences', []):
+        exp_id = exp.get('id') or experience_id(exp['text'], exp.get('source_url', ''))
+        existing[exp_id] = exp['embedding']
+    return existing
+
+
+def build_projection_command(args: List[str]):
+    """Handle: python stage2_embed.py --build-projection [--dims N] [--method M] [--shortlist N]"""
+    options = {}
+    for flag in ("--dims", "--method", "--shortlist"):
+        if flag in args:
+            i = args.index(flag)
+            if i + 1 >= len(args):
+                print(f"✗ Error: {flag} needs a value")
+                sys.exit(1)
+            options[flag.lstrip('-')] = args[i + 1]
+
+    method = options.get('method', 'pca')
+    if method not in PROJECTION_METHODS:
+        print(f"✗ Error: --method must be one of: {', '.join(PROJECTION_METHODS)}")
         sys.exit(1)
 
-    person_name = sys.argv[1]
+    if not Path("data/vector_db").exists():
+        print("✗ Error: data/vector_db not found; embed at least one person first")
+        sys.exit(1)
+
+    print(f"Building {method} projection...")
+    index = build_projection(
+        "data/vector_db",
+        dims=int(options.get('dims', 128)),
+        method=method,
+        shortlist=int(options.get('shortlist', 200))
+    )
+    print(f"✓ Projected {len(index.projected)} experiences to {index.dims} dimensions "
+          f"(shortlist={index.shortlist})")
+
+
+def embed_person(
+    person_name: str,
+    embedder: Optional[EmbeddingTool] = None,
+    full_rebuild: bool = False
+) -> Dict:
+    """
+    Run Stage 2 for one person
+
+    Args:
+        person_name: Name of the person
+        embedder: EmbeddingTool to reuse (a new one is created if omitted)
+        full_rebuild: Re-embed every experience instead of only changed ones
+
+    Returns:
+        Dict with 'person', 'experiences', 'embedded', 'removed', 'duplicates'
+        and 'output_file'
+
+    Raises:
+        FileNotFoundError: If Stage 1 output is missing
+        ValueError: If the experiences file contains no experiences
+    """
     safe_name = person_name.lower().replace(" ", "_").replace(".", "")
 
     print(f"\n{'='*80}")
@@ -34,62 +122,151 @@ def main():
     # Check if experiences file exists
     exp_file = Path(f"data/celebrities/{safe_name}/experiences.txt")
     if not exp_file.exists():
-        print(f"✗ Error: {exp_file} not found")
-        print(f"\nPlease run Stage 1 first:")
-        print(f"  python stage1_scrape.py \"{person_name}\"")
-        sys.exit(1)
+        raise FileNotFoundError(
+            f"{exp_file} not found. Please run Stage 1 first:\n"
+            f"  python stage1_scrape.py \"{person_name}\""
+        )
 
-    # Step 1: Parse experiences
-    print(f"[1/3] Parsing experiences from {exp_file}...")
-    embedder = EmbeddingTool()
-    experiences = embedder.parse_experiences_file(str(exp_file))
-    print(f"      ✓ Parsed {len(experiences)} experiences\n")
+    embedder = embedder or EmbeddingTool()
+    db_dir = Path("data/vector_db")
+    db_dir.mkdir(parents=True, exist_ok=True)
+    output_file = db_dir / f"{safe_name}.json"
 
-    if not experiences:
-        print("✗ Error: No experiences found in file")
-        sys.exit(1)
+    # Step 1: Load embeddings from the previous run
+    print(f"[1/3] Loading previous embeddings...")
+    existing = {} if full_rebuild else load_existing_embeddings(output_file, embedder.model)
+    previous_ids = set(existing)
+    print(f"      ✓ {len(existing)} reusable embeddings\n")
+
+    # Step 2: Stream experiences into batched embedding of new or changed ones
+    print(f"[2/3] Parsing {exp_file} and embedding new or changed experiences...")
+    chunk_size = embedder.batch_size * embedder.max_workers
+    experiences = []
+    pending = {}
+    embedded = 0
+
+    # Near duplicates are merged into the first occurrence as they stream in
+    dedup_config = embedder.dedup_config
+    threshold = dedup_config.get('threshold', 0.8)
+    near_duplicates = NearDuplicateIndex(
+        threshold=threshold, shingle_size=dedup_config.get('shingle_size', 5)
+    ) if threshold is not None else None
+    kept_at = {}
+    duplicates = 0
 
-    # Step 2: Generate embeddings
-    print(f"[2/3] Generating embeddings for {len(experiences)} experiences...")
-    print("      (Calling OpenAI embedding API...)\n")
+    def flush():
+        nonlocal embedded
+        if pending:
+            texts = [exp['text'] for exp in pending.values()]
+            for exp_id, emb in zip(pending, embedder.embed(texts)):
+                existing[exp_id] = emb
+            embedded += len(pending)
+            pending.clear()
 
-    texts = [exp['text'] for exp in experiences]
-    embeddings = embedder.embed(texts)
+    for position, exp in enumerate(iter_experiences(str(exp_file))):
+        if near_duplicates is not None:
+            representative = near_duplicates.add(exp['text'])
+            if representative != position:
+                merge_experience(kept_at[representative], exp)
+                duplicates += 1
+                continue
+            kept_at[position] = exp
+
+        if exp['id'] not in existing and exp['id'] not in pending:
+            pending[exp['id']] = exp
+            if len(pending) >= chunk_size:
+                flush()
+        experiences.append(exp)
+    flush()
+
+    if not experiences:
+        raise ValueError(f"No experiences found in {exp_file}")
 
     # Attach embeddings to experiences
-    for exp, emb in zip(experiences, embeddings):
-        exp['embedding'] = emb
+    for exp in experiences:
+        exp['embedding'] = existing[exp['id']]
 
-    print(f"      ✓ Generated {len(embeddings)} embeddings (1536 dimensions each)\n")
+    # Optional second pass: paraphrases caught by embedding similarity
+    cosine_threshold = dedup_config.get('cosine_threshold')
+    if cosine_threshold is not None:
+        before = len(experiences)
+        experiences = dedupe_experiences(experiences, threshold=None, cosine_threshold=cosine_threshold)
+        duplicates += before - len(experiences)
+
+    current_ids = {exp['id'] for exp in experiences}
+    removed = len(previous_ids - current_ids)
+
+    print(f"      ✓ Parsed {len(experiences) + duplicates} experiences, "
+          f"collapsed {duplicates} near duplicates")
+    print(f"      ✓ {len(current_ids & previous_ids)} unchanged, {removed} removed")
+    print(f"      ✓ Generated {embedded} embeddings ({embedder.dimensions} dimensions each)")
+    if embedder.cache is not None:
+        cache_stats = embedder.cache.stats()
+        print(f"      ✓ Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    print()
 
     # Step 3: Save to vector database
     print(f"[3/3] Saving to vector database...")
 
     output = {
         "person": person_name,
+        "model": embedder.model,
+        "dimensions": embedder.dimensions,
         "experiences": experiences
     }
 
-    db_dir = Path("data/vector_db")
-    db_dir.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(output_file, output, indent=2)
 
-    output_file = db_dir / f"{safe_name}.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2)
+    # Compact binary copy for memory-mapped loading by the search path
+    npy_file = write_person(str(db_dir), safe_name, person_name, experiences)
+
+    # Term postings merged into the BM25 index used by lexical and hybrid search
+    write_person_terms(str(db_dir), safe_name, experiences)
 
-    print(f"      ✓ Saved to {output_file}\n")
+    # Per-person counts and sizes behind /api/stats
+    update_person(str(db_dir), safe_name, output)
+
+    print(f"      ✓ Saved to {output_file}")
+    print(f"      ✓ Binary matrix: {npy_file}\n")
 
     # Summary
     print(f"{'='*80}")
     print("[STAGE 2 COMPLETE]")
     print(f"{'='*80}")
     print(f"✓ Person: {person_name}")
-    print(f"✓ Experiences embedded: {len(experiences)}")
+    print(f"✓ Experiences: {len(experiences)} ({embedded} newly embedded)")
     print(f"✓ Database file: data/vector_db/{safe_name}.json")
     print(f"\nNext: Query the database with Stage 3")
     print(f"      python stage3_query.py \"your experience here\"")
     print(f"{'='*80}\n")
 
+    return {
+        'person': person_name,
+        'experiences': len(experiences),
+        'embedded': embedded,
+        'removed': removed,
+        'duplicates': duplicates,
+        'output_file': str(output_file)
+    }
+
+
+def main():
+    if '--build-projection' in sys.argv:
+        build_projection_command(sys.argv[1:])
+        return
+
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if not args:
+        print("Usage: python stage2_embed.py \"Person Name\" [--full]")
+        print("\nExample: python stage2_embed.py \"Steve Jobs\"")
+        sys.exit(1)
+
+    try:
+        embed_person(args[0], full_rebuild='--full' in sys.argv)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"✗ Error: {e}")
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -4,6 +4,18 @@ Stage 3: Find matching experiences for user query
 Usage:
     python stage3_query.py "user experience text"
     python stage3_query.py "user experience text" --top 10
+    python stage3_query.py "user experience text" --keywords business-failure,bankruptcy
+    python stage3_query.py "user experience text" --people "Steve Jobs,Oprah Winfrey" --exclude-keywords illness
+    python stage3_query.py "user experience text" --mode lexical
+
+Search modes (--mode, default "search.mode" from models.json):
+    vector     embedding similarity
+    lexical    BM25 over experience text and keywords (no embedding API call)
+    hybrid     reciprocal rank fusion of both
+
+Filters restrict the search to matching experiences before scoring:
+    --keywords / --exclude-keywords    comma-separated keywords (any of them)
+    --people / --exclude-people        comma-separated person names
 
 Input:
     data/vector_db/*.json
@@ -14,11 +26,23 @@ Output:
 
 import sys
 from embedding_tool import EmbeddingTool
+from filter_index import SearchFilter
+from vector_index import SEARCH_MODES
+
+
+# Command line flags mapped to SearchFilter fields
+FILTER_FLAGS = {
+    '--keywords': 'include_keywords',
+    '--exclude-keywords': 'exclude_keywords',
+    '--people': 'include_persons',
+    '--exclude-people': 'exclude_persons'
+}
 
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python stage3_query.py \"user experience text\" [--top N]")
+        print("Usage: python stage3_query.py \"user experience text\" [--top N] [--mode vector|lexical|hybrid] "
+              "[--keywords a,b] [--exclude-keywords a,b] [--people \"A,B\"] [--exclude-people \"A,B\"]")
         print("\nExamples:")
         print("  python stage3_query.py \"I was fired from my own company\"")
         print("  python stage3_query.py \"I failed my startup\" --top 10")
@@ -32,7 +56,25 @@ def main():
         top_idx = args.index('--top')
         if top_idx + 1 < len(args):
             top_k = int(args[top_idx + 1])
-            args = args[:top_idx]  # Remove --top and number
+            del args[top_idx:top_idx + 2]  # Remove --top and number
+
+    mode = None
+    if '--mode' in args:
+        mode_idx = args.index('--mode')
+        if mode_idx + 1 < len(args):
+            mode = args[mode_idx + 1]
+            del args[mode_idx:mode_idx + 2]
+        if mode not in SEARCH_MODES:
+            print(f"✗ Error: --mode must be one of: {', '.join(SEARCH_MODES)}")
+            sys.exit(1)
+
+    search_filter = SearchFilter()
+    for flag, field_name in FILTER_FLAGS.items():
+        if flag in args:
+            i = args.index(flag)
+            values = args[i + 1].split(',') if i + 1 < len(args) else []
+            setattr(search_filter, field_name, [value.strip() for value in values if value.strip()])
+            del args[i:i + 2]
 
     query = " ".join(args)
 
@@ -41,12 +83,17 @@ def main():
     print(f"{'='*80}")
     print(f"Query: \"{query}\"")
     print(f"Top-K: {top_k}")
+    if mode:
+        print(f"Mode: {mode}")
+    for flag, field_name in FILTER_FLAGS.items():
+        if getattr(search_filter, field_name):
+            print(f"{flag.lstrip('-').replace('-', ' ').capitalize()}: {', '.join(getattr(search_filter, field_name))}")
     print(f"{'='*80}\n")
 
     # Search database
     print("Searching vector database...")
     embedder = EmbeddingTool()
-    matches = embedder.match_across_database(query, top_k=top_k)
+    matches = embedder.match_across_database(query, top_k=top_k, search_filter=search_filter, mode=mode)
 
     if not matches:
         print("✗ No matches found. Is the database empty?")
@@ -62,7 +109,10 @@ def main():
 
     for i, match in enumerate(matches, 1):
         print(f"{i}. {match['person']}")
-        print(f"   Similarity: {match['similarity']:.4f}")
+        if match.get('mode') == 'lexical':
+            print(f"   BM25: {match['bm25']:.4f} (lexical match)")
+        else:
+            print(f"   Similarity: {match['similarity']:.4f}")
         print(f"   Keywords: {', '.join(match['keywords'])}")
         if 'source_url' in match:
             print(f"   Source: {match['source_url']}")
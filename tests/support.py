@@ -0,0 +1,84 @@
+"""
+Shared fixtures for the offline tests (no API keys or network access)
+"""
+
+import json
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from vector_store import normalize_rows, write_person
+
+
+def temporary_directory(test) -> Path:
+    """
+    Empty directory removed when a test (or, for a TestCase class, the class) finishes
+
+    Args:
+        test: TestCase instance, or TestCase class inside setUpClass
+
+    Returns:
+        Path to the directory
+    """
+    tmp = tempfile.TemporaryDirectory()
+    if isinstance(test, type):
+        test.addClassCleanup(tmp.cleanup)
+    else:
+        test.addCleanup(tmp.cleanup)
+    return Path(tmp.name)
+
+
+def clustered_matrix(n: int = 2000, d: int = 64, latent: int = 12, seed: int = 1) -> np.ndarray:
+    """Normalized rows drawn from clusters in a low-dimensional subspace"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, latent))
+    points = centers[rng.integers(0, len(centers), n)] + rng.normal(scale=0.5, size=(n, latent))
+    matrix = points @ rng.normal(size=(latent, d)) + rng.normal(scale=0.05, size=(n, d))
+    return normalize_rows(matrix.astype(np.float32))
+
+
+def person_data(person: str, embeddings, keywords: Optional[List[List[str]]] = None) -> Dict:
+    """
+    Vector database JSON for one person, one experience per embedding
+
+    Args:
+        person: Display name (experience texts are "{person} experience {i}")
+        embeddings: (n, d) embeddings
+        keywords: Keywords of each experience (default: none)
+
+    Returns:
+        Dict in the Stage 2 output format
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float64)
+    keywords = keywords or [[] for _ in range(len(embeddings))]
+    return {
+        'person': person,
+        'model': "test-model",
+        'dimensions': embeddings.shape[1],
+        'experiences': [
+            {'keywords': list(experience_keywords), 'text': f"{person} experience {i}", 'embedding': embedding.tolist()}
+            for i, (embedding, experience_keywords) in enumerate(zip(embeddings, keywords))
+        ]
+    }
+
+
+def write_vector_db(folder: Path, persons: Dict[str, Dict], binary: bool = True) -> str:
+    """
+    Write person files into a vector database folder, as Stage 2 does
+
+    Args:
+        folder: Vector database folder
+        persons: person_data() dicts keyed by file stem
+        binary: Also write each person's binary matrix and sidecar
+
+    Returns:
+        The folder as a db_folder string
+    """
+    for stem, data in persons.items():
+        with open(folder / f"{stem}.json", 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        if binary:
+            write_person(str(folder), stem, data['person'], data['experiences'])
+    return str(folder)
@@ -0,0 +1,48 @@
+"""
+Offline tests for the citation cache
+
+    python -m unittest tests.test_citation_cache
+"""
+
+import json
+import time
+import unittest
+
+from citation_cache import CitationCache
+from tests.support import temporary_directory
+
+
+DATA = {'citations': ["https://example.com/one"], 'content': "Fired from Apple."}
+
+
+class CitationCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = CitationCache(str(temporary_directory(self)), ttl_days=1)
+
+    def test_round_trip_and_keys(self):
+        self.assertIsNone(self.cache.get("Steve Jobs", "prompt", "sonar"))
+        self.cache.put("Steve Jobs", "prompt", "sonar", DATA)
+        self.assertEqual(self.cache.get("Steve Jobs", "prompt", "sonar"), DATA)
+        self.assertIsNone(self.cache.get("Steve Jobs", "other prompt", "sonar"))
+        self.assertIsNone(self.cache.get("Steve Jobs", "prompt", "sonar-pro"))
+
+    def test_expired_entry_is_a_miss(self):
+        path = self.cache.put("Steve Jobs", "prompt", "sonar", DATA)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': time.time() - 2 * 86400, 'data': DATA}, f)
+        self.assertIsNone(self.cache.get("Steve Jobs", "prompt", "sonar"))
+
+    def test_unreadable_entries_are_misses(self):
+        path = self.cache.put("Steve Jobs", "prompt", "sonar", DATA)
+        for content in ('{"fetched_at": 1', json.dumps(DATA), "[]"):
+            with self.subTest(content=content):
+                path.write_text(content, encoding='utf-8')
+                self.assertIsNone(self.cache.get("Steve Jobs", "prompt", "sonar"))
+
+        # The next put() replaces the broken entry
+        self.cache.put("Steve Jobs", "prompt", "sonar", DATA)
+        self.assertEqual(self.cache.get("Steve Jobs", "prompt", "sonar"), DATA)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Offline tests for the corpus manifest
+
+    python -m unittest tests.test_corpus_manifest
+"""
+
+import unittest
+
+import numpy as np
+
+from corpus_manifest import load_manifest, manifest_path, rebuild_manifest, update_person
+from tests.support import person_data as experiences_data, temporary_directory, write_vector_db
+
+
+def person_data(person: str, keywords_per_experience):
+    """Three-dimensional person data with the given keywords per experience"""
+    return experiences_data(person, np.ones((len(keywords_per_experience), 3)), keywords_per_experience)
+
+
+class CorpusManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = temporary_directory(self)
+        self.db_folder = str(self.folder)
+
+    def write_person(self, stem: str, data):
+        write_vector_db(self.folder, {stem: data}, binary=False)
+
+    def assert_matches_rebuild(self):
+        totals = dict(load_manifest(self.db_folder)['totals'])
+        people = load_manifest(self.db_folder)['people'].keys()
+        rebuilt = rebuild_manifest(self.db_folder)
+        self.assertEqual(sorted(people), sorted(rebuilt['people']))
+        self.assertEqual(totals, rebuilt['totals'])
+
+    def test_incremental_totals(self):
+        jobs = person_data("Steve Jobs", [["rejection", "career"], ["career"]])
+        oprah = person_data("Oprah Winfrey", [["poverty"]])
+        self.write_person("steve_jobs", jobs)
+        update_person(self.db_folder, "steve_jobs", jobs)
+        self.write_person("oprah_winfrey", oprah)
+        update_person(self.db_folder, "oprah_winfrey", oprah)
+
+        manifest = load_manifest(self.db_folder)
+        totals = manifest['totals']
+        self.assertEqual(manifest['version'], 2)
+        self.assertEqual((totals['people'], totals['experiences'], totals['keywords']), (2, 3, 4))
+        self.assertEqual(totals['models'], {"test-model/3": 2})
+        self.assertEqual(manifest['people']['steve_jobs']['top_keywords'][0], ["career", 2])
+
+        # Updating a person replaces their contribution instead of adding to it
+        jobs = person_data("Steve Jobs", [["career"]])
+        self.write_person("steve_jobs", jobs)
+        update_person(self.db_folder, "steve_jobs", jobs)
+        totals = load_manifest(self.db_folder)['totals']
+        self.assertEqual((totals['people'], totals['experiences'], totals['keywords']), (2, 2, 2))
+        self.assert_matches_rebuild()
+
+    def test_removed_persons(self):
+        for stem, person in (("steve_jobs", "Steve Jobs"), ("walt_disney", "Walt Disney"), ("oprah_winfrey", "Oprah Winfrey")):
+            data = person_data(person, [["a"]])
+            self.write_person(stem, data)
+            update_person(self.db_folder, stem, data)
+
+        update_person(self.db_folder, "steve_jobs", None)
+        # Deleted by hand: dropped on the next update
+        (self.folder / "walt_disney.json").unlink()
+        data = person_data("Oprah Winfrey", [["a"], ["b"]])
+        self.write_person("oprah_winfrey", data)
+        update_person(self.db_folder, "oprah_winfrey", data)
+
+        manifest = load_manifest(self.db_folder)
+        self.assertEqual(list(manifest['people']), ["oprah_winfrey"])
+        self.assertEqual((manifest['totals']['people'], manifest['totals']['experiences']), (1, 2))
+
+    def test_missing_manifest_is_seeded_from_person_files(self):
+        for i in range(4):
+            self.write_person(f"person_{i}", person_data(f"Person {i}", [["a"], ["b", "c"]]))
+        self.assertFalse(manifest_path(self.db_folder).exists())
+
+        data = person_data("Person 0", [["a"]])
+        self.write_person("person_0", data)
+        update_person(self.db_folder, "person_0", data)
+
+        totals = load_manifest(self.db_folder)['totals']
+        self.assertEqual((totals['people'], totals['experiences'], totals['keywords']), (4, 7, 10))
+        self.assert_matches_rebuild()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Offline tests for near-duplicate detection
+
+    python -m unittest tests.test_dedup
+"""
+
+import unittest
+
+from dedup import NearDuplicateIndex, dedupe_experiences, shingles
+
+
+BASE = (
+    "In 1985 Jobs was forced out of Apple after a boardroom struggle with John Sculley, "
+    "the chief executive he had personally recruited from Pepsi two years earlier, and "
+    "he later described the firing as awful tasting medicine that the patient needed"
+)
+
+
+class NearDuplicateIndexTest(unittest.TestCase):
+    def test_shingles_ignore_case_and_punctuation(self):
+        self.assertEqual(set(shingles("Hello, World! foo bar baz")), set(shingles("hello world foo bar baz")))
+        self.assertEqual(len(shingles("too short")), 1)
+
+    def test_near_duplicates_share_a_representative(self):
+        index = NearDuplicateIndex(threshold=0.8)
+        self.assertEqual(index.add(BASE), 0)
+        self.assertEqual(index.add("Walked across India looking for enlightenment."), 1)
+        # One word changed near the end: most shingles are shared
+        self.assertEqual(index.add(BASE.replace("needed", "required") + "."), 0)
+        self.assertEqual(index.add(BASE.upper()), 0)
+
+    def test_signature_similarity_tracks_jaccard(self):
+        index = NearDuplicateIndex(num_perm=256)
+        a = set(shingles(BASE))
+        half = " ".join(BASE.split()[:len(BASE.split()) // 2])
+        b = set(shingles(half))
+        jaccard = len(a & b) / len(a | b)
+        signatures = index.signatures([BASE, half])
+        estimate = float((signatures[0] == signatures[1]).mean())
+        self.assertAlmostEqual(estimate, jaccard, delta=0.1)
+
+
+class DedupeExperiencesTest(unittest.TestCase):
+    def test_merges_keywords_and_sources(self):
+        experiences = [
+            {'text': BASE, 'keywords': ['rejection'], 'source_url': 'https://example.com/a'},
+            {'text': "Dropped out of Reed College after one semester.", 'keywords': ['education']},
+            {'text': BASE + ".", 'keywords': ['rejection', 'career'], 'source_url': 'https://example.com/b'},
+        ]
+        kept = dedupe_experiences(experiences)
+        self.assertEqual([exp['text'] for exp in kept], [BASE, experiences[1]['text']])
+        self.assertEqual(kept[0]['keywords'], ['rejection', 'career'])
+        self.assertEqual(kept[0]['source_urls'], ['https://example.com/a', 'https://example.com/b'])
+        self.assertNotIn('source_urls', kept[1])
+
+    def test_cosine_pass_catches_paraphrases(self):
+        experiences = [
+            {'text': "Fired from Apple in 1985.", 'keywords': ['a'], 'embedding': [1.0, 0.0, 0.0]},
+            {'text': "Apple's board removed him that year.", 'keywords': ['b'], 'embedding': [0.99, 0.05, 0.0]},
+            {'text': "Founded NeXT.", 'keywords': ['c'], 'embedding': [0.0, 1.0, 0.0]},
+        ]
+        self.assertEqual(len(dedupe_experiences(experiences, cosine_threshold=None)), 3)
+
+        kept = dedupe_experiences(experiences, cosine_threshold=0.95)
+        self.assertEqual([exp['text'] for exp in kept], [experiences[0]['text'], experiences[2]['text']])
+        self.assertEqual(kept[0]['keywords'], ['a', 'b'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Offline tests for experiences.txt parsing and experience IDs
+
+    python -m unittest tests.test_experience_parsing
+"""
+
+import unittest
+
+from embedding_tool import experience_id, iter_experiences
+from tests.support import temporary_directory
+
+
+class IterExperiencesTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = temporary_directory(self)
+
+    def parse(self, content: str, newline: str = "\n"):
+        path = self.folder / "experiences.txt"
+        with open(path, 'w', encoding='utf-8', newline=newline) as f:
+            f.write(content)
+        warnings = []
+        experiences = list(iter_experiences(
+            str(path), on_malformed=lambda file_path, line, message: warnings.append((line, message))
+        ))
+        return experiences, warnings
+
+    def test_tags_and_text(self):
+        experiences, warnings = self.parse(
+            "[KEYWORDS: rejection, career-setback , ]\n"
+            "[SOURCE: https://example.com/a]\n"
+            "He was fired from the company he founded.\n"
+            "---\n"
+            "Dropped out of college.\n"
+        )
+        self.assertEqual(warnings, [])
+        self.assertEqual(len(experiences), 2)
+        self.assertEqual(experiences[0]['keywords'], ['rejection', 'career-setback'])
+        self.assertEqual(experiences[0]['source_url'], 'https://example.com/a')
+        self.assertEqual(experiences[0]['text'], 'He was fired from the company he founded.')
+        self.assertEqual(experiences[1]['keywords'], [])
+        self.assertNotIn('source_url', experiences[1])
+
+    def test_bracketed_text_is_kept(self):
+        experiences, _ = self.parse(
+            "[KEYWORDS: quote]\n"
+            "[Note: paraphrased] He said it was the best thing that happened.\n"
+            "[1] Second line.\n"
+        )
+        self.assertEqual(
+            experiences[0]['text'],
+            "[Note: paraphrased] He said it was the best thing that happened.\n[1] Second line."
+        )
+
+    def test_crlf_line_endings(self):
+        experiences, _ = self.parse(
+            "[KEYWORDS: a, b]\n[SOURCE: https://example.com/b]\nFirst.\n---\nSecond.\n",
+            newline="\r\n"
+        )
+        self.assertEqual([exp['text'] for exp in experiences], ['First.', 'Second.'])
+        self.assertEqual(experiences[0]['source_url'], 'https://example.com/b')
+        self.assertEqual(experiences[0]['keywords'], ['a', 'b'])
+
+    def test_stray_separators(self):
+        experiences, warnings = self.parse("---\n\n---\nOnly one.\n---\n---\n\n")
+        self.assertEqual([exp['text'] for exp in experiences], ['Only one.'])
+        self.assertEqual(warnings, [])
+
+    def test_malformed_blocks_are_reported(self):
+        experiences, warnings = self.parse(
+            "Fine.\n"
+            "---\n"
+            "[KEYWORDS: orphan]\n"
+            "---\n"
+            "[SOURCE: https://example.com/1]\n"
+            "[SOURCE: https://example.com/2]\n"
+            "Twice sourced.\n"
+        )
+        self.assertEqual([exp['text'] for exp in experiences], ['Fine.', 'Twice sourced.'])
+        self.assertEqual(experiences[1]['source_url'], 'https://example.com/2')
+        self.assertEqual([line for line, _ in warnings], [3, 6])
+
+    def test_ids_match_experience_id(self):
+        experiences, _ = self.parse("[SOURCE: https://example.com/a]\nText.\n---\nText.\n")
+        self.assertEqual(experiences[0]['id'], experience_id('Text.', 'https://example.com/a'))
+        self.assertEqual(experiences[1]['id'], experience_id('Text.'))
+
+
+class ExperienceIdTest(unittest.TestCase):
+    def test_ignores_whitespace_and_case(self):
+        self.assertEqual(
+            experience_id("Fired  from Apple\nin 1985.", "https://example.com/a"),
+            experience_id("fired from apple in 1985.", " https://example.com/a ")
+        )
+
+    def test_depends_on_text_and_source(self):
+        base = experience_id("Fired from Apple.", "https://example.com/a")
+        self.assertNotEqual(base, experience_id("Fired from Pixar.", "https://example.com/a"))
+        self.assertNotEqual(base, experience_id("Fired from Apple.", "https://example.com/b"))
+
+    def test_format(self):
+        value = experience_id("Fired from Apple.")
+        self.assertEqual(len(value), 16)
+        int(value, 16)
+        self.assertEqual(value, experience_id("Fired from Apple."))
+
+
+if __name__ == "__main__":
+    unittest.main()
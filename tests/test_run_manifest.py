@@ -0,0 +1,69 @@
+"""
+Offline tests for the batch run manifest
+
+    python -m unittest tests.test_run_manifest
+"""
+
+import os
+import unittest
+from pathlib import Path
+
+from run_manifest import RunManifest, stage_outputs
+from tests.support import temporary_directory
+
+
+class RunManifestTest(unittest.TestCase):
+    def setUp(self):
+        # Stage inputs and outputs are relative to the working directory
+        cwd = os.getcwd()
+        os.chdir(temporary_directory(self))
+        self.addCleanup(os.chdir, cwd)
+
+        self.person = "Steve Jobs"
+        self.experiences = Path(stage_outputs(self.person, "stage1")[0])
+        self.vectors = Path(stage_outputs(self.person, "stage2")[0])
+
+    def write(self, path: Path, content: str):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+
+    def test_missing_and_failed_stages_are_not_up_to_date(self):
+        manifest = RunManifest()
+        self.assertFalse(manifest.is_up_to_date(self.person, "stage1"))
+
+        # A stage that exits cleanly without its output failed
+        self.assertFalse(manifest.record(self.person, "stage1", True, RunManifest.start()))
+        self.assertFalse(manifest.is_up_to_date(self.person, "stage1"))
+        self.assertTrue(manifest.has_failure(self.person))
+
+        self.write(self.experiences, "Fired from Apple.\n")
+        self.assertFalse(manifest.record(self.person, "stage1", False, RunManifest.start()))
+        self.assertFalse(manifest.is_up_to_date(self.person, "stage1"))
+
+    def test_completed_stage_persists(self):
+        self.write(self.experiences, "Fired from Apple.\n")
+        self.assertTrue(RunManifest().record(self.person, "stage1", True, RunManifest.start()))
+
+        manifest = RunManifest()
+        self.assertTrue(manifest.is_up_to_date(self.person, "stage1"))
+        self.assertFalse(manifest.has_failure(self.person))
+
+        # Hand edits to an output do not force a re-run; deleting it does
+        self.write(self.experiences, "Edited.\n")
+        self.assertTrue(manifest.is_up_to_date(self.person, "stage1"))
+        self.experiences.unlink()
+        self.assertFalse(manifest.is_up_to_date(self.person, "stage1"))
+
+    def test_changed_input_makes_stage2_stale(self):
+        manifest = RunManifest()
+        self.write(self.experiences, "Fired from Apple.\n")
+        self.write(self.vectors, "{}")
+        self.assertTrue(manifest.record(self.person, "stage2", True, RunManifest.start()))
+        self.assertTrue(manifest.is_up_to_date(self.person, "stage2"))
+
+        self.write(self.experiences, "Fired from Apple.\n---\nFounded NeXT.\n")
+        self.assertFalse(manifest.is_up_to_date(self.person, "stage2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
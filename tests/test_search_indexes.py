@@ -0,0 +1,280 @@
+"""
+Offline tests for the search indexes: approximate engines against exact
+search, hot reload, keyword/person filters, BM25 and rank fusion
+
+    python -m unittest tests.test_search_indexes
+"""
+
+import contextlib
+import io
+import math
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from ann_index import build_ivf
+from filter_index import FilterIndex, SearchFilter
+from lexical_index import (
+    B, K1, BM25Index, document_tokens, merge_postings, reciprocal_rank_fusion, term_postings, tokenize
+)
+from projection import build_projection
+from quantization import build_int8
+from tests.support import clustered_matrix, person_data, temporary_directory, write_vector_db
+from vector_index import VectorIndex, rebuild_indexes
+from vector_store import normalize_rows, pack_corpus
+
+
+PERSONS = 7
+
+
+def persons_of(matrix: np.ndarray, first: int = 0):
+    """person_data() dicts dealing the rows of a matrix round-robin over PERSONS people"""
+    persons = {}
+    for p in range(PERSONS):
+        ids = np.arange(p, len(matrix), PERSONS)
+        persons[f"person_{first + p}"] = person_data(
+            f"Person {first + p}", matrix[ids], keywords=[[f"k{i % 3}"] for i in ids]
+        )
+    return persons
+
+
+class ApproximateEngineTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        db_folder = write_vector_db(temporary_directory(cls), persons_of(clustered_matrix()))
+        pack_corpus(db_folder)
+        build_ivf(db_folder, nlist=32, nprobe=4)
+        build_int8(db_folder)
+        build_projection(db_folder, dims=16)
+        cls.index = VectorIndex.from_folder(db_folder)
+
+        rng = np.random.default_rng(2)
+        sample = rng.choice(len(cls.index), size=50, replace=False)
+        cls.queries = cls.index.matrix[sample] + rng.normal(scale=0.05, size=(len(sample), cls.index.matrix.shape[1]))
+
+    def recall(self, engine: str, search_filter: SearchFilter = None) -> float:
+        recalls = []
+        for query in self.queries:
+            exact = self.index.search(query, top_k=10, search_filter=search_filter)
+            approx = self.index.search(query, top_k=10, engine=engine, search_filter=search_filter)
+            self.assertEqual(len(approx), len(exact))
+            recalls.append(len({m['text'] for m in exact} & {m['text'] for m in approx}) / len(exact))
+        return float(np.mean(recalls))
+
+    def test_persisted_indexes_are_loaded(self):
+        self.assertIsNotNone(self.index.ivf)
+        self.assertIsNotNone(self.index.quantized)
+        self.assertIsNotNone(self.index.projection)
+
+    def test_recall_against_exact(self):
+        for engine in ("ivf", "int8", "pca"):
+            with self.subTest(engine=engine):
+                self.assertGreaterEqual(self.recall(engine), 0.9)
+
+    def test_filtered_recall_against_exact(self):
+        search_filter = SearchFilter(include_keywords=["K1"], exclude_persons=["person 2"])
+        for engine in ("ivf", "int8", "pca"):
+            with self.subTest(engine=engine):
+                self.assertGreaterEqual(self.recall(engine, search_filter), 0.9)
+                for match in self.index.search(self.queries[0], top_k=10, engine=engine, search_filter=search_filter):
+                    self.assertEqual(match['keywords'], ["k1"])
+                    self.assertNotEqual(match['person'], "Person 2")
+
+    def test_similarities_are_rescored_exactly(self):
+        query = self.queries[0]
+        normalized = normalize_rows(np.asarray(query, dtype=np.float32))
+        texts = [row['text'] for row in self.index.rows]
+        for engine in ("ivf", "int8", "pca"):
+            for match in self.index.search(query, top_k=5, engine=engine):
+                expected = float(self.index.matrix[texts.index(match['text'])] @ normalized)
+                self.assertAlmostEqual(match['similarity'], expected, places=5)
+
+    def test_search_many_matches_search(self):
+        for engine in ("exact", "ivf"):
+            with self.subTest(engine=engine):
+                batched = self.index.search_many(self.queries[:5], top_k=5, engine=engine)
+                for query, matches in zip(self.queries[:5], batched):
+                    single = self.index.search(query, top_k=5, engine=engine)
+                    self.assertEqual([m['text'] for m in matches], [m['text'] for m in single])
+                    np.testing.assert_allclose(
+                        [m['similarity'] for m in matches], [m['similarity'] for m in single], atol=1e-5
+                    )
+
+    def test_ivf_scans_only_some_lists(self):
+        candidates = self.index.ivf.candidates(normalize_rows(self.queries[0]))
+        self.assertLess(len(candidates), len(self.index))
+        self.assertEqual(len(np.unique(candidates)), len(candidates))
+
+
+class HotReloadTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = temporary_directory(self)
+        self.db_folder = write_vector_db(self.folder, persons_of(clustered_matrix(n=700)))
+        build_ivf(self.db_folder, nlist=8, nprobe=2)
+        build_int8(self.db_folder)
+        build_projection(self.db_folder, dims=16)
+        self.index = VectorIndex.from_folder(self.db_folder)
+
+    def test_unchanged_folder(self):
+        self.assertIsNone(self.index.refreshed(self.db_folder))
+
+    def test_new_rows_are_searchable_with_every_engine(self):
+        new_rows = clustered_matrix(n=70, seed=3)
+        write_vector_db(self.folder, persons_of(new_rows, first=PERSONS))
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            refreshed = self.index.refreshed(self.db_folder)
+        # The stale indexes on disk are expected here and carried over silently
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(len(refreshed), 770)
+
+        for engine, attribute in (("ivf", "ivf"), ("int8", "quantized"), ("pca", "projection")):
+            with self.subTest(engine=engine):
+                self.assertIsNotNone(getattr(refreshed, attribute))
+                hits = 0
+                for row in new_rows:
+                    top = refreshed.search(row, top_k=1, engine=engine, nprobe=8)[0]
+                    hits += top['similarity'] > 0.999
+                self.assertEqual(hits, len(new_rows))
+
+    def test_ivf_keeps_the_lists_of_unchanged_rows(self):
+        write_vector_db(self.folder, persons_of(clustered_matrix(n=70, seed=3), first=PERSONS))
+        refreshed = self.index.refreshed(self.db_folder)
+        # Persons are ordered by file stem, so the new rows are interleaved with the old ones
+        old = dict(zip((row['text'] for row in self.index.rows), self.index.ivf.assignments()))
+        kept = [
+            (list_id, old[row['text']])
+            for row, list_id in zip(refreshed.rows, refreshed.ivf.assignments()) if row['text'] in old
+        ]
+        self.assertEqual(len(kept), 700)
+        self.assertTrue(all(new == previous for new, previous in kept))
+        np.testing.assert_array_equal(refreshed.ivf.centroids, self.index.ivf.centroids)
+
+
+class FilterIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = FilterIndex.build([
+            {'person': "Steve Jobs", 'keywords': ["Rejection", "career"]},
+            {'person': "Steve Jobs", 'keywords': ["education"]},
+            {'person': "Oprah  Winfrey", 'keywords': ["rejection"]},
+            {'person': "Walt Disney", 'keywords': []},
+        ])
+
+    def select(self, **kwargs):
+        return self.index.select(SearchFilter(**kwargs)).tolist()
+
+    def test_empty_filter_allows_everything(self):
+        self.assertIsNone(self.index.select(None))
+        self.assertIsNone(self.index.select(SearchFilter()))
+
+    def test_include_and_exclude(self):
+        self.assertEqual(self.select(include_keywords=["rejection"]), [0, 2])
+        self.assertEqual(self.select(include_keywords=["rejection", "education"]), [0, 1, 2])
+        self.assertEqual(self.select(include_persons=["steve jobs"]), [0, 1])
+        self.assertEqual(self.select(exclude_keywords=["rejection"]), [1, 3])
+        self.assertEqual(self.select(exclude_persons=["Steve Jobs"]), [2, 3])
+        self.assertEqual(self.select(include_keywords=["rejection"], exclude_persons=["Steve Jobs"]), [2])
+
+    def test_terms_are_normalized(self):
+        self.assertEqual(self.select(include_keywords=[" REJECTION "]), [0, 2])
+        self.assertEqual(self.select(include_persons=["oprah winfrey"]), [2])
+
+    def test_unknown_terms(self):
+        self.assertEqual(self.select(include_keywords=["unknown"]), [])
+        self.assertEqual(self.select(exclude_keywords=["unknown"]), [0, 1, 2, 3])
+
+
+LEXICAL_ROWS = [
+    {'text': "Fired from Apple, the company he founded.", 'keywords': ["rejection", "career"]},
+    {'text': "Dropped out of college and took a calligraphy class.", 'keywords': ["education"]},
+    {'text': "Apple bought NeXT and he returned to Apple.", 'keywords': ["comeback", "career"]},
+    {'text': "Diagnosed with pancreatic cancer.", 'keywords': ["health"]},
+    {'text': "The the the of and.", 'keywords': []},
+]
+
+
+def reference_bm25(rows, query_tokens):
+    """Textbook BM25 scores, one document at a time"""
+    documents = [Counter(document_tokens(row)) for row in rows]
+    lengths = [sum(document.values()) for document in documents]
+    avgdl = sum(lengths) / len(lengths)
+    scores = []
+    for document, length in zip(documents, lengths):
+        score = 0.0
+        for token in set(query_tokens):
+            df = sum(1 for other in documents if token in other)
+            tf = document.get(token, 0)
+            if tf:
+                idf = math.log1p((len(documents) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avgdl))
+        scores.append(score)
+    return np.array(scores)
+
+
+class BM25Test(unittest.TestCase):
+    def test_scores_match_reference(self):
+        index = BM25Index.build(LEXICAL_ROWS)
+        for query in ("apple career", "Apple's college CALLIGRAPHY", "cancer", "the of", "unknown words"):
+            with self.subTest(query=query):
+                np.testing.assert_allclose(
+                    index.scores(query), reference_bm25(LEXICAL_ROWS, tokenize(query)), rtol=1e-5, atol=1e-6
+                )
+
+    def test_search_order_and_restriction(self):
+        index = BM25Index.build(LEXICAL_ROWS)
+        ids, scores = index.search("apple career", top_k=5)
+        self.assertEqual(ids.tolist(), [2, 0])
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+
+        ids, _ = index.search("apple career", top_k=5, rows=np.array([0, 1, 3]))
+        self.assertEqual(ids.tolist(), [0])
+        self.assertEqual(len(index.search("unknown", top_k=5)[0]), 0)
+
+    def test_merged_postings_match_whole_corpus(self):
+        whole = term_postings(LEXICAL_ROWS)
+        merged = merge_postings([term_postings(LEXICAL_ROWS[:2]), term_postings(LEXICAL_ROWS[2:])])
+        for name in ('terms', 'term_ids', 'row_ids', 'tfs', 'lengths'):
+            np.testing.assert_array_equal(merged[name], whole[name], err_msg=name)
+
+    def test_reciprocal_rank_fusion(self):
+        ids, scores = reciprocal_rank_fusion([np.array([3, 1, 2]), np.array([1, 4])], k=60)
+        self.assertEqual(ids.tolist(), [1, 3, 4, 2])
+        self.assertAlmostEqual(scores[0], 1 / 62 + 1 / 61)
+        self.assertAlmostEqual(scores[1], 1 / 61)
+        self.assertAlmostEqual(scores[2], 1 / 62)
+        self.assertAlmostEqual(scores[3], 1 / 63)
+
+    def test_lexical_search_reports_raw_scores(self):
+        index = VectorIndex(np.eye(len(LEXICAL_ROWS), dtype=np.float32), [dict(row, person="P") for row in LEXICAL_ROWS])
+        matches = index.lexical_search("apple career", top_k=5)
+        self.assertEqual([match['text'] for match in matches], [LEXICAL_ROWS[2]['text'], LEXICAL_ROWS[0]['text']])
+        self.assertAlmostEqual(matches[0]['bm25'], float(index.lexical.scores("apple career")[2]), places=5)
+        self.assertTrue(all(match['mode'] == "lexical" for match in matches))
+
+
+
+class RebuildIndexesTest(unittest.TestCase):
+    def test_stale_indexes_are_rebuilt_with_their_settings(self):
+        folder = temporary_directory(self)
+        db_folder = write_vector_db(folder, persons_of(clustered_matrix(n=700)))
+        build_ivf(db_folder, nlist=8, nprobe=2)
+        build_int8(db_folder, rescore=50)
+        build_projection(db_folder, dims=16, shortlist=50)
+        # The packed BM25 index is built even if it never was
+        self.assertEqual(rebuild_indexes(db_folder), ["bm25"])
+        self.assertEqual(rebuild_indexes(db_folder), [])
+
+        write_vector_db(folder, persons_of(clustered_matrix(n=70, seed=3), first=PERSONS))
+        self.assertEqual(rebuild_indexes(db_folder), ["ivf", "int8", "projection", "bm25"])
+        index = VectorIndex.from_folder(db_folder)
+        self.assertEqual(len(index.ivf.row_ids), 770)
+        self.assertEqual((index.ivf.nlist, index.ivf.nprobe), (8, 2))
+        self.assertEqual((len(index.quantized.codes), index.quantized.rescore), (770, 50))
+        self.assertEqual((len(index.projection.projected), index.projection.dims), (770, 16))
+        self.assertEqual(len(BM25Index.load(db_folder, index.sources)), 770)
+
+
+if __name__ == "__main__":
+    unittest.main()
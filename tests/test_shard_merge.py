@@ -0,0 +1,54 @@
+"""
+Offline tests for merging the experiences.txt fragments of sharded scraping
+
+    python -m unittest tests.test_shard_merge
+"""
+
+import unittest
+from pathlib import Path
+
+from deep_scraper import merge_experience_fragments
+from tests.support import temporary_directory
+
+
+class MergeExperienceFragmentsTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = temporary_directory(self)
+        self.urls = ["https://example.com/one", "https://example.com/two", "https://example.com/three"]
+
+    def fragment(self, name: str, content: str, newline: str = "\n") -> Path:
+        path = self.folder / name / "experiences.txt"
+        path.parent.mkdir()
+        with open(path, 'w', encoding='utf-8', newline=newline) as f:
+            f.write(content)
+        return path
+
+    def test_orders_by_citation_then_shard(self):
+        first = self.fragment("shard_0", (
+            "[SOURCE: https://example.com/three]\nC.\n---\n"
+            "[SOURCE: https://elsewhere.org/x]\nUnlisted.\n---\n"
+            "[SOURCE: https://example.com/one]\nA1.\n"
+        ))
+        second = self.fragment("shard_1", (
+            "---\n[SOURCE: https://example.com/one]\nA2.\n---\n"
+            "No source.\n---\n"
+            "[SOURCE: HTTPS://Example.com/two]\nB.\n---\n"
+        ), newline="\r\n")
+
+        merged, duplicates = merge_experience_fragments(self.urls, [first, second])
+        self.assertEqual(duplicates, 0)
+        self.assertEqual([number for number, _ in merged], [1, 1, 2, 3, None, None])
+        self.assertEqual([block.splitlines()[-1] for _, block in merged], ["A1.", "A2.", "B.", "C.", "Unlisted.", "No source."])
+
+    def test_drops_duplicates_across_shards(self):
+        first = self.fragment("shard_0", "[SOURCE: https://example.com/two]\nFired  from Apple.\n")
+        second = self.fragment("shard_1", "[SOURCE: https://example.com/two]\nfired from apple.\n---\nOther.\n")
+        missing = self.folder / "shard_2" / "experiences.txt"
+
+        merged, duplicates = merge_experience_fragments(self.urls, [first, second, missing])
+        self.assertEqual(duplicates, 1)
+        self.assertEqual([block for _, block in merged], ["[SOURCE: https://example.com/two]\nFired  from Apple.", "Other."])
+
+
+if __name__ == "__main__":
+    unittest.main()
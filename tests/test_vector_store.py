@@ -0,0 +1,79 @@
+"""
+Offline tests for the binary vector store
+
+    python -m unittest tests.test_vector_store
+"""
+
+import unittest
+
+import numpy as np
+
+from tests.support import clustered_matrix, person_data, temporary_directory, write_vector_db
+from vector_store import StackedRows, load_corpus, load_corpus_parts, pack_corpus
+
+
+class StackedRowsTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.blocks = [
+            rng.normal(size=(3, 4)).astype(np.float16),
+            np.zeros((0, 4), dtype=np.float32),
+            rng.normal(size=(5, 4)).astype(np.float32)
+        ]
+        self.stacked = StackedRows(self.blocks)
+        self.whole = np.concatenate(self.blocks).astype(np.float32)
+
+    def test_shape(self):
+        self.assertEqual(self.stacked.shape, (8, 4))
+        self.assertEqual(len(self.stacked), 8)
+        self.assertEqual(StackedRows([]).shape, (0, 0))
+        with self.assertRaises(ValueError):
+            StackedRows([np.zeros((1, 4)), np.zeros((1, 3))])
+
+    def test_indexing_matches_concatenation(self):
+        ids = np.array([7, 0, 3, 2, -1])
+        for key in (4, -2, slice(None), slice(2, 6), slice(4, 8), slice(1, 7, 2), slice(5, 5), ids, self.whole[:, 0] > 0):
+            with self.subTest(key=key):
+                rows = self.stacked[key]
+                self.assertEqual(rows.dtype, np.float32)
+                np.testing.assert_array_equal(rows, self.whole[key])
+
+    def test_chunks_and_views(self):
+        chunks = list(self.stacked.chunks(chunk_size=2))
+        self.assertEqual([start for start, _ in chunks], [0, 2, 3, 5, 7])
+        np.testing.assert_array_equal(np.concatenate([chunk for _, chunk in chunks]), self.whole)
+
+        views = self.stacked.views(2, 5)
+        self.assertEqual([len(view) for view in views], [1, 2])
+        self.assertTrue(all(np.shares_memory(view, block) for view, block in zip(views, self.blocks[::2])))
+
+
+class LoadCorpusTest(unittest.TestCase):
+    def setUp(self):
+        self.matrix = clustered_matrix(n=60, d=8)
+        self.db_folder = write_vector_db(temporary_directory(self), {
+            "person_a": person_data("Person A", self.matrix[:25]),
+            "person_b": person_data("Person B", self.matrix[25:])
+        })
+
+    def test_float16_corpus_stays_float16_on_disk(self):
+        pack_corpus(self.db_folder, dtype="float16")
+        matrix, rows, counts = load_corpus_parts(self.db_folder)
+        self.assertEqual(len(matrix.blocks), 1)
+        self.assertIsInstance(matrix.blocks[0], np.memmap)
+        self.assertEqual(matrix.blocks[0].dtype, np.float16)
+        self.assertEqual(counts, {"person_a": 25, "person_b": 35})
+        np.testing.assert_allclose(matrix[:], self.matrix, atol=1e-3)
+        self.assertEqual(rows[25]['person'], "Person B")
+
+    def test_stale_corpus_stacks_person_files(self):
+        # No packed corpus at all: every person's own file is mapped
+        matrix, rows = load_corpus(self.db_folder)
+        self.assertEqual(len(matrix.blocks), 2)
+        self.assertTrue(matrix.memory_mapped)
+        self.assertEqual(len(rows), 60)
+        np.testing.assert_allclose(matrix[:], self.matrix, rtol=1e-6, atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
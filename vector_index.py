@@ -0,0 +1,654 @@
+"""
+Vector Index Module
+
+Holds every experience embedding from data/vector_db as one matrix of
+L2-normalized rows (memory-mapped from the binary store and read in
+float32 chunks), so a search is a chunked matrix-vector product plus a
+top-k partial selection instead of a per-file JSON scan.
+
+A long-running process can call watch_index() to pick up persons that
+Stage 2 adds or updates: changed persons are reloaded in a background
+thread and the new index replaces the old one in a single reference swap,
+so searches never wait for or see a half-built index.
+
+Besides vector search, every index carries a BM25 index over the same rows
+(see lexical_index.py): "lexical" search needs no query embedding at all,
+and "hybrid" search fuses the vector and lexical rankings by reciprocal rank.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List, Dict, Optional, Tuple
+
+import numpy as np
+
+from ann_index import IVF_NAME, IVFIndex, build_ivf
+from filter_index import FilterIndex, SearchFilter
+from lexical_index import BM25_NAME, BM25Index, build_bm25, reciprocal_rank_fusion
+from projection import PROJECTION_NAME, ProjectionIndex, build_projection
+from quantization import INT8_NAME, ScalarQuantizedIndex, build_int8
+from vector_store import (
+    StackedRows, index_dir, load_corpus_parts, load_person, normalize_rows, source_versions
+)
+
+
+SEARCH_ENGINES = ("exact", "ivf", "int8", "pca")
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+# Results taken from each ranking before hybrid fusion (at least top_k)
+HYBRID_DEPTH = 50
+
+# Upper bound on the score matrix of one batched scan (rows x queries, ~128 MB)
+MAX_SCORE_ELEMENTS = 32 * 1024 * 1024
+
+# Rows cast to float32 and scored at a time by a full scan
+SCAN_CHUNK_ROWS = 65536
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the top_k highest scores, best first
+
+    Uses argpartition so only the k winners are fully sorted.
+    """
+    top_k = min(top_k, len(scores))
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < len(scores):
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def top_k_per_row(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the top_k highest scores in every row of a score matrix, best first
+
+    Args:
+        scores: (queries, n) score matrix
+        top_k: Results per row
+
+    Returns:
+        (queries, min(top_k, n)) index matrix
+    """
+    top_k = min(top_k, scores.shape[1])
+    if top_k <= 0:
+        return np.empty((len(scores), 0), dtype=np.int64)
+    if top_k < scores.shape[1]:
+        candidates = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class VectorIndex:
+    """Resident index of normalized experience embeddings"""
+
+    def __init__(
+        self,
+        matrix,
+        rows: List[Dict],
+        ivf: Optional[IVFIndex] = None,
+        quantized: Optional[ScalarQuantizedIndex] = None,
+        projection: Optional[ProjectionIndex] = None,
+        sources: Optional[Dict[str, int]] = None,
+        counts: Optional[Dict[str, int]] = None,
+        lexical: Optional[BM25Index] = None,
+        mtime: Optional[int] = None
+    ):
+        """
+        Initialize the index
+
+        Args:
+            matrix: StackedRows (or an (n, dimensions) array) of L2-normalized embeddings
+            rows: Per-row metadata dicts with 'person', 'keywords', 'text'
+                  and optionally 'source_url'
+            ivf: Optional IVF index over the same rows for approximate search
+            quantized: Optional int8 codes over the same rows
+            projection: Optional low-dimensional projection of the same rows
+            sources: Person JSON versions the rows were loaded from (see source_versions)
+            counts: Rows per person file stem, in row order
+            lexical: BM25 index over the same rows (built from rows if omitted)
+            mtime: Folder mtime_ns taken before the rows were read
+        """
+        self.matrix = matrix if isinstance(matrix, StackedRows) else StackedRows([np.asarray(matrix)])
+        self.rows = rows
+        self.ivf = ivf
+        self.quantized = quantized
+        self.projection = projection
+        self.sources = sources
+        self.counts = counts
+        # Keyword and person posting lists for filtered searches
+        self.filters = FilterIndex.build(rows)
+        self.lexical = lexical if lexical is not None else BM25Index.build(rows)
+        self.mtime = mtime
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def from_folder(cls, db_folder: str = "data/vector_db") -> "VectorIndex":
+        """
+        Build an index from a vector database folder
+
+        Reads the memory-mapped binary store when it is up to date and
+        falls back to the per-person JSON files otherwise. Persisted IVF, int8
+        and projection indexes are attached if they match the loaded data;
+        the BM25 index is loaded packed or merged from per-person postings.
+
+        Args:
+            db_folder: Path to vector database folder
+
+        Returns:
+            VectorIndex over every experience in the folder
+        """
+        mtime = Path(db_folder).stat().st_mtime_ns
+        sources = source_versions(db_folder)
+        matrix, rows, counts = load_corpus_parts(db_folder)
+        lexical = BM25Index.load(db_folder, sources)
+        if lexical is None:
+            lexical = BM25Index.assemble(db_folder, rows, counts)
+        return cls(
+            matrix,
+            rows,
+            ivf=IVFIndex.load(db_folder, sources),
+            quantized=ScalarQuantizedIndex.load(db_folder, sources),
+            projection=ProjectionIndex.load(db_folder, sources),
+            sources=sources,
+            counts=counts,
+            lexical=lexical,
+            mtime=mtime
+        )
+
+    def refreshed(self, db_folder: str = "data/vector_db") -> Optional["VectorIndex"]:
+        """
+        Build a new index reflecting the current folder contents
+
+        Only persons whose JSON file was added or changed are read from disk;
+        unchanged persons reuse this index's rows without copying them. Approximate
+        indexes that were not rebuilt for the new data are carried over: new
+        rows are assigned to the existing IVF lists, int8 scales and
+        projection basis (see rebuild_indexes). This index is left untouched.
+
+        Args:
+            db_folder: Path to vector database folder this index was loaded from
+
+        Returns:
+            The new VectorIndex, or None if nothing changed
+        """
+        mtime = Path(db_folder).stat().st_mtime_ns
+        sources = source_versions(db_folder)
+        if sources == self.sources:
+            return None
+        if self.sources is None or self.counts is None:
+            return VectorIndex.from_folder(db_folder)
+
+        spans = {}
+        start = 0
+        for stem, count in self.counts.items():
+            spans[stem] = (start, start + count)
+            start += count
+
+        blocks = []
+        rows = []
+        counts = {}
+        # Row ID of every new row in this index (-1 for rows read from disk)
+        previous = []
+        for stem, version in sources.items():
+            if self.sources.get(stem) == version and stem in spans:
+                start, end = spans[stem]
+                blocks.extend(self.matrix.views(start, end))
+                person_rows = self.rows[start:end]
+                previous.append(np.arange(start, end))
+            else:
+                matrix, person_rows = load_person(db_folder, Path(db_folder) / f"{stem}.json")
+                blocks.append(matrix)
+                previous.append(np.full(len(person_rows), -1))
+            rows.extend(person_rows)
+            counts[stem] = len(person_rows)
+
+        matrix = StackedRows(blocks)
+        previous = np.concatenate(previous) if previous else np.empty(0, dtype=np.int64)
+
+        def carried(index, loaded):
+            # A rebuilt index on disk wins; otherwise the current one is extended
+            if loaded is not None or index is None or len(matrix) == 0:
+                return loaded
+            return index.remapped(matrix, previous)
+
+        lexical = BM25Index.load(db_folder, sources)
+        if lexical is None:
+            lexical = BM25Index.assemble(db_folder, rows, counts)
+        # Stale indexes on disk are expected here, so their loads stay quiet
+        return VectorIndex(
+            matrix,
+            rows,
+            ivf=carried(self.ivf, IVFIndex.load(db_folder, sources, warn=False)),
+            quantized=carried(self.quantized, ScalarQuantizedIndex.load(db_folder, sources, warn=False)),
+            projection=carried(self.projection, ProjectionIndex.load(db_folder, sources, warn=False)),
+            sources=sources,
+            counts=counts,
+            lexical=lexical,
+            mtime=mtime
+        )
+
+    def result(self, row_id: int, similarity: float, **extra) -> Dict:
+        """Build a match dict for a single row, plus any extra fields"""
+        row = self.rows[row_id]
+        match = {
+            'person': row['person'],
+            'keywords': row['keywords'],
+            'text': row['text'],
+            'similarity': float(similarity)
+        }
+        if 'source_url' in row:
+            match['source_url'] = row['source_url']
+        if 'source_urls' in row:
+            match['source_urls'] = row['source_urls']
+        match.update(extra)
+        return match
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        engine: str = "exact",
+        nprobe: Optional[int] = None,
+        rescore: Optional[int] = None,
+        shortlist: Optional[int] = None,
+        search_filter: Optional[SearchFilter] = None
+    ) -> List[Dict]:
+        """
+        Find the experiences most similar to a query embedding
+
+        Args:
+            query_embedding: Raw (unnormalized) query embedding
+            top_k: Number of top results to return
+            engine: "exact" for a full scan, "ivf" to scan only the nprobe
+                    closest IVF lists, "int8" to shortlist with quantized
+                    codes, or "pca" to shortlist in the projected space;
+                    shortlists are rescored at full precision (approximate
+                    engines fall back to exact if their index is not loaded)
+            nprobe: Number of IVF lists to scan (default: index setting)
+            rescore: Number of int8 candidates rescored (default: index setting)
+            shortlist: Number of projection candidates reranked (default: index setting)
+            search_filter: Keyword/person restrictions, applied before any scoring
+
+        Returns:
+            List of matches with person, keywords, text, similarity
+        """
+        if not self.rows:
+            return []
+
+        allowed = self.filters.select(search_filter)
+        if allowed is not None and len(allowed) == 0:
+            return []
+
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+        ids, scores = self._ranked(query, top_k, engine, nprobe, rescore, shortlist, allowed)
+        return [self.result(row_id, score) for row_id, score in zip(ids, scores)]
+
+    def _row_chunks(self, rows: Optional[np.ndarray] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """(position, float32 rows) chunks of every row, or of the given row IDs"""
+        if rows is None:
+            yield from self.matrix.chunks(SCAN_CHUNK_ROWS)
+        else:
+            for start in range(0, len(rows), SCAN_CHUNK_ROWS):
+                yield start, self.matrix[rows[start:start + SCAN_CHUNK_ROWS]]
+
+    def _scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of a normalized query with every row, or with the given row IDs"""
+        scores = np.empty(len(self) if rows is None else len(rows), dtype=np.float32)
+        for start, chunk in self._row_chunks(rows):
+            scores[start:start + len(chunk)] = chunk @ query
+        return scores
+
+    def _ranked(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        engine: str,
+        nprobe: Optional[int],
+        rescore: Optional[int],
+        shortlist: Optional[int],
+        allowed: Optional[np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top rows for a normalized query embedding
+
+        Args:
+            query: L2-normalized query embedding
+            top_k, engine, nprobe, rescore, shortlist: As in search()
+            allowed: Sorted row IDs passing the filter (None for every row)
+
+        Returns:
+            (row IDs, cosine similarities), best first
+        """
+        candidates = allowed
+        if engine == "ivf" and self.ivf is not None:
+            probed = self.ivf.candidates(query, nprobe)
+            # A filter smaller than the probed lists is cheaper to scan exactly
+            if allowed is None or len(allowed) > len(probed):
+                candidates = probed if allowed is None else np.intersect1d(probed, allowed, assume_unique=True)
+        elif engine == "int8" and self.quantized is not None:
+            candidates = self.quantized.candidates(query, max(rescore or self.quantized.rescore, top_k), rows=allowed)
+        elif engine == "pca" and self.projection is not None:
+            candidates = self.projection.candidates(
+                query, max(shortlist or self.projection.shortlist, top_k), rows=allowed
+            )
+
+        if candidates is not None:
+            # Exact scores for the shortlist only; sorted IDs keep memory-mapped reads sequential
+            candidates = np.sort(candidates)
+            scores = self._scores(query, candidates)
+            best = top_k_indices(scores, top_k)
+            return candidates[best], scores[best]
+
+        scores = self._scores(query)
+        best = top_k_indices(scores, top_k)
+        return best, scores[best]
+
+    def lexical_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        search_filter: Optional[SearchFilter] = None
+    ) -> List[Dict]:
+        """
+        Find the experiences with the highest BM25 scores for a query text
+
+        Needs no query embedding. Matches are tagged "mode": "lexical" and
+        carry the raw "bm25" score; "similarity" is the BM25 score relative
+        to the best match (1.0 for the top result).
+
+        Args:
+            query: Query text
+            top_k: Number of top results to return
+            search_filter: Keyword/person restrictions, applied before any scoring
+
+        Returns:
+            List of matches with person, keywords, text, similarity, bm25
+        """
+        allowed = self.filters.select(search_filter)
+        if not self.rows or (allowed is not None and len(allowed) == 0):
+            return []
+
+        ids, scores = self.lexical.search(query, top_k, rows=allowed)
+        return [
+            self.result(row_id, score / scores[0], mode="lexical", bm25=float(score))
+            for row_id, score in zip(ids, scores)
+        ]
+
+    def hybrid_search(
+        self,
+        query: str,
+        query_embedding: List[float],
+        top_k: int = 5,
+        engine: str = "exact",
+        nprobe: Optional[int] = None,
+        rescore: Optional[int] = None,
+        shortlist: Optional[int] = None,
+        search_filter: Optional[SearchFilter] = None
+    ) -> List[Dict]:
+        """
+        Fuse vector and BM25 rankings by reciprocal rank
+
+        The top max(top_k, HYBRID_DEPTH) rows of each ranking are fused; the
+        winners get their exact cosine similarity. Matches are tagged
+        "mode": "hybrid" and carry the fused "rrf" score they are ranked by.
+
+        Args:
+            query: Query text (for the BM25 ranking)
+            query_embedding: Raw query embedding (for the vector ranking)
+            top_k, engine, nprobe, rescore, shortlist, search_filter: As in search()
+
+        Returns:
+            List of matches with person, keywords, text, similarity, rrf
+        """
+        allowed = self.filters.select(search_filter)
+        if not self.rows or (allowed is not None and len(allowed) == 0):
+            return []
+
+        depth = max(top_k, HYBRID_DEPTH)
+        embedding = normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+        vector_ids, _ = self._ranked(embedding, depth, engine, nprobe, rescore, shortlist, allowed)
+        lexical_ids, _ = self.lexical.search(query, depth, rows=allowed)
+
+        ids, fused = reciprocal_rank_fusion([vector_ids, lexical_ids])
+        ids, fused = ids[:top_k], fused[:top_k]
+        # Sorted reads keep memory-mapped access sequential
+        order = np.argsort(ids)
+        similarities = np.empty(len(ids), dtype=np.float32)
+        similarities[order] = self._scores(embedding, ids[order])
+        return [
+            self.result(row_id, similarity, mode="hybrid", rrf=float(score))
+            for row_id, similarity, score in zip(ids, similarities, fused)
+        ]
+
+    def search_many(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        engine: str = "exact",
+        nprobe: Optional[int] = None,
+        rescore: Optional[int] = None,
+        shortlist: Optional[int] = None,
+        search_filter: Optional[SearchFilter] = None
+    ) -> List[List[Dict]]:
+        """
+        Find the experiences most similar to each of several query embeddings
+
+        The exact engine scores all queries with matrix-matrix products over
+        row chunks (split into query blocks so the score matrix stays under
+        MAX_SCORE_ELEMENTS). Approximate engines shortlist per query, so
+        their queries are searched one by one.
+
+        Args:
+            query_embeddings: Raw (unnormalized) query embeddings
+            top_k: Number of top results per query
+            engine: Search engine, as in search()
+            nprobe, rescore, shortlist, search_filter: As in search()
+
+        Returns:
+            One list of matches per query, in input order
+        """
+        if len(query_embeddings) == 0:
+            return []
+        allowed = self.filters.select(search_filter)
+        if not self.rows or (allowed is not None and len(allowed) == 0):
+            return [[] for _ in query_embeddings]
+
+        approximate = {"ivf": self.ivf, "int8": self.quantized, "pca": self.projection}
+        if approximate.get(engine) is not None:
+            return [
+                self.search(
+                    query, top_k, engine,
+                    nprobe=nprobe, rescore=rescore, shortlist=shortlist, search_filter=search_filter
+                )
+                for query in query_embeddings
+            ]
+
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+        total = len(self) if allowed is None else len(allowed)
+        block = max(1, MAX_SCORE_ELEMENTS // total)
+
+        results = []
+        for start in range(0, len(queries), block):
+            batch = queries[start:start + block]
+            scores = np.empty((len(batch), total), dtype=np.float32)
+            for row_start, chunk in self._row_chunks(allowed):
+                scores[:, row_start:row_start + len(chunk)] = batch @ chunk.T
+            best = top_k_per_row(scores, top_k)
+            for row_scores, row_best in zip(scores, best):
+                row_ids = row_best if allowed is None else allowed[row_best]
+                results.append([self.result(row_id, score) for row_id, score in zip(row_ids, row_scores[row_best])])
+        return results
+
+
+def rebuild_indexes(db_folder: str = "data/vector_db") -> List[str]:
+    """
+    Rebuild the derived indexes that no longer match the person files
+
+    Run after ingesting (batch_process.py does). Approximate indexes are
+    only rebuilt if they were built before, with their previous settings;
+    the packed BM25 index is always brought up to date.
+
+    Args:
+        db_folder: Path to vector database folder
+
+    Returns:
+        Names of the rebuilt indexes
+    """
+    sources = source_versions(db_folder)
+    out_dir = index_dir(db_folder)
+
+    def stale_meta(name: str, required: bool = False) -> Optional[Dict]:
+        meta_path = out_dir / f"{name}.json"
+        if not meta_path.exists():
+            return {} if required else None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return meta if meta.get('sources') != sources else None
+
+    rebuilt = []
+    meta = stale_meta(IVF_NAME)
+    if meta is not None:
+        build_ivf(db_folder, nlist=meta.get('nlist'), nprobe=meta.get('nprobe', 8))
+        rebuilt.append(IVF_NAME)
+    meta = stale_meta(INT8_NAME)
+    if meta is not None:
+        build_int8(db_folder, rescore=meta.get('rescore', 200))
+        rebuilt.append(INT8_NAME)
+    meta = stale_meta(PROJECTION_NAME)
+    if meta is not None:
+        build_projection(
+            db_folder, dims=meta.get('dims', 128), method=meta.get('method', 'pca'),
+            shortlist=meta.get('shortlist', 200)
+        )
+        rebuilt.append(PROJECTION_NAME)
+    if stale_meta(BM25_NAME, required=True) is not None:
+        build_bm25(db_folder)
+        rebuilt.append(BM25_NAME)
+    return rebuilt
+
+
+_index_cache: Dict[str, VectorIndex] = {}
+_index_lock = threading.Lock()
+_watchers: Dict[str, threading.Thread] = {}
+
+
+def _reset_after_fork():
+    """Forked children get a fresh lock (it may have been held mid-fork) and no watchers"""
+    global _index_lock, _watchers
+    _index_lock = threading.Lock()
+    _watchers = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def load_index(db_folder: str = "data/vector_db", reload: bool = False) -> Optional[VectorIndex]:
+    """
+    Get the process-wide index for a folder, building it on first use
+
+    Args:
+        db_folder: Path to vector database folder
+        reload: Rebuild the index even if one is already loaded
+
+    Returns:
+        The VectorIndex, or None if the folder does not exist
+    """
+    key = str(Path(db_folder).resolve())
+
+    with _index_lock:
+        if not reload and key in _index_cache:
+            return _index_cache[key]
+
+        if not Path(db_folder).exists():
+            return None
+
+        index = VectorIndex.from_folder(db_folder)
+        _index_cache[key] = index
+        return index
+
+
+def refresh_index(db_folder: str = "data/vector_db") -> bool:
+    """
+    Patch the process-wide index for a folder with changed persons
+
+    The new index is built without holding the cache lock and swapped in
+    afterwards, so concurrent searches keep using the old one until then.
+    Does nothing if the folder's index has not been loaded yet.
+
+    Args:
+        db_folder: Path to vector database folder
+
+    Returns:
+        True if a new index was swapped in
+    """
+    key = str(Path(db_folder).resolve())
+
+    with _index_lock:
+        index = _index_cache.get(key)
+    if index is None:
+        return False
+
+    new_index = index.refreshed(db_folder)
+    if new_index is None:
+        return False
+
+    with _index_lock:
+        # A concurrent load_index(reload=True) may have replaced it already
+        if _index_cache.get(key) is not index:
+            return False
+        _index_cache[key] = new_index
+    return True
+
+
+def watch_index(db_folder: str = "data/vector_db", interval: float = 5.0) -> threading.Thread:
+    """
+    Start a background thread that keeps the folder's index up to date
+
+    Every interval seconds the folder's mtime is checked; it changes whenever
+    a person file is created, replaced (Stage 2 writes via rename) or deleted,
+    and only then are the person files compared with the loaded index.
+
+    Args:
+        db_folder: Path to vector database folder
+        interval: Seconds between polls
+
+    Returns:
+        The watcher thread (one per folder; later calls return the same thread)
+    """
+    key = str(Path(db_folder).resolve())
+
+    def watch():
+        # Start from the loaded index's view of the folder, so an unchanged
+        # folder never triggers a reload
+        with _index_lock:
+            index = _index_cache.get(key)
+        last_mtime = index.mtime if index is not None else None
+        while True:
+            time.sleep(interval)
+            try:
+                mtime = Path(db_folder).stat().st_mtime_ns
+                if mtime == last_mtime:
+                    continue
+                if refresh_index(db_folder):
+                    print(f"✓ Reloaded vector index: {len(load_index(db_folder))} experiences")
+                last_mtime = mtime
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Warning: Vector index reload failed, retrying: {e}")
+
+    with _index_lock:
+        if key not in _watchers:
+            thread = threading.Thread(target=watch, name="index-watcher", daemon=True)
+            thread.start()
+            _watchers[key] = thread
+        return _watchers[key]
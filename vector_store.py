@@ -0,0 +1,429 @@
+"""
+Binary Vector Store Module
+
+Compact on-disk layout for the vector database, written next to the
+per-person JSON files:
+
+    data/vector_db/index/persons/{person}.npy   float32/float16 matrix, L2-normalized rows
+    data/vector_db/index/persons/{person}.json  metadata sidecar (no embeddings)
+    data/vector_db/index/corpus.npy             all persons packed into one matrix
+    data/vector_db/index/corpus.json            row metadata for the packed matrix
+
+Matrices are standard .npy files opened with numpy's memmap mode, so loading
+is zero-copy and forked server workers share the same page cache. The JSON
+files remain the source of truth; everything here can be regenerated with:
+
+    python vector_store.py convert [data/vector_db]
+"""
+
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Iterator, List, Dict, Optional, Tuple
+
+import numpy as np
+
+
+INDEX_DIRNAME = "index"
+PERSONS_DIRNAME = "persons"
+CORPUS_NAME = "corpus"
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize the rows of a matrix (zero rows are left as zeros)
+
+    Args:
+        matrix: 2-D array of embeddings
+
+    Returns:
+        float32 array with unit-length rows
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def index_dir(db_folder: str) -> Path:
+    """Directory holding derived index files for a vector database folder"""
+    return Path(db_folder) / INDEX_DIRNAME
+
+
+def person_files(db_folder: str) -> List[Path]:
+    """Sorted list of per-person JSON files in a vector database folder"""
+    return sorted(Path(db_folder).glob("*.json"))
+
+
+def experience_metadata(person: str, exp: Dict) -> Dict:
+    """Row metadata for one experience (everything except the embedding)"""
+    row = {
+        'person': person,
+        'keywords': exp['keywords'],
+        'text': exp['text']
+    }
+    if 'id' in exp:
+        row['id'] = exp['id']
+    if 'source_url' in exp:
+        row['source_url'] = exp['source_url']
+    if 'source_urls' in exp:
+        row['source_urls'] = exp['source_urls']
+    return row
+
+
+def _tmp_path(path: Path) -> Path:
+    """Temp file next to path, unique per process and thread"""
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def atomic_write_json(path: Path, data, **kwargs):
+    """Write JSON via a temp file and rename, so readers never see a partial file"""
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def atomic_save_npy(path: Path, matrix: np.ndarray):
+    """Write a .npy file via a temp file and rename"""
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, 'wb') as f:
+        np.save(f, matrix)
+    os.replace(tmp_path, path)
+
+
+def atomic_save_npz(path: Path, arrays: Dict[str, np.ndarray]):
+    """Write an .npz archive via a temp file and rename"""
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def write_person(
+    db_folder: str,
+    safe_name: str,
+    person: str,
+    experiences: List[Dict],
+    dtype: str = "float32"
+) -> Path:
+    """
+    Write the binary matrix and metadata sidecar for one person
+
+    Args:
+        db_folder: Path to vector database folder
+        safe_name: File stem used for the person (matches {safe_name}.json)
+        person: Person's display name
+        experiences: Experiences with 'embedding', 'keywords', 'text'
+        dtype: Storage dtype, "float32" or "float16"
+
+    Returns:
+        Path to the written .npy file
+    """
+    persons_dir = index_dir(db_folder) / PERSONS_DIRNAME
+    persons_dir.mkdir(parents=True, exist_ok=True)
+
+    if experiences:
+        matrix = normalize_rows(np.array([exp['embedding'] for exp in experiences], dtype=np.float32))
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+    matrix = matrix.astype(dtype)
+
+    npy_path = persons_dir / f"{safe_name}.npy"
+    atomic_save_npy(npy_path, matrix)
+
+    meta = {
+        'person': person,
+        'dtype': dtype,
+        'dimensions': int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        'experiences': [experience_metadata(person, exp) for exp in experiences]
+    }
+    atomic_write_json(persons_dir / f"{safe_name}.json", meta, ensure_ascii=False)
+
+    return npy_path
+
+
+def _load_person_json(json_file: Path) -> Tuple[np.ndarray, List[Dict]]:
+    """Load one person from its JSON file (slow path)"""
+    with open(json_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    person = data['person']
+    rows = [experience_metadata(person, exp) for exp in data['experiences']]
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32), rows
+
+    matrix = normalize_rows(np.array([exp['embedding'] for exp in data['experiences']], dtype=np.float32))
+    return matrix, rows
+
+
+def load_person(db_folder: str, json_file: Path) -> Tuple[np.ndarray, List[Dict]]:
+    """
+    Load one person's normalized matrix and row metadata
+
+    Uses the memory-mapped binary file when it is at least as new as the
+    JSON file, otherwise falls back to parsing the JSON.
+
+    Args:
+        db_folder: Path to vector database folder
+        json_file: The person's JSON file in db_folder
+
+    Returns:
+        Tuple of (matrix, rows)
+    """
+    persons_dir = index_dir(db_folder) / PERSONS_DIRNAME
+    npy_path = persons_dir / f"{json_file.stem}.npy"
+    meta_path = persons_dir / f"{json_file.stem}.json"
+
+    if (npy_path.exists() and meta_path.exists()
+            and npy_path.stat().st_mtime_ns >= json_file.stat().st_mtime_ns):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        matrix = np.load(npy_path, mmap_mode='r')
+        return matrix, meta['experiences']
+
+    return _load_person_json(json_file)
+
+
+def source_versions(db_folder: str) -> Dict[str, int]:
+    """Modification times of every person JSON file, keyed by file stem"""
+    return {path.stem: path.stat().st_mtime_ns for path in person_files(db_folder)}
+
+
+def concatenate_rows(blocks: List[np.ndarray]) -> np.ndarray:
+    """Stack per-person matrices into one contiguous float32 matrix"""
+    blocks = [block for block in blocks if len(block)]
+    if not blocks:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.ascontiguousarray(np.concatenate(blocks).astype(np.float32, copy=False))
+
+
+class StackedRows:
+    """
+    Read-only row-wise concatenation of matrices, without copying them
+
+    The blocks are usually memory-mapped files (the packed corpus, or the
+    per-person files while it is stale) and may be float16. Rows are read
+    and cast to float32 only when indexed, so the full-precision matrix is
+    never resident as a whole.
+    """
+
+    def __init__(self, blocks: List[np.ndarray]):
+        """
+        Initialize the stack
+
+        Args:
+            blocks: 2-D matrices of the same width, in row order
+        """
+        self.blocks = [block for block in blocks if len(block)]
+        if len({block.shape[1] for block in self.blocks}) > 1:
+            raise ValueError("Cannot stack matrices of different widths")
+
+        self.offsets = np.zeros(len(self.blocks) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum([len(block) for block in self.blocks])
+        self.shape = (int(self.offsets[-1]), self.blocks[0].shape[1] if self.blocks else 0)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    @property
+    def memory_mapped(self) -> bool:
+        """Whether every block is backed by a file"""
+        return all(isinstance(block, np.memmap) for block in self.blocks)
+
+    def views(self, start: int, end: int) -> List[np.ndarray]:
+        """The parts of the blocks holding rows start:end, as views"""
+        views = []
+        for block, offset, next_offset in zip(self.blocks, self.offsets, self.offsets[1:]):
+            if start < next_offset and end > offset:
+                views.append(block[max(start - offset, 0):min(end, next_offset) - offset])
+        return views
+
+    def chunks(self, chunk_size: int = 65536) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Yield (first row ID, float32 rows) for consecutive chunks of every block
+
+        Args:
+            chunk_size: Maximum rows per chunk
+        """
+        for block, offset in zip(self.blocks, self.offsets):
+            for start in range(0, len(block), chunk_size):
+                yield int(offset) + start, np.asarray(block[start:start + chunk_size], dtype=np.float32)
+
+    def __getitem__(self, key) -> np.ndarray:
+        """float32 rows for a row ID, a slice or an array of row IDs"""
+        if isinstance(key, (int, np.integer)):
+            return self[np.array([key])][0]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step == 1:
+                views = self.views(start, stop)
+                if len(views) == 1:
+                    return np.asarray(views[0], dtype=np.float32)
+                if not views:
+                    return np.zeros((0, self.shape[1]), dtype=np.float32)
+                return np.concatenate(views).astype(np.float32, copy=False)
+            key = np.arange(start, stop, step)
+
+        ids = np.asarray(key)
+        if ids.dtype == bool:
+            ids = np.flatnonzero(ids)
+        ids = np.where(ids < 0, ids + len(self), ids)
+
+        rows = np.empty((len(ids), self.shape[1]), dtype=np.float32)
+        owners = np.searchsorted(self.offsets, ids, side='right') - 1
+        for owner in np.unique(owners):
+            selected = owners == owner
+            rows[selected] = self.blocks[owner][ids[selected] - self.offsets[owner]]
+        return rows
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        # Materializes every row; meant for offline index builds
+        return np.asarray(self[:], dtype=dtype or np.float32)
+
+
+def pack_corpus(db_folder: str = "data/vector_db", dtype: str = "float32") -> Path:
+    """
+    Pack every person into a single corpus matrix plus row metadata
+
+    Args:
+        db_folder: Path to vector database folder
+        dtype: Storage dtype, "float32" or "float16"
+
+    Returns:
+        Path to the written corpus .npy file
+    """
+    versions = source_versions(db_folder)
+    blocks = []
+    rows = []
+    counts = {}
+    for json_file in person_files(db_folder):
+        matrix, person_rows = load_person(db_folder, json_file)
+        blocks.append(matrix)
+        rows.extend(person_rows)
+        counts[json_file.stem] = len(person_rows)
+
+    out_dir = index_dir(db_folder)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    corpus_path = out_dir / f"{CORPUS_NAME}.npy"
+    atomic_save_npy(corpus_path, concatenate_rows(blocks).astype(dtype))
+
+    meta = {
+        'dtype': dtype,
+        'sources': versions,
+        'counts': counts,
+        'rows': rows
+    }
+    atomic_write_json(out_dir / f"{CORPUS_NAME}.json", meta, ensure_ascii=False)
+
+    return corpus_path
+
+
+def load_corpus(db_folder: str = "data/vector_db") -> Tuple[StackedRows, List[Dict]]:
+    """
+    Load the whole vector database as (matrix, rows)
+
+    The packed corpus is memory-mapped directly when it is up to date with
+    the JSON files; otherwise the per-person files are stacked without
+    copying them (see StackedRows).
+
+    Args:
+        db_folder: Path to vector database folder
+
+    Returns:
+        Tuple of (StackedRows of normalized rows, row metadata list)
+    """
+    matrix, rows, _ = load_corpus_parts(db_folder)
+    return matrix, rows
+
+
+def load_corpus_parts(db_folder: str = "data/vector_db") -> Tuple[StackedRows, List[Dict], Optional[Dict[str, int]]]:
+    """
+    Load the whole vector database plus the number of rows of each person
+
+    Rows are grouped by person in file-stem order, so the counts locate each
+    person's slice of the matrix.
+
+    Args:
+        db_folder: Path to vector database folder
+
+    Returns:
+        Tuple of (matrix, rows, {file stem: row count}); counts are None for a
+        corpus packed before they were recorded
+    """
+    out_dir = index_dir(db_folder)
+    corpus_path = out_dir / f"{CORPUS_NAME}.npy"
+    meta_path = out_dir / f"{CORPUS_NAME}.json"
+
+    if corpus_path.exists() and meta_path.exists():
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['sources'] == source_versions(db_folder):
+            # float16 rows stay float16 on disk and are cast when read
+            matrix = np.load(corpus_path, mmap_mode='r')
+            return StackedRows([matrix]), meta['rows'], meta.get('counts')
+
+    blocks = []
+    rows = []
+    counts = {}
+    for json_file in person_files(db_folder):
+        matrix, person_rows = load_person(db_folder, json_file)
+        blocks.append(matrix)
+        rows.extend(person_rows)
+        counts[json_file.stem] = len(person_rows)
+
+    return StackedRows(blocks), rows, counts
+
+
+def convert_folder(db_folder: str = "data/vector_db", dtype: str = "float32") -> int:
+    """
+    Migrate existing JSON files to the binary layout
+
+    Args:
+        db_folder: Path to vector database folder
+        dtype: Storage dtype, "float32" or "float16"
+
+    Returns:
+        Number of persons converted
+    """
+    count = 0
+    for json_file in person_files(db_folder):
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        write_person(db_folder, json_file.stem, data['person'], data['experiences'], dtype=dtype)
+        count += 1
+
+    pack_corpus(db_folder, dtype=dtype)
+    return count
+
+
+def main():
+    """Command line entry point"""
+    if len(sys.argv) < 2 or sys.argv[1] not in ("convert", "pack"):
+        print("Usage: python vector_store.py convert|pack [db_folder] [--float16]")
+        print("\n  convert  Write binary files for every person JSON, then pack")
+        print("  pack     Re-pack the corpus matrix from per-person files")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    args = [a for a in sys.argv[2:] if not a.startswith('--')]
+    db_folder = args[0] if args else "data/vector_db"
+    dtype = "float16" if "--float16" in sys.argv else "float32"
+
+    if not Path(db_folder).exists():
+        print(f"✗ Error: Database folder '{db_folder}' not found")
+        sys.exit(1)
+
+    if command == "convert":
+        count = convert_folder(db_folder, dtype=dtype)
+        print(f"✓ Converted {count} persons to {index_dir(db_folder)}")
+    else:
+        corpus_path = pack_corpus(db_folder, dtype=dtype)
+        print(f"✓ Packed corpus to {corpus_path}")
+
+
+if __name__ == "__main__":
+    main()